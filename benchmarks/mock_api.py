@@ -0,0 +1,271 @@
+"""
+Локальная заглушка FACEIT Data API для бенчмарков.
+
+Отдаёт записанные ответы из каталога фикстур (путь запроса + .json, см.
+record_fixtures.py), а для остальных игроков и матчей генерирует синтетические
+ответы, детерминированные по никнейму/ID. Задержка, доля ошибок 5xx и доля
+ответов 429 настраиваются.
+
+Запуск отдельно: python benchmarks/mock_api.py --port 8765 --latency 40
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MAPS = ("de_dust2", "de_mirage", "de_inferno", "de_nuke", "de_ancient", "de_anubis", "de_vertigo", "de_overpass")
+COUNTRIES = ("ru", "ua", "kz", "de", "pl", "se", "fi", "fr", "dk", "us")
+
+
+def _rng(*parts):
+    """Генератор, детерминированный по ключу: один и тот же игрок - одни и те же данные"""
+    seed = hashlib.sha1("/".join(str(part) for part in parts).encode()).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+def player_id_for(nickname):
+    return "p-" + hashlib.sha1(nickname.lower().encode()).hexdigest()[:24]
+
+
+def synthetic_player(nickname, player_id=None):
+    rng = _rng("player", nickname)
+    player_id = player_id or player_id_for(nickname)
+    game = {"faceit_elo": rng.randint(800, 3500), "skill_level": rng.randint(1, 10)}
+    return {"player_id": player_id, "nickname": nickname, "country": rng.choice(COUNTRIES),
+            "games": {"cs2": game}}
+
+
+def synthetic_segment(rng, label):
+    matches = rng.randint(0, 300)
+    kills = matches * rng.randint(12, 24)
+    deaths = matches * rng.randint(11, 21)
+    return {
+        "label": label, "type": "Map", "mode": "5v5",
+        "stats": {
+            "Matches": str(matches),
+            "Kills": str(kills),
+            "Deaths": str(deaths),
+            "Average Kills": f"{kills / matches:.2f}" if matches else "0",
+            "Win Rate %": str(rng.randint(30, 70)),
+            "Average K/D Ratio": f"{kills / deaths:.2f}" if deaths else "0",
+        },
+    }
+
+
+def synthetic_stats(player_id, game_id, segment_count=None):
+    """Lifetime и сегменты; segment_count больше числа карт даёт синтетические названия"""
+    rng = _rng("stats", player_id, game_id)
+    count = segment_count or len(MAPS)
+    labels = [MAPS[index] if index < len(MAPS) else f"de_custom_{index}" for index in range(count)]
+    segments = [synthetic_segment(rng, label) for label in labels]
+    matches = sum(int(segment["stats"]["Matches"]) for segment in segments)
+    return {
+        "player_id": player_id, "game_id": game_id,
+        "lifetime": {
+            "Matches": str(matches),
+            "Average K/D Ratio": f"{rng.uniform(0.6, 1.6):.2f}",
+            "Win Rate %": str(rng.randint(35, 65)),
+            "Average Headshots %": str(rng.randint(30, 60)),
+            "Current Win Streak": str(rng.randint(0, 5)),
+            "Longest Win Streak": str(rng.randint(5, 20)),
+        },
+        "segments": segments,
+    }
+
+
+def synthetic_match(match_id):
+    rng = _rng("match", match_id)
+    teams = {}
+    for faction in ("faction1", "faction2"):
+        roster = []
+        for _ in range(5):
+            nickname = f"player_{rng.randint(0, 10 ** 6)}"
+            roster.append({"nickname": nickname, "player_id": player_id_for(nickname)})
+        teams[faction] = {"name": f"team_{faction}", "roster": roster}
+    return {"match_id": match_id, "status": "ONGOING", "teams": teams}
+
+
+def synthetic_history(player_id, game_id, offset, limit, total=500):
+    items = []
+    now = 1_700_000_000
+    for index in range(offset, min(offset + limit, total)):
+        started = now - index * 3600
+        items.append({
+            "match_id": f"1-{player_id}-{index}", "game_id": game_id, "status": "finished",
+            "started_at": started, "finished_at": started + 2400,
+            "results": {"winner": "faction1" if _rng("win", player_id, index).random() < 0.5 else "faction2"},
+            "teams": {"faction1": {"players": [{"player_id": player_id}]}, "faction2": {"players": []}},
+        })
+    return {"items": items, "start": offset, "end": offset + len(items)}
+
+
+def synthetic_match_stats(match_id):
+    rng = _rng("match_stats", match_id)
+    # ID матча из synthetic_history содержит player_id игрока
+    parts = match_id.split("-")
+    player_id = "-".join(parts[1:-1]) if len(parts) > 2 else "unknown"
+    rounds = rng.randint(16, 30)
+    return {"rounds": [{
+        "round_stats": {"Map": rng.choice(MAPS), "Rounds": str(rounds)},
+        "teams": [{"players": [{"player_id": player_id, "player_stats": {
+            "Kills": str(rng.randint(5, 35)), "Deaths": str(rng.randint(5, 25)), "Assists": str(rng.randint(0, 10)),
+            "Headshots": str(rng.randint(0, 15)), "MVPs": str(rng.randint(0, 6)),
+            "ADR": f"{rng.uniform(40, 120):.1f}", "Result": str(rng.randint(0, 1)),
+        }}]}],
+    }]}
+
+
+class MockConfig:
+    """Параметры поведения заглушки, можно менять на лету"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=1,
+                 fixtures_dir=None, segment_count=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.fixtures_dir = fixtures_dir
+        self.segment_count = segment_count
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Заголовки и тело уходят отдельными записями: без этого Nagle и delayed ACK
+    # добавляют к каждому ответу ~40 мс
+    disable_nagle_algorithm = True
+    config = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=None, headers=None):
+        data = json.dumps(body if body is not None else {"errors": [{"message": "error"}]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _fixture(self, path, query):
+        if not self.config.fixtures_dir:
+            return None
+        name = path.strip("/")
+        if path.endswith("/players") and "nickname" in query:
+            name += "/" + query["nickname"][0].lower()
+        file_path = os.path.join(self.config.fixtures_dir, *name.split("/")) + ".json"
+        if os.path.exists(file_path):
+            with open(file_path, encoding="utf-8") as f:
+                return json.load(f)
+        return None
+
+    def do_GET(self):
+        config = self.config
+        config.count()
+        delay = config.latency + random.uniform(0, config.jitter)
+        if delay:
+            time.sleep(delay)
+        if config.throttle_rate and random.random() < config.throttle_rate:
+            return self._send(429, headers={"Retry-After": str(config.retry_after)})
+        if config.error_rate and random.random() < config.error_rate:
+            return self._send(503)
+
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        path = url.path.split("/data/v4", 1)[-1]
+        fixture = self._fixture(path, query)
+        if fixture is not None:
+            return self._send(200, fixture)
+
+        parts = [part for part in path.split("/") if part]
+        body = None
+        if parts == ["players"] and "nickname" in query:
+            body = synthetic_player(query["nickname"][0])
+        elif len(parts) == 2 and parts[0] == "players":
+            body = synthetic_player(parts[1][2:], parts[1])
+        elif len(parts) == 4 and parts[0] == "players" and parts[2] == "stats":
+            body = synthetic_stats(parts[1], parts[3], config.segment_count)
+        elif len(parts) == 3 and parts[0] == "players" and parts[2] == "history":
+            offset = int(query.get("offset", ["0"])[0])
+            limit = int(query.get("limit", ["20"])[0])
+            body = synthetic_history(parts[1], query.get("game", ["cs2"])[0], offset, limit)
+        elif len(parts) == 2 and parts[0] == "matches":
+            body = synthetic_match(parts[1])
+        elif len(parts) == 3 and parts[0] == "matches" and parts[2] == "stats":
+            body = synthetic_match_stats(parts[1])
+
+        if body is None:
+            return self._send(404)
+        self._send(200, body)
+
+
+class MockFaceitServer:
+    """Заглушка в фоновом потоке: with MockFaceitServer(MockConfig(...)) as server: server.base_url"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or MockConfig()
+        handler = type("BoundMockHandler", (MockHandler,), {"config": self.config})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/data/v4"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заглушка FACEIT Data API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0, help="задержка ответа, мс")
+    parser.add_argument("--jitter", type=float, default=0, help="случайная добавка к задержке, мс")
+    parser.add_argument("--error-rate", type=float, default=0, help="доля ответов 503")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="доля ответов 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After для 429, сек")
+    parser.add_argument("--fixtures", default=None, help="каталог записанных ответов")
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency / 1000, args.jitter / 1000, args.error_rate, args.throttle_rate,
+                        args.retry_after, args.fixtures)
+    server = MockFaceitServer(config, args.host, args.port)
+    print(f"FACEIT API заглушка: {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
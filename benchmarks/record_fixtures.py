@@ -0,0 +1,74 @@
+"""
+Записывает ответы живого FACEIT Data API в каталог фикстур для mock_api.py.
+
+python benchmarks/record_fixtures.py -o benchmarks/fixtures s1mple ZywOo
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv  # noqa: E402
+
+from faceit_analyze.client import FaceitClient  # noqa: E402
+from faceit_analyze.env import api_keys_from_env  # noqa: E402
+
+
+def save(out_dir, name, data):
+    path = os.path.join(out_dir, *name.split("/")) + ".json"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+
+
+def record_player(client, out_dir, nickname, history_limit):
+    player = client.get_json("players", params={"nickname": nickname})
+    if not player:
+        print(f"{nickname}: не найден", file=sys.stderr)
+        return
+    player_id = player["player_id"]
+    save(out_dir, f"players/{nickname.lower()}", player)
+    save(out_dir, f"players/{player_id}", player)
+    for game_id in ("cs2", "csgo"):
+        stats = client.get_json(f"players/{player_id}/stats/{game_id}")
+        if stats:
+            save(out_dir, f"players/{player_id}/stats/{game_id}", stats)
+    if history_limit:
+        history = client.get_json(f"players/{player_id}/history",
+                                  params={"game": "cs2", "offset": 0, "limit": history_limit})
+        if history:
+            save(out_dir, f"players/{player_id}/history", history)
+            for item in history.get("items", []):
+                # Комната матча - для сканирования лобби и команд по ссылке на матч
+                match = client.get_json(f"matches/{item['match_id']}")
+                if match:
+                    save(out_dir, f"matches/{item['match_id']}", match)
+                match_stats = client.get_json(f"matches/{item['match_id']}/stats")
+                if match_stats:
+                    save(out_dir, f"matches/{item['match_id']}/stats", match_stats)
+    print(f"{nickname}: записан")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Запись фикстур FACEIT Data API")
+    parser.add_argument("players", nargs="+")
+    parser.add_argument("-o", "--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+    parser.add_argument("--history", type=int, default=20, help="сколько матчей истории записать (0 - не писать)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    api_keys = api_keys_from_env()
+    if not api_keys:
+        sys.exit("FACEIT_API_KEY не найден в переменных окружения. Проверьте файл .env")
+    client = FaceitClient(api_keys)
+    try:
+        for nickname in args.players:
+            record_player(client, args.out, nickname, args.history)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Бенчмарки FACEIT Analyze без обращения к живому API.
+
+Сквозное сканирование игрока и лобби идёт через локальную заглушку
+(mock_api.py) с заданной задержкой; анализ статистики измеряется отдельно
+на синтетических игроках с 50-500 сегментами.
+
+python benchmarks/run.py                                  # все бенчмарки
+python benchmarks/run.py --only analysis --save base.json # сохранить базовую линию
+python benchmarks/run.py --baseline base.json             # код 1 при регрессии
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_api import MockConfig, MockFaceitServer, synthetic_stats  # noqa: E402
+
+from faceit_analyze.analysis import MapTable, analyze_maps, calculate_avg_stats  # noqa: E402
+from faceit_analyze.client import FaceitClient  # noqa: E402
+from faceit_analyze.lobby import scan_lobby  # noqa: E402
+from faceit_analyze.pipeline import run_scan  # noqa: E402
+from faceit_analyze.ratelimit import TokenBucket  # noqa: E402
+from faceit_analyze.segments import parse_stats  # noqa: E402
+
+SEGMENT_COUNTS = (50, 100, 250, 500)
+LOBBY = ["bench_player_%d" % index for index in range(10)]
+
+
+def measure(func, repeat, warmup=1):
+    """Запускает func repeat раз и возвращает времена в миллисекундах"""
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def describe(name, times, **extra):
+    times = sorted(times)
+    result = {
+        "name": name,
+        "median_ms": statistics.median(times),
+        "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))],
+        "runs": len(times),
+    }
+    result.update(extra)
+    return result
+
+
+def bench_analysis(repeat):
+    results = []
+    for count in SEGMENT_COUNTS:
+        stats_data = synthetic_stats(f"synthetic-{count}", "cs2", segment_count=count)
+        parsed = parse_stats(stats_data)
+        lifetime, segments = parsed.lifetime, parsed.segments
+        results.append(describe(f"parse_stats[{count}]", measure(lambda: parse_stats(stats_data), repeat)))
+        results.append(describe(f"calculate_avg_stats[{count}]",
+                                measure(lambda: calculate_avg_stats(lifetime, segments, "cs2"), repeat)))
+        results.append(describe(f"analyze_maps[{count}]",
+                                measure(lambda: analyze_maps(segments, "cs2"), repeat)))
+        # Таблица карт целиком: построение и одна сортировка (повторные берутся из памяти)
+        results.append(describe(f"map_table[{count}]",
+                                measure(lambda: MapTable(segments).ranked("win_rate", 1), repeat)))
+    return results
+
+
+def make_client(server):
+    # Квота отключена: измеряется сам конвейер, а не ожидание токенов. Короткий
+    # срок запроса не даёт брошенным запросам CS:GO держать процесс после остановки заглушки
+    return FaceitClient("benchmark", base_url=server.base_url, rate_limiter=TokenBucket(0, 1), deadline=5)
+
+
+def bench_scan(repeat, latency):
+    results = []
+    with MockFaceitServer(MockConfig(latency=latency)) as server:
+        client = make_client(server)
+        try:
+            counter = iter(range(10 ** 9))
+            # Каждый прогон - новый никнейм, чтобы не мерить кэш
+            times = measure(lambda: run_scan(client, f"scan_{next(counter)}"), repeat)
+            results.append(describe("scan", times, latency_ms=latency * 1000))
+
+            text = " ".join(LOBBY)
+            lobby_times = measure(lambda: scan_lobby(client, text), max(3, repeat // 5))
+            single = statistics.median(times)
+            results.append(describe("lobby[10]", lobby_times, latency_ms=latency * 1000,
+                                    vs_single=statistics.median(lobby_times) / single))
+        finally:
+            client.close()
+    return results
+
+
+def bench_faults(repeat, latency):
+    """Сканирование при 10% ответов 503 и 5% ответов 429: время и доля успешных"""
+    config = MockConfig(latency=latency, error_rate=0.10, throttle_rate=0.05, retry_after=0)
+    with MockFaceitServer(config) as server:
+        client = make_client(server)
+        ok = 0
+
+        def scan():
+            nonlocal ok
+            try:
+                if run_scan(client, f"fault_{time.perf_counter_ns()}").stats:
+                    ok += 1
+            except Exception:
+                pass
+        try:
+            times = measure(scan, repeat, warmup=0)
+        finally:
+            client.close()
+    return [describe("scan[faults]", times, success_rate=ok / repeat, requests=config.requests)]
+
+
+SUITES = {
+    "analysis": lambda args: bench_analysis(args.repeat * 10),
+    "scan": lambda args: bench_scan(args.repeat, args.latency / 1000),
+    "faults": lambda args: bench_faults(args.repeat, args.latency / 1000),
+}
+
+
+def compare(results, baseline, tolerance):
+    """Список регрессий: медиана выросла больше чем на tolerance относительно базовой"""
+    previous = {item["name"]: item for item in baseline}
+    regressions = []
+    for item in results:
+        before = previous.get(item["name"])
+        if before and item["median_ms"] > before["median_ms"] * (1 + tolerance):
+            regressions.append((item["name"], before["median_ms"], item["median_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки FACEIT Analyze")
+    parser.add_argument("--only", choices=sorted(SUITES), action="append", help="запустить только эти наборы")
+    parser.add_argument("--repeat", type=int, default=20, help="прогонов сквозных бенчмарков")
+    parser.add_argument("--latency", type=float, default=30, help="задержка ответа заглушки, мс")
+    parser.add_argument("--save", help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="сравнить с сохранёнными результатами")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимый рост медианы (0.25 = 25%%)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    results = []
+    for name in args.only or SUITES:
+        results.extend(SUITES[name](args))
+
+    for item in results:
+        extra = "  ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                          for key, value in item.items() if key not in ("name", "median_ms", "p95_ms", "runs"))
+        print(f"{item['name']:<28} median {item['median_ms']:9.3f} ms   p95 {item['p95_ms']:9.3f} ms  {extra}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, before, after in regressions:
+            print(f"РЕГРЕССИЯ {name}: {before:.3f} -> {after:.3f} ms", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,35 +1,73 @@
-import requests
-import threading
-from kivy.app import App
-from kivy.lang import Builder
-from kivy.uix.boxlayout import BoxLayout
-from kivy.properties import StringProperty
-from kivy.core.window import Window
+import importlib
 import logging
 import os
 import sys
-from kivy.config import Config
+import threading
+import time
+
+from faceit_analyze.startup import StartupProfiler
+
+# Отметки этапов запуска; --profile-startup дополнительно выводит время импортов.
+# Флаг убирается из argv до импорта Kivy, который разбирает аргументы сам
+startup = StartupProfiler.from_argv(sys.argv)
+
 from dotenv import load_dotenv
+from kivy.config import Config
+from faceit_analyze.env import api_keys_from_env
+from faceit_analyze.metrics import metrics, start_exporters_from_env
+from faceit_analyze.scheduler import ScanScheduler
 
 # Загружаем переменные окружения из .env файла
 load_dotenv()
 
-# Получаем API ключ из переменных окружения
-API_KEY = os.getenv("FACEIT_API_KEY")
-if not API_KEY:
+# Получаем ключи API из переменных окружения: FACEIT_API_KEYS или FACEIT_API_KEY
+API_KEYS = api_keys_from_env()
+if not API_KEYS:
     raise ValueError("FACEIT_API_KEY не найден в переменных окружения. Проверьте файл .env")
 
-BASE_URL = "https://open.faceit.com/data/v4"
+ICON_NAME = 'faceit-icon.ico'
 
-# Задаем цвета и размеры окна
-Window.size = (800, 600)
-Window.minimum_width, Window.minimum_height = 400, 300
-Window.clearcolor = (0, 0, 0, 1)
+# Клиент API (requests, кэш ответов) и локальная история матчей создаются
+# при первом обращении: сетевой стек и SQLite не нужны до первого сканирования
+api_client = None
+match_store = None
+_services_lock = threading.Lock()
+
+
+def get_services():
+    """Общий клиент API (одна сессия с keep-alive и кэш на диске) и база истории матчей"""
+    global api_client, match_store
+    if api_client is None:
+        with _services_lock:
+            if api_client is None:
+                from faceit_analyze.cache import ResponseCache
+                from faceit_analyze.client import FaceitClient
+                from faceit_analyze.history import MatchStore
+                match_store = MatchStore()
+                api_client = FaceitClient(API_KEYS, cache=ResponseCache())
+    return api_client, match_store
+
+
+# Справочник найденных игроков: подсказки при вводе и поиск без запроса к API
+player_directory = None
+
+
+def get_directory():
+    """Справочник игроков; загружается из базы при первом обращении"""
+    global player_directory
+    if player_directory is None:
+        with _services_lock:
+            if player_directory is None:
+                from faceit_analyze.directory import PlayerDirectory
+                player_directory = PlayerDirectory()
+    return player_directory
 
 # Настройка логирования только для критических ошибок
 def setup_logging():
+    # По умолчанию только ERROR и CRITICAL; FACEIT_LOG_LEVEL=INFO/DEBUG для профилирования
+    level = getattr(logging, os.getenv("FACEIT_LOG_LEVEL", "ERROR").upper(), logging.ERROR)
     logging.basicConfig(
-        level=logging.ERROR,  # Только ERROR и CRITICAL
+        level=level,
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
     return logging.getLogger('faceit_tracker')
@@ -37,10 +75,29 @@ def setup_logging():
 # Использование в коде
 logger = setup_logging()
 
-# Функция проверки наличия иконки и создания её при необходимости
+# Экспорт метрик (Prometheus / JSON-строки), если включён переменными окружения
+start_exporters_from_env()
+
+def resource_path(relative_path):
+    """Получает абсолютный путь к ресурсу, работает как в упакованной, так и в обычной версии"""
+    if getattr(sys, 'frozen', False):
+        base_path = sys._MEIPASS
+    else:
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    
+    return os.path.join(base_path, relative_path)
+
+def find_icon():
+    """Путь к готовой иконке (в сборке или рядом с программой) или None"""
+    for path in (resource_path(ICON_NAME), os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), ICON_NAME)):
+        if os.path.exists(path):
+            return path
+    return None
+
+# Функция создания иконки, если её нет ни в сборке, ни рядом с программой
 def ensure_icon_exists():
     """Проверяет наличие иконки и создаёт её, если не найдена"""
-    icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'faceit-icon.ico')
+    icon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), ICON_NAME)
     
     if not os.path.exists(icon_path):
         try:
@@ -85,59 +142,238 @@ def ensure_icon_exists():
     
     return icon_path
 
-# Вызываем функцию при запуске программы
-icon_path = ensure_icon_exists()
+# Готовая иконка ищется без Pillow; если её нет, она рисуется уже после показа окна
+icon_path = find_icon()
 
-# Настраиваем название и иконку приложения до создания окна
-Config.set('kivy', 'window_icon', icon_path)
+# Настраиваем название и иконку приложения до создания окна (его создаёт импорт kivy.core.window)
+if icon_path:
+    Config.set('kivy', 'window_icon', icon_path)
 Config.set('kivy', 'window_title', 'FACEIT ANALYZE')
+startup.mark("config")
+
+from kivy.app import App
+from kivy.lang import Builder
+from kivy.uix.boxlayout import BoxLayout
+from kivy.properties import StringProperty
+from kivy.core.window import Window
+startup.mark("kivy_window")
+
+# Задаем цвета и размеры окна
+Window.size = (800, 600)
+Window.minimum_width, Window.minimum_height = 400, 300
+Window.clearcolor = (0, 0, 0, 1)
+
+def fmt_value(value, pattern="{}"):
+    """Форматирует число для вывода, отсутствующее значение - как Н/Д"""
+    return pattern.format(value) if value is not None else "Н/Д"
+
+def make_row(text="", mono=False):
+    """Строка области вывода (элемент data RecycleView); mono - моноширинный шрифт для таблиц"""
+    return {"text": text, "mono": mono}
+
+# Сортировки таблицы карт: подпись в интерфейсе -> поле MapTable
+MAP_SORTS = {
+    "РЕЙТИНГ": "weighted_rating",
+    "ВИНРЕЙТ": "win_rate",
+    "K/D": "kd",
+    "МАТЧИ": "matches",
+    "AVG KILLS": "avg_kills",
+}
+
+def separator_rows():
+    """Разделитель блоков: пустая строка, линия, пустая строка"""
+    return [make_row(), make_row("[color=ff5500]" + "-" * 80 + "[/color]"), make_row()]
 
 # Основной класс для отображения статистики
 class StatsLayout(BoxLayout):
-    output_text = StringProperty("_")
+    debug_text = StringProperty("")
     
     def __init__(self, **kwargs):
         super(StatsLayout, self).__init__(**kwargs)
+        # Отладочная панель с таймингами: F12 или FACEIT_DEBUG_OVERLAY=1
+        self.debug_overlay = os.getenv("FACEIT_DEBUG_OVERLAY", "0") == "1"
+        self._last_timings = {}
+        Window.bind(on_key_down=self._on_key_down)
+        # Сканирования идут через планировщик: новый запрос отменяет предыдущий,
+        # а вывод устаревшего запроса отбрасывается
+        self.scheduler = ScanScheduler()
+        # Предзагрузка напарников и соперников показанного игрока, создаётся при первом сканировании
+        self.prefetcher = None
+        # Запрос (ScanTicket), который обслуживает текущий поток сканирования
+        self._scan_local = threading.local()
+        # Показанная статистика игрока: таблица карт перестраивается из неё без запросов
+        self._shown_stats = None
+        self.map_sort = "РЕЙТИНГ"
+        from faceit_analyze.analysis import MIN_MAP_MATCHES
+        self.map_min_matches = MIN_MAP_MATCHES
+        self.ids.map_min_matches.text = str(MIN_MAP_MATCHES)
+    
+    def _on_key_down(self, window, key, scancode, codepoint, modifiers):
+        if key == 293:  # F12
+            self.debug_overlay = not self.debug_overlay
+            self._refresh_debug_overlay()
+            return True
+        return False
+    
+    def _refresh_debug_overlay(self, timings=None):
+        """Показывает тайминги последнего сканирования и счётчики HTTP/кэша"""
+        if timings is not None:
+            self._last_timings = dict(timings)
+        if not self.debug_overlay:
+            text = ""
+        else:
+            stages = "  ".join(f"{stage}: {seconds * 1000:.0f} мс" for stage, seconds in self._last_timings.items())
+            counters = (
+                f"кэш: {metrics.counter('faceit_cache_requests_total', result='hit')} hit / "
+                f"{metrics.counter('faceit_cache_requests_total', result='revalidated')} 304 / "
+                f"{metrics.counter('faceit_cache_requests_total', result='miss')} miss / "
+                f"{metrics.counter('faceit_cache_requests_total', result='stale')} stale / "
+                f"{metrics.counter('faceit_cache_requests_total', result='offline')} offline   "
+                f"соединений: {metrics.total('faceit_http_connections_opened_total')}   "
+                f"повторов: {metrics.total('faceit_http_retries_total')}   "
+                f"отказов: {metrics.total('faceit_http_failures_total')}"
+            )
+            text = f"[DEBUG] {stages or 'нет данных'}\n{counters}"
+            # Использование ключей видно, только если их несколько
+            if api_client is not None and len(api_client.keys) > 1:
+                text += "\nключи: " + "   ".join(
+                    f"{usage['key']} {usage['requests']}"
+                    + (f" (карантин {usage['quarantine_left']:.0f} с)" if usage['quarantine_left'] else "")
+                    for usage in api_client.keys.stats()
+                )
+
+        from kivy.clock import Clock
+        def update(dt):
+            self.debug_text = text
+        Clock.schedule_once(update, 0)
+    
+    def update_suggestions(self, text):
+        """Подсказки никнеймов из локального справочника по мере ввода"""
+        box = self.ids.suggestions
+        box.clear_widgets()
+        # Справочник загружается в фоне: пока его нет, подсказок тоже нет
+        directory = player_directory
+        if directory is None or not text.strip():
+            return
+        
+        from faceit_analyze.lobby import extract_nickname, is_batch_input
+        from kivy.factory import Factory
+        
+        if is_batch_input(text):
+            return
+        nickname = extract_nickname(text)
+        for entry_nickname, _, current in directory.suggest(nickname):
+            if entry_nickname.lower() == nickname.lower():
+                continue
+            label = entry_nickname if current in (None, entry_nickname) else f"{entry_nickname} > {current}"
+            button = Factory.MatrixButton(text=label, font_size='12sp', padding=[8, 4])
+            button.bind(on_press=lambda _, name=current or entry_nickname: self.pick_suggestion(name))
+            box.add_widget(button)
+    
+    def pick_suggestion(self, nickname):
+        """Подставляет выбранную подсказку и сразу сканирует игрока"""
+        self.ids.nickname_input.text = nickname
+        self.ids.suggestions.clear_widgets()
+        self.fetch_stats(nickname)
     
     def fetch_stats(self, nickname):
-        """Запускает отдельный поток для получения статистики"""
+        """Ставит сканирование в планировщик; предыдущее незавершённое отменяется"""
+        self.ids.suggestions.clear_widgets()
         if not nickname:
             self.update_output("[color=ff5500]Введите никнейм или ссылку на профиль[/color]")
             return
-            
+        
+        from faceit_analyze.lobby import extract_nickname, is_batch_input
+        
+        # Комната матча или несколько никнеймов сканируются как лобби
+        if is_batch_input(nickname):
+            key, target = ("lobby", nickname.strip().lower()), self._fetch_lobby_thread
+        else:
+            key, target = ("player", extract_nickname(nickname).lower()), self._fetch_stats_thread
+        # Повторное нажатие во время того же сканирования ничего не перезапускает
+        if self.scheduler.is_pending(key):
+            return
+        
+        self._shown_stats = None
         self.update_output("Получение данных...")
-        threading.Thread(target=self._fetch_stats_thread, args=(nickname,)).start()
+        self.scheduler.submit(key, self._run_scan_job, target, nickname)
     
-    def _fetch_stats_thread(self, nickname):
-        """Получает статистику игрока в отдельном потоке"""
+    def watch(self, text):
+        """Запускает наблюдение за игроками или комнатой матча вместо разового сканирования"""
+        if not text.strip():
+            self.update_output("[color=ff5500]Введите никнеймы или ссылку на комнату матча[/color]")
+            return
+        key = ("watch", text.strip().lower())
+        if self.scheduler.is_pending(key):
+            return
+        
+        self._shown_stats = None
+        self.update_output("Подготовка наблюдения...")
+        self.scheduler.submit(key, self._run_scan_job, self._watch_thread, text)
+    
+    def set_map_view(self, sort_label=None, min_matches=None):
+        """
+        Меняет сортировку или порог матчей таблицы карт и перерисовывает
+        показанного игрока: без запросов к API и без пересчёта карт
+        """
+        if sort_label in MAP_SORTS:
+            self.map_sort = sort_label
+        if min_matches:
+            self.map_min_matches = int(min_matches)
+        # Пока идёт новое сканирование, настройки применятся к его результату
+        if self._shown_stats is not None and not self.scheduler.is_busy():
+            self._format_and_display_stats(*self._shown_stats, keep_scroll=True)
+    
+    def _run_scan_job(self, ticket, target, text):
+        """Выполняет сканирование в потоке планировщика, привязав вывод к ticket"""
+        self._scan_local.ticket = ticket
+        try:
+            target(text, ticket.cancelled)
+        finally:
+            self._scan_local.ticket = None
+    
+    def _fetch_stats_thread(self, nickname, cancel=None):
+        """Получает статистику игрока в потоке планировщика"""
+        from faceit_analyze.cache import MAX_STALE
+        from faceit_analyze.lobby import extract_nickname
+        from faceit_analyze.pipeline import run_scan
+        
         try:
             # Извлекаем никнейм из URL если пользователь ввел ссылку
-            if "/" in nickname:
-                parts = nickname.rstrip("/").split("/")
-                nickname = parts[-1]
+            nickname = extract_nickname(nickname)
             
-            # Получаем данные по API
+            # Получаем данные по API: после поиска игрока статистика и страна
+            # запрашиваются параллельно, промежуточные результаты приходят в _on_scan_stage
             self.update_output(f"Поиск игрока {nickname}...")
-            player_data = self._get_player_data(nickname)
-            
-            if not player_data:
-                self.update_output(f"[color=ff3300]Игрок {nickname} не найден[/color]")
+            client, _ = get_services()
+            directory = get_directory()
+            # Известный никнейм или player_id: поиск по никнейму не нужен
+            player_id = directory.resolve(nickname)
+            result = run_scan(client, nickname, on_stage=self._on_scan_stage, player_id=player_id, cancel=cancel,
+                              max_stale=MAX_STALE)
+            if cancel is not None and cancel.is_set():
                 return
             
-            player_id = player_data.get("player_id")
-            self.update_output(f"Получение статистики для {nickname} (ID: {player_id})...")
-            
-            # Получаем статистику для CS:2 (game_id=cs2)
-            stats_data = self._get_stats_data(player_id, "cs2")
+            if not result.player_data:
+                similar = ", ".join(entry[0] for entry in directory.fuzzy(nickname))
+                hint = f"\nВозможно, вы имели в виду: [color=ff5500]{similar}[/color]" if similar else ""
+                self.update_output(f"[color=ff3300]Игрок {nickname} не найден[/color]{hint}")
+                return
+            directory.add_player(result.player_data)
             
-            # Если нет данных CS:2, попробуем получить для CS:GO
-            if not stats_data or not stats_data.get("segments"):
-                self.update_output(f"Статистика CS:2 для {nickname} не найдена. Пробуем CS:GO...")
-                stats_data = self._get_stats_data(player_id, "csgo")
+            self._refresh_debug_overlay(result.timings)
             
             # Форматируем и отображаем полученные данные
-            if stats_data:
-                self._format_and_display_stats(player_data, stats_data)
+            if result.stats:
+                self._format_and_display_stats(result.player_data, result.stats, result.country_name,
+                                               stale_age=result.stale_age)
+                # Текущая форма: история догружается после показа основной статистики
+                recent = self._load_recent_form(result, cancel)
+                if cancel is not None and cancel.is_set():
+                    return
+                if recent:
+                    self._format_and_display_stats(result.player_data, result.stats, result.country_name, recent,
+                                                   result.stale_age)
             else:
                 self.update_output(f"[color=ff3300]Статистика для {nickname} не найдена[/color]")
         
@@ -145,232 +381,227 @@ class StatsLayout(BoxLayout):
             self.update_output(f"[color=ff3300]Ошибка: {str(e)}[/color]")
             logger.error(f"Ошибка обработки данных игрока {nickname}: {str(e)}")
     
-    def _get_player_data(self, nickname):
-        """Получает данные об игроке по API Faceit"""
-        url = f"{BASE_URL}/players?nickname={nickname}"
-        headers = {
-            "Accept": "application/json",
-            "Authorization": f"Bearer {API_KEY}"
-        }
+    def _fetch_lobby_thread(self, text, cancel=None):
+        """Сканирует всех игроков лобби в потоке планировщика"""
+        from faceit_analyze.cache import MAX_STALE
+        from faceit_analyze.lobby import scan_lobby
         
         try:
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                return response.json()
-                
-            if response.status_code == 404:
-                return None
-                
-            logger.warning(f"Ошибка API: {response.status_code} - {response.text}")
-            return None
-            
-        except Exception as e:
-            logger.error(f"Ошибка запроса данных игрока: {str(e)}")
-            return None
+            def on_player(result, done, total):
+                self.update_output(f"Сканирование лобби: {done}/{total} игроков...")
+
+            self.update_output("Сканирование лобби...")
+            client, _ = get_services()
+            teams = scan_lobby(client, text, on_player=on_player, cancel=cancel, max_stale=MAX_STALE)
+            if cancel is not None and cancel.is_set():
+                return
+            if teams is None:
+                self.update_output("[color=ff3300]Матч не найден[/color]")
+                return
+            self.update_rows(self._format_lobby(teams))
+            get_directory().add_many((result.player_data.get("nickname"), result.player_data.get("player_id"))
+                                     for team in teams for result in team.results if result.player_data)
 
-    def _get_stats_data(self, player_id, game_id):
-        """Получает статистику игрока по API Faceit"""
-        url = f"{BASE_URL}/players/{player_id}/stats/{game_id}"
-        headers = {
-            "Accept": "application/json",
-            "Authorization": f"Bearer {API_KEY}"
-        }
-        
-        try:
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                return response.json()
-                
-            logger.warning(f"Ошибка API статистики: {response.status_code} - {response.text}")
-            return None
-            
         except Exception as e:
-            logger.error(f"Ошибка запроса статистики: {str(e)}")
-            return None
-    
-    def _calculate_avg_stats(self, lifetime, segments, game_id):
-        """Улучшенный и более агрессивный поиск убийств и смертей"""
-        # Безопасное извлечение числовых значений
-        def safe_number(value, default=0):
-            if value is None:
-                return default
-            try:
-                # Удаляем все нечисловые символы, кроме точки
-                if isinstance(value, str):
-                    value = ''.join(c for c in value if c.isdigit() or c == '.')
-                return int(float(value)) if value else default
-            except (ValueError, TypeError):
-                return default
-        
-        # Переменные для суммирования из сегментов
-        match_count = 0
-        kills_count = 0
-        deaths_count = 0
+            self.update_output(f"[color=ff3300]Ошибка: {str(e)}[/color]")
+            logger.error(f"Ошибка сканирования лобби: {str(e)}")
+
+    def _watch_thread(self, text, cancel):
+        """Опрашивает игроков до отмены наблюдения новым запросом"""
+        from faceit_analyze.watch import LobbyWatcher
         
-        # Перебираем все сегменты и суммируем их значения
-        for segment in segments:
-            if 'stats' in segment:
-                stats = segment.get('stats', {})
-                segment_name = segment.get('label', 'Неизвестный')
-                
-                try:
-                    # Пытаемся извлечь число матчей
-                    matches_keys = ['Matches', 'Games']
-                    segment_matches = 0
-                    for key in matches_keys:
-                        if key in stats:
-                            segment_matches = safe_number(stats.get(key))
-                            if segment_matches > 0:
-                                break
-                    
-                    # Пытаемся извлечь убийства разными способами
-                    kill_keys = ['Kills', 'K', 'Total Kills', 'Frags']
-                    segment_kills = 0
-                    for key in kill_keys:
-                        if key in stats:
-                            segment_kills = safe_number(stats.get(key))
-                            if segment_kills > 0:
-                                break
-                    
-                    # Пытаемся извлечь смерти разными способами
-                    death_keys = ['Deaths', 'D', 'Total Deaths']
-                    segment_deaths = 0
-                    for key in death_keys:
-                        if key in stats:
-                            segment_deaths = safe_number(stats.get(key))
-                            if segment_deaths > 0:
-                                break
-                    
-                    if segment_matches > 0:
-                        match_count += segment_matches
-                        kills_count += segment_kills
-                        deaths_count += segment_deaths
-                except Exception as e:
-                    logger.error(f"Ошибка при обработке сегмента '{segment_name}': {e}")
+        # Номер строки каждого игрока в области вывода: обновления меняют только её
+        row_index = {}
         
-        # Выбор лучшего результата из доступных данных
-        total_matches = 0
-        total_kills = 0
-        total_deaths = 0
+        def on_update(watcher, players):
+            if row_index:
+                self.patch_rows({row_index[player.player_id]: make_row(self._format_watch_row(player), mono=True)
+                                 for player in players})
+                return
+            # Первый опрос: заголовок и строки всех игроков, по командам для комнаты матча
+            rows = self._watch_header(watcher)
+            get_directory().add_many((player.nickname, player.player_id) for player in watcher.players)
+            team = None
+            for player in watcher.players:
+                if player.team and player.team != team:
+                    team = player.team
+                    rows += [make_row(), make_row(f">> КОМАНДА: [color=ff5500]{team}[/color]")]
+                row_index[player.player_id] = len(rows)
+                rows.append(make_row(self._format_watch_row(player), mono=True))
+            self.update_rows(rows)
         
-        # Используем значения из сегментов, если там данные полнее
-        if match_count > 0 and kills_count > 0:
-            total_matches = match_count
-            total_kills = kills_count
-            total_deaths = deaths_count
-        else:
-            # Если в сегментах нет данных, используем lifetime
-            if 'Matches' in lifetime:
-                total_matches = safe_number(lifetime.get('Matches'))
-            
-            # Пробуем найти K/D и вычислить киллы через K/D и смерти
-            if 'Average K/D Ratio' in lifetime and total_matches > 0:
-                kd = float(lifetime.get('Average K/D Ratio', '0'))
-                
-                # Если есть смерти и K/D, можем оценить киллы
-                if 'Deaths' in lifetime or 'Total Deaths' in lifetime:
-                    deaths_val = lifetime.get('Deaths', lifetime.get('Total Deaths', 0))
-                    total_deaths = safe_number(deaths_val)
-                    
-                    # Оцениваем киллы через K/D
-                    total_kills = int(kd * total_deaths)
+        def on_status(watcher):
+            if row_index:
+                self.patch_rows(dict(enumerate(self._watch_header(watcher))))
         
-        # Расчет средних значений
-        if total_matches > 0:
-            avg_kills = f"{total_kills / total_matches:.1f}" if total_kills > 0 else "Н/Д"
-            avg_deaths = f"{total_deaths / total_matches:.1f}" if total_deaths > 0 else "Н/Д"
+        try:
+            watcher = LobbyWatcher(*get_services(), text)
+            if not watcher.run(on_update, cancel, on_status=on_status) and not cancel.is_set():
+                self.update_output("[color=ff3300]Игроки или матч для наблюдения не найдены[/color]")
+        except Exception as e:
+            self.update_output(f"[color=ff3300]Ошибка: {str(e)}[/color]")
+            logger.error(f"Ошибка наблюдения за лобби: {str(e)}")
+    
+    def _watch_header(self, watcher):
+        """Строки заголовка наблюдения (всегда четыре): статус матча, интервал опроса, колонки"""
+        status = f">> НАБЛЮДЕНИЕ: [color=ff5500]{len(watcher.players)}[/color] игроков"
+        if watcher.match_id:
+            status += f"   МАТЧ: [color=ff5500]{watcher.match_status or 'Н/Д'}[/color]"
+        poll = f"ОПРОС КАЖДЫЕ [color=ff5500]{watcher.interval:.0f}[/color] с"
+        if watcher.error:
+            poll += f"   [color=ff3300]ошибка API: {watcher.error}[/color]"
+        columns = f"{'ИГРОК':<16} {'LVL':>3} {'ELO':>5} {'+/-':>5} {'СЕРИЯ':>5}  {'ФОРМА':<5} {'МАТЧЕЙ':>6}"
+        return [make_row(status), make_row(poll), make_row(), make_row(columns, mono=True)]
+    
+    def _format_watch_row(self, player):
+        """Строка таблицы наблюдения для одного игрока"""
+        if player.error and player.elo is None:
+            return f"[color=ff3300]{player.nickname[:16]:<16} ошибка API[/color]"
+        change = player.elo_change
+        if change:
+            color = "33cc33" if change > 0 else "ff3300"
+            change = f"[color={color}]{change:>+5}[/color]"
         else:
-            avg_kills = "Н/Д"
-            avg_deaths = "Н/Д"
-        
-        return avg_kills, avg_deaths, total_matches, total_kills, total_deaths
+            change = f"{'0' if change == 0 else 'Н/Д':>5}"
+        streak = f"{'W' if player.streak > 0 else 'L'}{abs(player.streak)}" if player.streak else "-"
+        return (f"[color=ff5500]{player.nickname[:16]:<16}[/color] {fmt_value(player.level):>3} "
+                f"{fmt_value(player.elo):>5} {change} {streak:>5}  {player.form or '-':<5} {player.new_matches:>6}")
     
-    def _analyze_maps(self, segments, game_id):
-        """
-        Анализирует статистику по картам, используя готовые данные из API
-        вместо повторного расчета средних значений
-        """
-        map_stats = []
+    def _format_lobby(self, teams):
+        """Компактная сравнительная таблица игроков по командам: строка на игрока"""
+        from faceit_analyze.lobby import summarize_player, summarize_team
+        from faceit_analyze.team import get_team_aggregate
         
-        # Анализируем каждый сегмент (карту)
-        for segment in segments:
-            # Если это не карта, а другой тип сегмента - пропускаем
-            if not segment.get("label") or "stats" not in segment:
-                continue
-                
-            map_name = segment.get("label", "Unknown")
-            map_data = segment.get("stats", {})
+        rows = []
+        stale = [result.stale_age for team in teams for result in team.results if result.stale_age is not None]
+        if stale:
+            rows += [make_row(f"[color=ffaa00]{self._format_stale_note(max(stale))}[/color]"), make_row()]
+        for team in teams:
+            players = [summarize_player(result) for result in team.results]
+            team_summary = summarize_team(players)
+            aggregate = get_team_aggregate(team.name, team.results)
             
-            try:
-                matches = int(map_data.get("Matches", 0))
-                if matches >= 3:  # Минимум 3 матча для статистики
-                    # Сначала пробуем найти готовые средние значения в API
-                    avg_kills_str = map_data.get("Average Kills", "")
-                    
-                    # Если готовых данных нет, используем наш расчет
-                    if not avg_kills_str:
-                        map_kills = int(map_data.get("Total Kills", 0))
-                        map_avg_kills = map_kills / matches if matches > 0 else 0
-                    else:
-                        # Используем готовые данные из API
-                        map_avg_kills = float(avg_kills_str)
-                    
-                    # Получаем K/D и винрейт
-                    win_rate = int(map_data.get("Win Rate %", 0))
-                    kd_str = map_data.get("Average K/D Ratio", "0")
-                    avg_kd = float(kd_str) if kd_str and kd_str != "0" else 0
-                    
-                    # Рейтинг карты (60% винрейт + 40% К/Д)
-                    map_rating = (win_rate * 0.6) + (avg_kd * 40)
-                    
-                    map_stats.append({
-                        "name": map_name,
-                        "matches": matches,
-                        "win_rate": win_rate,
-                        "kd": avg_kd,
-                        "avg_kills": map_avg_kills,
-                        "rating": map_rating
-                    })
-            except Exception as e:
-                logger.error(f"Ошибка при анализе карты {map_name}: {e}")
+            if rows:
+                rows += separator_rows()
+            rows.append(make_row(f">> КОМАНДА: [color=ff5500]{team.name}[/color]"))
+            rows.append(make_row(f"СРЕДНИЙ ELO: [color=ff5500]{fmt_value(team_summary['avg_elo'], '{:.0f}')}[/color]   "
+                                 f"СРЕДНИЙ K/D: [color=ff5500]{fmt_value(team_summary['avg_kd'], '{:.2f}')}[/color]"))
+            if aggregate.kd_spread is not None:
+                rows.append(make_row(f"РАЗБРОС K/D: [color=ff5500]{aggregate.kd_min:.2f} - {aggregate.kd_max:.2f}[/color]   "
+                                     f"КАРТЫ КОМАНДЫ (+/-): [color=ff5500]{aggregate.best_map or '-'} / "
+                                     f"{aggregate.worst_map or '-'}[/color]"))
+            # Винрейт команды на самых сильных картах, по матчам всех игроков
+            top_maps = "   ".join(f"{item['name']} {item['win_rate']:.0f}%" for item in aggregate.ranked()[:4])
+            if top_maps:
+                rows.append(make_row(f"ВИНРЕЙТ ПО КАРТАМ: {top_maps}"))
+            rows.append(make_row())
+            rows.append(make_row(f"{'ИГРОК':<16} {'LVL':>3} {'ELO':>5} {'K/D':>5} {'WR%':>4} {'AVG K':>5} {'МАТЧЕЙ':>6}  КАРТЫ (+/-)",
+                                 mono=True))
+            for row in players:
+                if row["error"]:
+                    text = f"[color=ff3300]{row['nickname'][:16]:<16} ошибка API[/color]"
+                elif not row["found"]:
+                    text = f"[color=ff3300]{row['nickname'][:16]:<16} не найден[/color]"
+                else:
+                    maps = f"{row['best_map'] or '-'} / {row['worst_map'] or '-'}"
+                    text = (f"[color=ff5500]{row['nickname'][:16]:<16}[/color] "
+                            f"{fmt_value(row['level']):>3} {fmt_value(row['elo']):>5} {fmt_value(row['kd'], '{:.2f}'):>5} "
+                            f"{fmt_value(row['win_rate'], '{:.0f}'):>4} {row['avg_kills']:>5} {row['matches']:>6}  {maps}")
+                rows.append(make_row(text, mono=True))
+        return rows
+
+    def _load_recent_form(self, result, cancel=None):
+        """
+        Синхронизирует историю матчей игрока и считает показатели последних
+        матчей; новое сканирование (cancel) прерывает синхронизацию
+        """
+        from faceit_analyze.history import RECENT_MATCHES, sync_history
         
-        # Определение лучшей и худшей карт
-        best_map = None
-        worst_map = None
+        client, store = get_services()
+        player_id = result.player_data.get("player_id")
+        items = []
+        try:
+            # Для строки формы нужны только последние RECENT_MATCHES матчей, а не вся история
+            sync_history(client, store, player_id, result.game_id, max_matches=RECENT_MATCHES,
+                         on_items=items.extend, cancel=cancel)
+        except Exception as e:
+            # Без свежей истории показываем то, что уже есть в базе
+            logger.error(f"Ошибка синхронизации истории матчей {player_id}: {str(e)}")
+        get_directory().add_history_items(items)
+        if cancel is not None and cancel.is_set():
+            return None
+        self._prefetch(player_id, result.game_id, items)
+        return store.frame(player_id, result.game_id).last(RECENT_MATCHES).summary()
+    
+    def _prefetch(self, player_id, game_id, items):
+        """Греет кэш для напарников и соперников из истории, пока пользователь читает результат"""
+        if not items:
+            return
+        if self.prefetcher is None:
+            from faceit_analyze.prefetch import Prefetcher
+            client, _ = get_services()
+            self.prefetcher = Prefetcher(client, busy=self.scheduler.is_busy)
+        self.prefetcher.submit_history(player_id, game_id, items)
+
+    def _on_scan_stage(self, stage, result):
+        """Показывает частичный результат по мере завершения этапов сканирования"""
+        from faceit_analyze.pipeline import STAGE_COUNTRY, STAGE_CSGO_FALLBACK, STAGE_PLAYER
         
-        if map_stats:
-            sorted_maps = sorted(map_stats, key=lambda x: x["rating"], reverse=True)
-            
-            if sorted_maps:
-                best_map = sorted_maps[0]
-                
-            if len(sorted_maps) > 1:
-                worst_map = sorted_maps[-1]
+        nickname = result.nickname
+        if stage == STAGE_PLAYER:
+            player_id = result.player_data.get("player_id")
+            status = f"Получение статистики для {nickname} (ID: {player_id})..."
+        elif stage == STAGE_COUNTRY:
+            status = f"Получение статистики для {nickname}..."
+        elif stage == STAGE_CSGO_FALLBACK:
+            status = f"Статистика CS:2 для {nickname} не найдена. Пробуем CS:GO..."
+        else:
+            return
+        self.update_output(self._format_profile_preview(result) + status)
+    
+    def _format_profile_preview(self, result):
+        """Краткий блок профиля, доступный до получения статистики"""
+        player_data = result.player_data
+        games = player_data.get("games", {}).get("csgo", {}) or player_data.get("games", {}).get("cs2", {}) or {}
         
-        return best_map, worst_map
+        preview = f">> ИГРОК: [color=ff5500]{player_data.get('nickname', 'Н/Д')}[/color]\n"
+        if result.country_name:
+            preview += f"СТРАНА: [color=ff5500]{result.country_name}[/color]\n"
+        preview += f"УРОВЕНЬ: [color=ff5500]{games.get('skill_level', 'Н/Д')}[/color]\n"
+        preview += f"ELO: [color=ff5500]{games.get('faceit_elo', 'Н/Д')}[/color]\n\n"
+        return preview
     
-    def _format_and_display_stats(self, player_data, stats_data):
-        """Форматирует и отображает статистику игрока"""
+    def _calculate_avg_stats(self, lifetime, segments, game_id):
+        """Улучшенный и более агрессивный поиск убийств и смертей"""
+        from faceit_analyze.analysis import calculate_avg_stats
+        return calculate_avg_stats(lifetime, segments, game_id)
+    
+    def _format_and_display_stats(self, player_data, stats, country_name=None, recent=None, stale_age=None,
+                                  keep_scroll=False):
+        """Форматирует и отображает статистику игрока; stale_age - возраст данных из кэша, если API не ответил"""
+        from faceit_analyze.analysis import get_map_table
+        
         try:
             nickname = player_data.get("nickname", "Н/Д")
-            country_code = player_data.get("country", "Н/Д")
             
-            # Преобразуем код страны в полное название
-            country_name = get_country_name(country_code)
+            # Преобразуем код страны в полное название, если конвейер ещё не сделал этого
+            if country_name is None:
+                from faceit_analyze.countries import get_country_name
+                country_name = get_country_name(player_data.get("country", "Н/Д"))
             
             games = player_data.get("games", {}).get("csgo", {}) or player_data.get("games", {}).get("cs2", {}) or {}
             skill_level = games.get("skill_level", "Н/Д")
             faceit_elo = games.get("faceit_elo", "Н/Д")
             
-            lifetime = stats_data.get("lifetime", {})
-            segments = stats_data.get("segments", [])
+            lifetime = stats.lifetime
+            segments = stats.segments
             
             # Определяем игру на основе полученных данных
             game_name = "CS:2"
             game_id = "cs2"
             
-            if segments and "game" in segments[0]:
-                if segments[0]["game"] == "csgo":
+            if segments and segments[0].game:
+                if segments[0].game == "csgo":
                     game_name = "CS:GO"
                     game_id = "csgo"
                     # Показываем сообщение если это CS:ГО данные
@@ -380,97 +611,170 @@ class StatsLayout(BoxLayout):
             # Расчет средних значений
             avg_kills, avg_deaths, total_matches, total_kills, total_deaths = self._calculate_avg_stats(lifetime, segments, game_id)
             
-            # Анализ карт
-            best_map, worst_map = self._analyze_maps(segments, game_id)
+            # Анализ карт: таблица считается один раз на ответ статистики
+            map_table = get_map_table(stats)
+            best_map, worst_map = map_table.best_and_worst()
             
-            # Длинный разделитель блоков
-            line_separator = "\n[color=ff5500]" + "-" * 80 + "[/color]\n\n"
+            # Каждая строка вывода - отдельный элемент RecycleView
+            rows = []
             
             # === БЛОК 1: Основная информация ===
-            stats_text = f">> ИГРОК: [color=ff5500]{nickname}[/color]\n"
-            stats_text += f"СТРАНА: [color=ff5500]{country_name}[/color]\n"  # Используем country_name вместо country
-            stats_text += f"УРОВЕНЬ: [color=ff5500]{skill_level}[/color]\n"
-            stats_text += f"ИГРА: [color=ff5500]{game_name}[/color]\n"
-            stats_text += f"МАТЧЕЙ СЫГРАНО: [color=ff5500]{total_matches}[/color]\n"
+            rows.append(make_row(f">> ИГРОК: [color=ff5500]{nickname}[/color]"))
+            if stale_age is not None:
+                rows.append(make_row(f"[color=ffaa00]{self._format_stale_note(stale_age)}[/color]"))
+            rows.append(make_row(f"СТРАНА: [color=ff5500]{country_name}[/color]"))  # Используем country_name вместо country
+            rows.append(make_row(f"УРОВЕНЬ: [color=ff5500]{skill_level}[/color]"))
+            rows.append(make_row(f"ИГРА: [color=ff5500]{game_name}[/color]"))
+            rows.append(make_row(f"МАТЧЕЙ СЫГРАНО: [color=ff5500]{total_matches}[/color]"))
             
             # Форматирование чисел с разделителями тысяч
             formatted_kills = f"{total_kills:,}".replace(',', ' ')
             formatted_deaths = f"{total_deaths:,}".replace(',', ' ')
 
             # И использовать их в выводе:
-            stats_text += f"ВСЕГО УБИЙСТВ: [color=ff5500]{formatted_kills}[/color]\n"
-            stats_text += f"ВСЕГО СМЕРТЕЙ: [color=ff5500]{formatted_deaths}[/color]\n"
+            rows.append(make_row(f"ВСЕГО УБИЙСТВ: [color=ff5500]{formatted_kills}[/color]"))
+            rows.append(make_row(f"ВСЕГО СМЕРТЕЙ: [color=ff5500]{formatted_deaths}[/color]"))
 
             # Разделитель
-            stats_text += line_separator
+            rows += separator_rows()
             
             # === БЛОК 2: Детальная статистика ===
-            stats_text += f"ELO: [color=ff5500]{faceit_elo}[/color]\n"
-            stats_text += f"K/D: [color=ff5500]{lifetime.get('Average K/D Ratio', 'Н/Д')}[/color]\n"
-            stats_text += f"AVG KILLS: [color=ff5500]{avg_kills}[/color]\n"
-            stats_text += f"AVG DEATHS: [color=ff5500]{avg_deaths}[/color]\n"
-            stats_text += f"ХЕДШОТЫ: [color=ff5500]{lifetime.get('Average Headshots %', 'Н/Д')}[/color]%\n"
-            stats_text += f"ТЕКУЩАЯ СЕРИЯ: [color=ff5500]{lifetime.get('Current Win Streak', 'Н/Д')} побед[/color]\n"
-            stats_text += f"РЕКОРДНАЯ СЕРИЯ: [color=ff5500]{lifetime.get('Longest Win Streak', 'Н/Д')} побед[/color]\n"
+            rows.append(make_row(f"ELO: [color=ff5500]{faceit_elo}[/color]"))
+            rows.append(make_row(f"K/D: [color=ff5500]{fmt_value(lifetime.kd, '{:.2f}')}[/color]"))
+            rows.append(make_row(f"AVG KILLS: [color=ff5500]{avg_kills}[/color]"))
+            rows.append(make_row(f"AVG DEATHS: [color=ff5500]{avg_deaths}[/color]"))
+            rows.append(make_row(f"ХЕДШОТЫ: [color=ff5500]{fmt_value(lifetime.headshots, '{:.0f}')}[/color]%"))
+            rows.append(make_row(f"ТЕКУЩАЯ СЕРИЯ: [color=ff5500]{fmt_value(lifetime.current_win_streak, '{:.0f}')} побед[/color]"))
+            rows.append(make_row(f"РЕКОРДНАЯ СЕРИЯ: [color=ff5500]{fmt_value(lifetime.longest_win_streak, '{:.0f}')} побед[/color]"))
             
             # Разделитель
-            stats_text += line_separator
+            rows += separator_rows()
             
             # === БЛОК 3: Статистика карт ===
-            stats_text += "КАРТЫ:\n\n"
+            rows.append(make_row("КАРТЫ:"))
+            rows.append(make_row())
             
             # Лучшая карта
             if best_map:
-                stats_text += f"ЛУЧШАЯ: [color=ff5500]{best_map['name']}[/color]\n"
-                stats_text += f"• Матчей: {best_map['matches']}\n"
-                stats_text += f"• Винрейт: {best_map['win_rate']}%\n"
-                stats_text += f"• K/D: {best_map['kd']:.2f}\n"
-                stats_text += f"• Средние киллы: {best_map['avg_kills']:.1f}\n\n"
+                rows.append(make_row(f"ЛУЧШАЯ: [color=ff5500]{best_map['name']}[/color]"))
+                rows.append(make_row(f"• Матчей: {best_map['matches']}"))
+                rows.append(make_row(f"• Винрейт: {best_map['win_rate']}%"))
+                rows.append(make_row(f"• K/D: {best_map['kd']:.2f}"))
+                rows.append(make_row(f"• Средние киллы: {best_map['avg_kills']:.1f}"))
+                rows.append(make_row())
             else:
-                stats_text += "ЛУЧШАЯ: [color=aaaaaa]недостаточно данных[/color]\n\n"
+                rows.append(make_row("ЛУЧШАЯ: [color=aaaaaa]недостаточно данных[/color]"))
+                rows.append(make_row())
             
             # Худшая карта
             if worst_map:
-                stats_text += f"ХУДШАЯ: [color=ff3300]{worst_map['name']}[/color]\n"
-                stats_text += f"• Матчей: {worst_map['matches']}\n"
-                stats_text += f"• Винрейт: {worst_map['win_rate']}%\n"
-                stats_text += f"• K/D: {worst_map['kd']:.2f}\n"
-                stats_text += f"• Средние киллы: {worst_map['avg_kills']:.1f}\n"
+                rows.append(make_row(f"ХУДШАЯ: [color=ff3300]{worst_map['name']}[/color]"))
+                rows.append(make_row(f"• Матчей: {worst_map['matches']}"))
+                rows.append(make_row(f"• Винрейт: {worst_map['win_rate']}%"))
+                rows.append(make_row(f"• K/D: {worst_map['kd']:.2f}"))
+                rows.append(make_row(f"• Средние киллы: {worst_map['avg_kills']:.1f}"))
             else:
-                stats_text += "ХУДШАЯ: [color=aaaaaa]недостаточно данных[/color]\n"
+                rows.append(make_row("ХУДШАЯ: [color=aaaaaa]недостаточно данных[/color]"))
+            
+            # Все карты: сортировка и порог задаются над областью вывода
+            rows += separator_rows()
+            rows += self._format_map_table(map_table)
             
-            self.update_output(stats_text)
+            # === БЛОК 4: Последние матчи ===
+            if recent:
+                rows += separator_rows()
+                rows.append(make_row(f"ПОСЛЕДНИЕ {recent['matches']} МАТЧЕЙ:"))
+                rows.append(make_row())
+                rows.append(make_row(f"ФОРМА: [color=ff5500]{recent['form'] or 'Н/Д'}[/color]"))
+                rows.append(make_row(f"ВИНРЕЙТ: [color=ff5500]{fmt_value(recent['win_rate'], '{:.0f}')}%[/color]"))
+                rows.append(make_row(f"K/D: [color=ff5500]{fmt_value(recent['kd'], '{:.2f}')}[/color]"))
+                rows.append(make_row(f"AVG KILLS: [color=ff5500]{recent['avg_kills']:.1f}[/color]"))
+                rows.append(make_row(f"ХЕДШОТЫ: [color=ff5500]{fmt_value(recent['hs_pct'], '{:.0f}')}%[/color]"))
+                rows.append(make_row(f"ADR: [color=ff5500]{fmt_value(recent['adr'], '{:.1f}')}[/color]"))
+            
+            if self._output_current():
+                self._shown_stats = (player_data, stats, country_name, recent, stale_age)
+            self.update_rows(rows, keep_scroll=keep_scroll)
             
         except Exception as e:
             self.update_output(f"[color=ff3300]Ошибка при обработке данных: {str(e)}[/color]")
             logger.error(f"Ошибка форматирования данных: {str(e)}")
     
+    def _format_stale_note(self, stale_age):
+        """Пометка о данных из кэша: их возраст и идёт ли обновление"""
+        minutes = stale_age / 60
+        age = f"{minutes:.0f} мин" if minutes < 90 else f"{minutes / 60:.0f} ч"
+        if api_client is not None and api_client.breaker.is_open():
+            return f"ДАННЫЕ ИЗ КЭША ({age} назад): API НЕДОСТУПЕН"
+        return f"ДАННЫЕ ИЗ КЭША ({age} назад), ОБНОВЛЯЮТСЯ В ФОНЕ"
+
+    def _format_map_table(self, map_table):
+        """Строки таблицы всех карт; карты с малой выборкой приглушены"""
+        ranked = map_table.ranked(MAP_SORTS[self.map_sort], self.map_min_matches)
+        rows = [make_row(f"ВСЕ КАРТЫ: [color=ff5500]{len(ranked)}[/color] (от {self.map_min_matches} матчей, "
+                         f"сортировка: {self.map_sort})"), make_row()]
+        if not ranked:
+            return rows + [make_row("[color=aaaaaa]недостаточно данных[/color]")]
+        rows.append(make_row(f"{'#':>2} {'КАРТА':<14} {'МАТЧЕЙ':>6} {'WR%':>4} {'K/D':>5} {'AVG K':>5} "
+                             f"{'РЕЙТИНГ':>7} {'ДОВЕРИЕ':>7}", mono=True))
+        for place, item in enumerate(ranked, 1):
+            text = (f"{place:>2} {item['name'][:14]:<14} {item['matches']:>6} {item['win_rate']:>4} "
+                    f"{item['kd']:>5.2f} {item['avg_kills']:>5.1f} {item['weighted_rating']:>7.1f} "
+                    f"{item['confidence'] * 100:>6.0f}%")
+            color = "ff5500" if item["confidence"] >= 0.5 else "aaaaaa"
+            rows.append(make_row(f"[color={color}]{text}[/color]", mono=True))
+        return rows
+    
     def update_output(self, text):
-        """Обновляет текст вывода в основном потоке приложения"""
+        """Выводит текст сообщения (каждая строка - отдельная строка области вывода)"""
+        self.update_rows([make_row(line) for line in text.split("\n")])
+    
+    def update_rows(self, rows, keep_scroll=False):
+        """
+        Заменяет содержимое области вывода в основном потоке приложения.
+        RecycleView создаёт виджеты только для видимых строк. Вывод из потока
+        сканирования, которое уже заменено новым запросом, отбрасывается
+        """
         from kivy.clock import Clock
+        requested = time.perf_counter()
+        def rendered(dt):
+            metrics.observe("faceit_ui_update_seconds", time.perf_counter() - requested)
+        def update():
+            output = self.ids.output
+            output.data = rows
+            if not keep_scroll:
+                output.scroll_y = 1
+            # Видимые строки пересобираются к следующему кадру: замер до него
+            Clock.schedule_once(rendered, 0)
+        self._run_on_main(update)
+    
+    def patch_rows(self, changes):
+        """Заменяет отдельные строки {номер: строка}, остальные строки не перерисовываются"""
+        def update():
+            data = self.ids.output.data
+            for index, row in changes.items():
+                if index < len(data) and data[index] != row:
+                    data[index] = row
+        self._run_on_main(update)
+    
+    def _output_current(self):
+        """Актуален ли вывод текущего потока (основной поток - всегда)"""
+        ticket = getattr(self._scan_local, "ticket", None)
+        return ticket is None or ticket.is_current()
+    
+    def _run_on_main(self, apply):
+        """Выполняет apply() в основном потоке, если запрос текущего потока ещё актуален"""
+        from kivy.clock import Clock
+        ticket = getattr(self._scan_local, "ticket", None)
+        if ticket is not None and not ticket.is_current():
+            return
         def update(dt):
-            self.output_text = text
+            # Повторная проверка: запрос мог устареть, пока обновление ждало кадра
+            if ticket is not None and not ticket.is_current():
+                return
+            apply()
         Clock.schedule_once(update, 0)
 
-def get_country_name(country_code):
-    """Преобразует код страны в полное название с использованием API"""
-    try:
-        url = f"https://restcountries.com/v3.1/alpha/{country_code}"
-        response = requests.get(url)
-        
-        if response.status_code == 200:
-            data = response.json()
-            # Пытаемся найти русское название в переводах
-            if 'translations' in data[0] and 'rus' in data[0]['translations']:
-                return data[0]['translations']['rus']['common']
-            # Если нет русского названия, используем английское
-            return data[0]['name']['common']
-        else:
-            return country_code
-    except Exception as e:
-        logger.error(f"Ошибка при получении названия страны: {e}")
-        return country_code
-
 # Дизайн интерфейса остаётся без изменений
 KV = """
 <MatrixButton@Button>:
@@ -493,6 +797,18 @@ KV = """
     color: 1, 1, 1, 1  # Изменяем на белый цвет для лучшей видимости
     padding: [15, 10]
 
+# Длинные строки переносятся, и высота строки растёт по тексту
+<OutputRow@Label>:
+    mono: False
+    text_size: self.width, None
+    size_hint_y: None
+    height: max(dp(22), self.texture_size[1])
+    halign: "left"
+    valign: "middle"
+    color: 1, 0.33, 0, 1
+    markup: True
+    font_name: "RobotoMono-Regular" if self.mono else "Roboto"
+
 <StatsLayout>:
     orientation: "vertical"
     padding: "10dp"
@@ -525,14 +841,15 @@ KV = """
         TextInput:
             id: nickname_input
             multiline: False
-            hint_text: "Введите никнейм игрока или ссылку на профиль"
+            hint_text: "Никнейм, ссылка на профиль, несколько никнеймов или ссылка на комнату матча"
             background_color: 0.1, 0.05, 0.02, 1
             foreground_color: 1, 0.33, 0, 1
             cursor_color: 1, 0.33, 0, 1
             font_size: '16sp'
             padding: [15, 12]
             on_text_validate: root.fetch_stats(self.text)
-            size_hint_x: 0.7
+            on_text: root.update_suggestions(self.text)
+            size_hint_x: 0.6
             size_hint_y: None
             height: "50dp"
             
@@ -543,35 +860,98 @@ KV = """
             scroll_x: 0
             scroll_y: 1
             
-            input_filter: lambda text, from_undo: text[:50]
+            input_filter: lambda text, from_undo: text[:400]
 
         MatrixButton:
             text: "SCAN"
-            size_hint_x: 0.3
+            size_hint_x: 0.2
             size_hint_y: None
             height: "50dp"
             on_press: root.fetch_stats(nickname_input.text)
 
-    # Область вывода
-    ScrollView:
+        MatrixButton:
+            text: "WATCH"
+            size_hint_x: 0.2
+            size_hint_y: None
+            height: "50dp"
+            on_press: root.watch(nickname_input.text)
+
+    # Подсказки никнеймов из справочника найденных игроков
+    BoxLayout:
+        id: suggestions
+        size_hint_y: None
+        height: "30dp" if self.children else 0
+        opacity: 1 if self.children else 0
+        orientation: "horizontal"
+        spacing: "6dp"
+
+    # Таблица карт: сортировка и порог матчей меняются без повторного запроса
+    BoxLayout:
+        size_hint_y: None
+        height: "36dp"
+        orientation: "horizontal"
+        spacing: "10dp"
+        padding: [0, 6, 0, 0]
+        
+        Label:
+            text: "КАРТЫ:"
+            size_hint_x: None
+            width: "70dp"
+            color: 1, 0.33, 0, 1
+            bold: True
+        
+        Spinner:
+            id: map_sort
+            text: "РЕЙТИНГ"
+            values: ["РЕЙТИНГ", "ВИНРЕЙТ", "K/D", "МАТЧИ", "AVG KILLS"]
+            background_color: 0.1, 0.05, 0.02, 1
+            color: 1, 0.33, 0, 1
+            on_text: root.set_map_view(sort_label=self.text)
+        
+        Label:
+            text: "ОТ МАТЧЕЙ:"
+            size_hint_x: None
+            width: "90dp"
+            color: 1, 0.33, 0, 1
+        
+        Spinner:
+            id: map_min_matches
+            values: ["1", "3", "5", "10", "20", "50"]
+            size_hint_x: 0.5
+            background_color: 0.1, 0.05, 0.02, 1
+            color: 1, 0.33, 0, 1
+            on_text: root.set_map_view(min_matches=self.text)
+
+    # Область вывода: виртуализированный список строк, виджеты есть только у видимых
+    RecycleView:
+        id: output
+        viewclass: "OutputRow"
         do_scroll_x: False
         bar_width: 10
         bar_color: 1, 0.33, 0, 0.7
         bar_inactive_color: 0.4, 0.2, 0, 0.2
         effect_cls: "ScrollEffect"
-        scroll_y: 1
+        scroll_type: ["bars", "content"]
         
-        Label:
-            text: root.output_text if root.output_text != "_" else ""
-            text_size: self.width - 20, None
+        RecycleBoxLayout:
+            orientation: "vertical"
+            # Высота ещё не показанных строк; показанные подстраиваются под свой текст
+            default_size: None, dp(22)
+            default_size_hint: 1, None
             size_hint_y: None
-            height: max(self.texture_size[1], 400)
-            halign: "left"
-            valign: "top"
+            height: self.minimum_height
             padding: [20, 20]
-            color: 1, 0.33, 0, 1
-            markup: True
-            line_height: 1.1
+    
+    # Отладочная панель (F12): тайминги этапов и счётчики
+    Label:
+        text: root.debug_text
+        size_hint_y: None
+        height: self.texture_size[1] if root.debug_text else 0
+        opacity: 1 if root.debug_text else 0
+        text_size: self.width, None
+        font_size: '11sp'
+        color: 0.6, 0.8, 0.6, 1
+        halign: "left"
     
     # Подвал
     Label:
@@ -588,31 +968,65 @@ class FaceitAnalyzeApp(App):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         # Установка иконки для окна Kivy и для Windows
-        self.icon = icon_path
+        if icon_path:
+            self.icon = icon_path
         self.title = 'FACEIT ANALYZE'
         
-    @staticmethod
-    def resource_path(relative_path):
-        """Получает абсолютный путь к ресурсу, работает как в упакованной, так и в обычной версии"""
-        if getattr(sys, 'frozen', False):
-            base_path = sys._MEIPASS
-        else:
-            base_path = os.path.dirname(os.path.abspath(__file__))
-        
-        return os.path.join(base_path, relative_path)
+    resource_path = staticmethod(resource_path)
     
     def build(self):
         # Настройка иконки для окна и для приложения
-        self.icon = icon_path
+        if icon_path:
+            self.icon = icon_path
+            
+            # Явно устанавливаем иконку для окна
+            try:
+                Window.set_icon(icon_path)
+            except Exception as e:
+                logger.error(f"Ошибка установки иконки для окна: {e}")
         
-        # Явно устанавливаем иконку для окна
+        Builder.load_string(KV)
+        layout = StatsLayout()
+        startup.mark("build")
+        return layout
+
+    def on_start(self):
+        from kivy.clock import Clock
+        # Первый кадр отрисован - окно готово к вводу
+        Clock.schedule_once(self._on_first_frame, 0)
+
+    def _on_first_frame(self, dt):
+        startup.mark("first_frame")
+        report = startup.finish()
+        if report:
+            print(report, file=sys.stderr)
+        # Остальное - в фоне, пока пользователь вводит никнейм
+        threading.Thread(target=self._warm_up, daemon=True, name="faceit-warm-up").start()
+
+    def _warm_up(self):
+        """Загружает сетевой стек и модули анализа, создаёт иконку, если её не было"""
         try:
-            Window.set_icon(icon_path)
+            get_services()
+            get_directory().warm()
+            for module in ("faceit_analyze.lobby", "faceit_analyze.matchframe", "faceit_analyze.watch"):
+                importlib.import_module(module)
         except Exception as e:
-            logger.error(f"Ошибка установки иконки для окна: {e}")
-        
-        Builder.load_string(KV)
-        return StatsLayout()
+            logger.error(f"Ошибка фоновой загрузки модулей: {e}")
+        if icon_path is None:
+            from kivy.clock import Clock
+            path = ensure_icon_exists()
+            Clock.schedule_once(lambda dt: Window.set_icon(path), 0)
+
+    def on_stop(self):
+        # Отменяем незавершённое сканирование, чтобы его поток не держал процесс
+        if self.root is not None:
+            self.root.scheduler.shutdown()
+            if self.root.prefetcher is not None:
+                self.root.prefetcher.close()
+        # Закрываем пул соединений и базу истории при выходе, если они создавались
+        if api_client is not None:
+            api_client.close()
+            match_store.close()
 
 # Запуск приложения
 if __name__ == "__main__":
@@ -624,7 +1038,7 @@ if __name__ == "__main__":
             ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(app_id)
             
             # Дополнительная регистрация для .exe файлов
-            if getattr(sys, 'frozen', False):
+            if getattr(sys, 'frozen', False) and icon_path:
                 import win32con
                 import win32gui
                 import win32api
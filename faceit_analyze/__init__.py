@@ -0,0 +1 @@
+"""Ядро FACEIT Analyze: работа с FACEIT Data API и анализ статистики"""
@@ -0,0 +1,6 @@
+"""Запуск консольного анализа: python -m faceit_analyze"""
+import sys
+
+from faceit_analyze.cli import main
+
+sys.exit(main())
@@ -0,0 +1,148 @@
+"""Расчёт средних значений и анализ карт по разобранной статистике FACEIT"""
+import logging
+
+from faceit_analyze.env import _env_int
+
+logger = logging.getLogger('faceit_tracker')
+
+# Минимум матчей на карте для лучшей/худшей карты и таблицы карт по умолчанию
+MIN_MAP_MATCHES = _env_int("FACEIT_MAP_MIN_MATCHES", 3)
+# Сколько матчей нужно карте, чтобы её рейтинг учитывался наполовину (остальное - среднее по картам)
+CONFIDENCE_MATCHES = _env_int("FACEIT_MAP_CONFIDENCE_MATCHES", 10)
+
+# Поля, по которым можно сортировать таблицу карт
+SORT_KEYS = ("weighted_rating", "rating", "win_rate", "kd", "matches", "avg_kills")
+
+
+def calculate_avg_stats(lifetime, segments, game_id):
+    """
+    Суммирует матчи, убийства и смерти по сегментам (MapSegment), а если
+    в них нет данных - оценивает по lifetime (LifetimeStats)
+    """
+    # Переменные для суммирования из сегментов
+    match_count = 0
+    kills_count = 0
+    deaths_count = 0
+
+    for segment in segments:
+        if segment.matches > 0:
+            match_count += segment.matches
+            kills_count += segment.kills
+            deaths_count += segment.deaths
+
+    # Выбор лучшего результата из доступных данных
+    total_matches = 0
+    total_kills = 0
+    total_deaths = 0
+
+    # Используем значения из сегментов, если там данные полнее
+    if match_count > 0 and kills_count > 0:
+        total_matches = match_count
+        total_kills = kills_count
+        total_deaths = deaths_count
+    else:
+        # Если в сегментах нет данных, используем lifetime
+        total_matches = lifetime.matches
+
+        # Если есть смерти и K/D, можем оценить киллы
+        if lifetime.kd is not None and total_matches > 0 and lifetime.deaths is not None:
+            total_deaths = lifetime.deaths
+            total_kills = int(lifetime.kd * total_deaths)
+
+    # Расчет средних значений
+    if total_matches > 0:
+        avg_kills = f"{total_kills / total_matches:.1f}" if total_kills > 0 else "Н/Д"
+        avg_deaths = f"{total_deaths / total_matches:.1f}" if total_deaths > 0 else "Н/Д"
+    else:
+        avg_kills = "Н/Д"
+        avg_deaths = "Н/Д"
+
+    return avg_kills, avg_deaths, total_matches, total_kills, total_deaths
+
+
+def map_rating(win_rate, kd):
+    """Рейтинг карты: 60% винрейт + 40% К/Д; работает и с массивами NumPy"""
+    return win_rate * 0.6 + kd * 40
+
+
+def map_confidence(matches, confidence_matches=CONFIDENCE_MATCHES):
+    """Доля собственного рейтинга карты при сглаживании к среднему; работает и с массивами NumPy"""
+    if confidence_matches <= 0:
+        return matches * 0 + 1.0
+    return matches / (matches + confidence_matches)
+
+
+def analyze_maps(segments, game_id):
+    """
+    Лучшая и худшая карты по рейтингу (60% винрейт + 40% К/Д) среди карт
+    с достаточным числом матчей
+    """
+    return MapTable(segments).best_and_worst()
+
+
+class MapTable:
+    """
+    Все карты игрока с показателями и рейтингом, считается один раз на ответ
+    статистики (см. get_map_table). Для карт с малым числом матчей рейтинг
+    сглаживается к среднему по всем картам: weighted_rating =
+    (n * rating + C * среднее) / (n + C), confidence = n / (n + C).
+    Отсортированные выборки запоминаются, поэтому смена сортировки или
+    порога ничего не пересчитывает
+    """
+
+    def __init__(self, segments, confidence_matches=CONFIDENCE_MATCHES):
+        self.maps = []
+        for segment in segments:
+            # Сегменты без названия или без матчей - не карты
+            if not segment.label or segment.matches < 1:
+                continue
+
+            # Сначала пробуем готовое среднее из API, иначе считаем сами
+            if segment.average_kills is not None:
+                map_avg_kills = segment.average_kills
+            else:
+                map_avg_kills = segment.kills / segment.matches
+
+            self.maps.append({
+                "name": segment.label,
+                "matches": segment.matches,
+                "win_rate": segment.win_rate,
+                "kd": segment.kd,
+                "avg_kills": map_avg_kills,
+                "rating": map_rating(segment.win_rate, segment.kd),
+            })
+
+        total = sum(item["matches"] for item in self.maps)
+        prior = sum(item["rating"] * item["matches"] for item in self.maps) / total if total else 0.0
+        for item in self.maps:
+            matches = item["matches"]
+            item["confidence"] = map_confidence(matches, confidence_matches)
+            item["weighted_rating"] = item["confidence"] * item["rating"] + (1 - item["confidence"]) * prior
+        self._ranked = {}
+
+    def ranked(self, sort="weighted_rating", min_matches=MIN_MAP_MATCHES, descending=True):
+        """Карты не меньше чем с min_matches матчами, отсортированные по полю sort (одно из SORT_KEYS)"""
+        key = (sort, min_matches, descending)
+        ranked = self._ranked.get(key)
+        if ranked is None:
+            if sort not in SORT_KEYS:
+                raise ValueError(f"Неизвестное поле сортировки карт: {sort}")
+            ranked = sorted((item for item in self.maps if item["matches"] >= min_matches),
+                            key=lambda item: item[sort], reverse=descending)
+            self._ranked[key] = ranked
+        return ranked
+
+    def best_and_worst(self, min_matches=MIN_MAP_MATCHES):
+        """Лучшая и худшая карты по рейтингу; худшей нет, если подходящая карта одна"""
+        ranked = self.ranked("rating", min_matches)
+        best_map = ranked[0] if ranked else None
+        worst_map = ranked[-1] if len(ranked) > 1 else None
+        return best_map, worst_map
+
+
+def get_map_table(stats):
+    """Таблица карт для PlayerStats: строится при первом обращении и хранится вместе со статистикой"""
+    table = stats.map_table
+    if table is None:
+        table = stats.map_table = MapTable(stats.segments)
+    return table
@@ -0,0 +1,92 @@
+"""
+Запросы к эндпоинтам FACEIT Data API. None означает, что ресурс не найден;
+FaceitAPIError (квота, ошибка сервера, сеть) передаётся вызывающему коду.
+С max_stale (интерфейс передаёт MAX_STALE) профиль и статистика, устаревшие
+не больше чем на max_stale, отдаются из кэша сразу и обновляются в фоне (см.
+FaceitClient.get_json). По умолчанию устаревшая запись сначала
+перепроверяется: CLI и пакетный анализ завершаются раньше, чем фоновое
+обновление успело бы сохраниться
+"""
+import logging
+
+from faceit_analyze.cache import MATCH_TTL, PROFILE_TTL, STATS_TTL
+from faceit_analyze.client import FaceitAPIError
+
+logger = logging.getLogger('faceit_tracker')
+
+
+def get_player_data(client, nickname, max_stale=None):
+    """Получает данные об игроке по никнейму"""
+    try:
+        return client.get_json("players", params={"nickname": nickname}, ttl=PROFILE_TTL, max_stale=max_stale)
+    except FaceitAPIError:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка запроса данных игрока: {str(e)}")
+        return None
+
+
+def get_player_by_id(client, player_id, ttl=PROFILE_TTL, max_stale=None):
+    """Получает данные об игроке по player_id (без поиска по никнейму)"""
+    try:
+        return client.get_json(f"players/{player_id}", ttl=ttl, max_stale=max_stale)
+    except FaceitAPIError:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка запроса данных игрока {player_id}: {str(e)}")
+        return None
+
+
+def get_match_data(client, match_id, ttl=MATCH_TTL):
+    """Получает данные комнаты матча (составы команд, статус)"""
+    try:
+        return client.get_json(f"matches/{match_id}", ttl=ttl)
+    except FaceitAPIError:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка запроса матча {match_id}: {str(e)}")
+        return None
+
+
+def get_stats_data(client, player_id, game_id, max_stale=None, cancel=None):
+    """
+    Получает lifetime-статистику игрока по игре. Если установлен
+    threading.Event cancel, пока запрос ждёт квоту, он не отправляется
+    (RequestCancelled)
+    """
+    try:
+        return client.get_json(f"players/{player_id}/stats/{game_id}", ttl=STATS_TTL, max_stale=max_stale,
+                               cancel=cancel)
+    except FaceitAPIError:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка запроса статистики: {str(e)}")
+        return None
+
+
+def get_match_history(client, player_id, game_id, offset=0, limit=100, since=None):
+    """
+    Страница истории матчей игрока (сначала новые); since - unix-время начала
+    выборки. Без него API отдаёт только последний месяц
+    """
+    params = {"game": game_id, "offset": offset, "limit": limit}
+    if since is not None:
+        params["from"] = int(since)
+    try:
+        return client.get_json(f"players/{player_id}/history", params=params)
+    except FaceitAPIError:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка запроса истории матчей {player_id}: {str(e)}")
+        return None
+
+
+def get_match_stats(client, match_id, cancel=None):
+    """Статистика всех игроков матча по картам (раундам серии); cancel - как у get_stats_data"""
+    try:
+        return client.get_json(f"matches/{match_id}/stats", cancel=cancel)
+    except FaceitAPIError:
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка запроса статистики матча {match_id}: {str(e)}")
+        return None
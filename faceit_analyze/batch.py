@@ -0,0 +1,333 @@
+"""
+Пакетный анализ больших списков игроков (десятки тысяч никнеймов) в
+нескольких процессах: входной файл режется на куски, каждый процесс
+сканирует свой кусок в пуле потоков, так что и ожидание API, и разбор
+ответов идут параллельно. Прогресс сохраняется в файл контрольной точки,
+и прерванное задание продолжается с места остановки.
+
+Внутри процесса ввод-вывод идёт в потоках, а не в asyncio: скорость
+задаёт общая квота ключей, а не число одновременных запросов. Доле квоты
+процесса хватает нескольких потоков (запрос отпускает GIL на время
+ожидания сети). Асинхронному клиенту понадобились бы отдельная
+HTTP-библиотека и вторая копия пула ключей, повторов, автомата защиты и
+кэша, а быстрее задание не стало бы.
+
+Запуск: python -m faceit_analyze.batch nicknames.txt -o report.jsonl
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from faceit_analyze.env import _env_int
+
+logger = logging.getLogger('faceit_tracker')
+
+# Сколько игроков в одном куске задания: кусок - единица работы процесса и контрольной точки
+CHUNK_SIZE = _env_int("FACEIT_BATCH_CHUNK", 200)
+# Сколько процессов и потоков сканирования в каждом из них
+PROCESSES = _env_int("FACEIT_BATCH_PROCESSES", os.cpu_count() or 2)
+THREADS = _env_int("FACEIT_BATCH_THREADS", 8)
+# Как часто выводится прогресс, сек
+PROGRESS_INTERVAL = 5.0
+
+FORMATS = ("jsonl", "csv")
+CHECKPOINT_VERSION = 1
+
+# Клиент API процесса-обработчика, создаётся в _init_worker
+_client = None
+_threads = THREADS
+
+
+def read_nicknames(path):
+    """Никнеймы из файла; пустые строки и # комментарии пропускаются, ссылки на профили разбираются"""
+    from faceit_analyze.lobby import extract_nickname
+
+    with open(path, encoding="utf-8") as f:
+        return [extract_nickname(line) for line in (line.strip() for line in f)
+                if line and not line.startswith("#")]
+
+
+def worker_keys(api_keys, index, processes):
+    """
+    Ключи процесса index из processes и доля квоты каждого ключа: если ключей
+    хватает, процессы получают разные ключи целиком, иначе делят квоту общих
+    """
+    if len(api_keys) >= processes:
+        return api_keys[index::processes], 1.0
+    return api_keys, 1.0 / processes
+
+
+def _init_worker(api_keys, processes, slots, use_cache, threads):
+    """Инициализатор процесса: свои ключи, своя доля квоты и свой клиент"""
+    global _client, _threads
+    from faceit_analyze.client import RATE_BURST, RATE_LIMIT, FaceitClient
+    from faceit_analyze.keypool import KeyPool
+
+    # Прерывание обрабатывает родительский процесс (см. run_job)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s',
+                        stream=sys.stderr)
+    # Номер процесса берётся из общей очереди: пул не сообщает его сам
+    index = slots.get()
+    keys, share = worker_keys(api_keys, index, processes)
+    cache = None
+    if use_cache:
+        from faceit_analyze.cache import ResponseCache
+        cache = ResponseCache()
+    # Соединений - по числу потоков ввода-вывода scan_players, иначе лишние закрываются после каждого запроса
+    _client = FaceitClient(KeyPool(keys, RATE_LIMIT * share, max(1.0, RATE_BURST * share)), cache=cache,
+                           pool_maxsize=threads * 3)
+    _threads = threads
+
+
+def _analyze_chunk(index, nicknames):
+    """Сканирует кусок задания в процессе-обработчике: (index, отчёты)"""
+    from faceit_analyze.report import build_report, scan_players
+
+    return index, [build_report(result) for result in scan_players(_client, nicknames, _threads)]
+
+
+class Checkpoint:
+    """
+    Прогресс задания в JSON рядом с выходным файлом: готовые куски и длина
+    выходного файла после последнего из них. При продолжении выходной файл
+    обрезается до этой длины, так что строки недописанного куска не дублируются
+    """
+
+    def __init__(self, path, source, chunk_size, fmt):
+        self.path = path
+        self.source = os.path.abspath(source)
+        self.chunk_size = chunk_size
+        self.format = fmt
+        self.done = set()
+        self.offset = 0
+        self.players = 0
+        self.errors = 0
+
+    @classmethod
+    def load(cls, path, source, chunk_size, fmt):
+        """Контрольная точка того же задания или None; другое задание - ValueError"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        checkpoint = cls(path, source, chunk_size, fmt)
+        if (data.get("version"), data.get("source"), data.get("chunk_size"), data.get("format")) != \
+                (CHECKPOINT_VERSION, checkpoint.source, chunk_size, fmt):
+            raise ValueError(f"{path} относится к другому заданию (файл, размер куска или формат); "
+                             f"используйте --restart")
+        checkpoint.done = set(data["done"])
+        checkpoint.offset = data["offset"]
+        checkpoint.players = data["players"]
+        checkpoint.errors = data["errors"]
+        return checkpoint
+
+    def save(self):
+        # Запись через временный файл: падение во время записи не портит прежнюю точку
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump({"version": CHECKPOINT_VERSION, "source": self.source, "chunk_size": self.chunk_size,
+                       "format": self.format, "done": sorted(self.done), "offset": self.offset,
+                       "players": self.players, "errors": self.errors}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.path)
+
+
+def _format_rows(reports, fmt, header=False):
+    """Отчёты куска одной строкой для записи в выходной файл"""
+    from faceit_analyze.report import FIELDS
+
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=FIELDS, lineterminator="\n")
+        if header:
+            writer.writeheader()
+        writer.writerows(reports)
+    else:
+        for report in reports:
+            buffer.write(json.dumps(report, ensure_ascii=False) + "\n")
+    return buffer.getvalue()
+
+
+class Progress:
+    """Счётчики задания и строка прогресса: игроков в секунду считается только по этому запуску"""
+
+    def __init__(self, total, players=0, errors=0):
+        self.total = total
+        self.players = players
+        self.errors = errors
+        self.started = time.monotonic()
+        self._resumed = players
+        self._reported = 0.0
+
+    def add(self, reports):
+        from faceit_analyze.report import STATUS_ERROR
+
+        self.players += len(reports)
+        self.errors += sum(1 for report in reports if report["status"] == STATUS_ERROR)
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return (self.players - self._resumed) / elapsed if elapsed > 0 else 0.0
+
+    def line(self):
+        return (f"{self.players}/{self.total} игроков ({self.players * 100 / max(1, self.total):.1f}%), "
+                f"{self.rate:.1f} игроков/с, ошибок API: {self.errors}")
+
+    def report(self, force=False, out=sys.stderr):
+        now = time.monotonic()
+        if force or now - self._reported >= PROGRESS_INTERVAL:
+            self._reported = now
+            print(self.line(), file=out, flush=True)
+
+
+def run_job(source, output, api_keys, fmt="jsonl", processes=PROCESSES, threads=THREADS,
+            chunk_size=CHUNK_SIZE, use_cache=False, restart=False):
+    """
+    Выполняет (или продолжает) задание: анализирует никнеймы из source и
+    дописывает отчёты в output по мере готовности кусков, в порядке готовности.
+    Возвращает Progress с итогами
+    """
+    import multiprocessing
+
+    nicknames = read_nicknames(source)
+    chunks = [nicknames[start:start + chunk_size] for start in range(0, len(nicknames), chunk_size)]
+    checkpoint_path = output + ".checkpoint"
+    checkpoint = None if restart else Checkpoint.load(checkpoint_path, source, chunk_size, fmt)
+    if checkpoint is None:
+        checkpoint = Checkpoint(checkpoint_path, source, chunk_size, fmt)
+        mode = "w"
+    else:
+        mode = "r+"
+        logger.info(f"Продолжение задания: готово кусков {len(checkpoint.done)} из {len(chunks)}")
+
+    progress = Progress(len(nicknames), checkpoint.players, checkpoint.errors)
+    pending = [index for index in range(len(chunks)) if index not in checkpoint.done]
+    processes = max(1, min(processes, len(pending))) if pending else 1
+    slots = multiprocessing.Queue()
+    for index in range(processes):
+        slots.put(index)
+
+    with open(output, mode, encoding="utf-8", newline="") as out:
+        # Строки куска, который не успел попасть в контрольную точку, отбрасываются
+        out.seek(checkpoint.offset)
+        out.truncate()
+        if not pending:
+            return progress
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(api_keys, processes, slots, use_cache, threads)) as pool:
+            # В очереди пула держится не больше двух кусков на процесс: остальные ждут в списке
+            queue = iter(pending)
+            running = set()
+            stopping = False
+            while True:
+                try:
+                    while not stopping and len(running) < processes * 2:
+                        index = next(queue, None)
+                        if index is None:
+                            break
+                        running.add(pool.submit(_analyze_chunk, index, chunks[index]))
+                    if not running:
+                        break
+                    done, running = wait(running, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if not future.cancelled():
+                            _write_chunk(out, checkpoint, progress, fmt, *future.result())
+                    progress.report()
+                except KeyboardInterrupt:
+                    if stopping:
+                        raise
+                    # Обработчики не получают Ctrl+C: начатые куски дописываются, не начатые отменяются
+                    stopping = True
+                    print("Прерывание: дописываются уже начатые куски", file=sys.stderr, flush=True)
+                    for future in running:
+                        future.cancel()
+            if stopping:
+                raise KeyboardInterrupt
+    return progress
+
+
+def _write_chunk(out, checkpoint, progress, fmt, index, reports):
+    """Дописывает отчёты куска и только потом отмечает кусок готовым в контрольной точке"""
+    out.write(_format_rows(reports, fmt, header=fmt == "csv" and checkpoint.offset == 0))
+    out.flush()
+    os.fsync(out.fileno())
+    progress.add(reports)
+    checkpoint.done.add(index)
+    checkpoint.offset = out.tell()
+    checkpoint.players = progress.players
+    checkpoint.errors = progress.errors
+    checkpoint.save()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m faceit_analyze.batch",
+        description="Пакетный анализ больших списков игроков FACEIT в нескольких процессах "
+                    "с контрольными точками: прерванное задание продолжается при повторном запуске"
+    )
+    parser.add_argument("input", help="файл с никнеймами или ссылками на профили, по одному на строку")
+    parser.add_argument("-o", "--output", required=True,
+                        help="файл отчётов; рядом создаётся <файл>.checkpoint с прогрессом")
+    parser.add_argument("-f", "--format", choices=FORMATS, default=None,
+                        help="формат отчётов (по умолчанию по расширению output, иначе jsonl)")
+    parser.add_argument("-p", "--processes", type=int, default=PROCESSES, help="число процессов")
+    parser.add_argument("-t", "--threads", type=int, default=THREADS,
+                        help="игроков, сканируемых одновременно в каждом процессе")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="игроков в куске задания")
+    parser.add_argument("--api-key", action="append", default=None,
+                        help="ключ FACEIT Data API; можно повторить или перечислить через запятую. "
+                             "Если ключей не меньше, чем процессов, каждый процесс получает свои")
+    parser.add_argument("--cache", action="store_true",
+                        help="использовать общий кэш ответов на диске (по умолчанию выключен: "
+                             "десятки тысяч игроков всё равно не помещаются в FACEIT_CACHE_MAX_ENTRIES)")
+    parser.add_argument("--restart", action="store_true", help="начать задание заново, не продолжая прежнее")
+    parser.add_argument("-v", "--verbose", action="store_true", help="подробный лог в stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stderr)
+
+    from dotenv import load_dotenv
+
+    from faceit_analyze.env import api_keys_from_env
+
+    load_dotenv()
+    api_keys = [key for value in args.api_key or () for key in value.replace(",", " ").split()] \
+        or api_keys_from_env()
+    if not api_keys:
+        print("FACEIT_API_KEY не найден в переменных окружения. Проверьте файл .env", file=sys.stderr)
+        return 2
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+
+    started = time.monotonic()
+    try:
+        progress = run_job(args.input, args.output, api_keys, fmt, args.processes, args.threads,
+                           max(1, args.chunk), args.cache, args.restart)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка задания: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print("Задание прервано, повторный запуск продолжит его с контрольной точки", file=sys.stderr)
+        return 130
+    progress.report(force=True)
+    print(f"Готово за {time.monotonic() - started:.1f} с", file=sys.stderr)
+    # Код 1, если хотя бы один игрок не проанализирован из-за ошибки API
+    return 1 if progress.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
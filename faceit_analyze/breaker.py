@@ -0,0 +1,114 @@
+"""
+Автомат защиты (circuit breaker) для FACEIT Data API: после серии сетевых
+ошибок и 5xx запросы к API не отправляются, клиент отвечает из кэша, а
+через паузу один пробный запрос проверяет, ожил ли API
+"""
+import logging
+import threading
+import time
+
+from faceit_analyze.env import _env_float, _env_int
+from faceit_analyze.metrics import metrics
+
+logger = logging.getLogger('faceit_tracker')
+
+# Сколько неудачных попыток подряд размыкает автомат
+FAILURE_THRESHOLD = _env_int("FACEIT_BREAKER_FAILURES", 5)
+# Пауза до пробного запроса, сек; после неудачной пробы удваивается до COOLDOWN_MAX
+COOLDOWN = _env_float("FACEIT_BREAKER_COOLDOWN", 15.0)
+COOLDOWN_MAX = _env_float("FACEIT_BREAKER_COOLDOWN_MAX", 120.0)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Значения метрики faceit_circuit_state
+_STATE_CODES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Замкнут - запросы идут как обычно. Разомкнут - allow() ложно до конца
+    паузы. Полуразомкнут - пропускается один пробный запрос: успех замыкает
+    автомат, неудача размыкает его снова на удвоенную паузу. Если проба не
+    сообщила результат за время паузы, пропускается следующая
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN, cooldown_max=COOLDOWN_MAX):
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_cooldown = cooldown
+        self.cooldown_max = max(cooldown, cooldown_max)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._cooldown = cooldown
+        # Время (monotonic), до которого автомат разомкнут; None - замкнут
+        self._open_until = None
+        self._probe_at = None
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self._open_until is None:
+            return CLOSED
+        return OPEN if now < self._open_until else HALF_OPEN
+
+    def is_open(self):
+        """Разомкнут ли автомат: до конца паузы или пока идёт проба запросы не имеет смысла отправлять"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(now)
+            return state == OPEN or (state == HALF_OPEN and self._probe_at is not None
+                                     and now - self._probe_at < self._cooldown)
+
+    @property
+    def retry_in(self):
+        """Через сколько секунд будет пробный запрос (0 - автомат замкнут или проба уже возможна)"""
+        with self._lock:
+            return max(0.0, self._open_until - time.monotonic()) if self._open_until is not None else 0.0
+
+    def allow(self):
+        """Можно ли отправить запрос; в полуразомкнутом состоянии - только одну пробу"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(now)
+            if state == CLOSED:
+                return True
+            if state == OPEN or (self._probe_at is not None and now - self._probe_at < self._cooldown):
+                return False
+            self._probe_at = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._open_until is None:
+                return
+            self._open_until = None
+            self._probe_at = None
+            self._cooldown = self.base_cooldown
+        logger.info("API снова отвечает, автомат защиты замкнут")
+        metrics.set("faceit_circuit_state", _STATE_CODES[CLOSED])
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            self._failures += 1
+            state = self._state(now)
+            if state == CLOSED:
+                if self._failures < self.failure_threshold:
+                    return
+            elif state == HALF_OPEN and self._probe_at is not None:
+                # Проба не удалась: пауза удваивается
+                self._cooldown = min(self._cooldown * 2, self.cooldown_max)
+            else:
+                # Запрос, начатый до размыкания, ничего не меняет
+                return
+            self._open_until = now + self._cooldown
+            self._probe_at = None
+            cooldown = self._cooldown
+        logger.warning(f"API не отвечает, запросы приостановлены на {cooldown:.0f} с, ответы - из кэша")
+        metrics.inc("faceit_circuit_opened_total")
+        metrics.set("faceit_circuit_state", _STATE_CODES[OPEN])
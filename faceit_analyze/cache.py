@@ -0,0 +1,143 @@
+"""Постоянный кэш ответов FACEIT Data API в SQLite с TTL и вытеснением по LRU"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+
+from faceit_analyze.env import _env_float, _env_int
+from faceit_analyze.paths import data_dir
+
+logger = logging.getLogger('faceit_tracker')
+
+# Время жизни записей (секунды): профиль (ELO, уровень) меняется чаще,
+# чем lifetime-статистика, поэтому TTL у них разный
+PROFILE_TTL = _env_float("FACEIT_CACHE_PROFILE_TTL", 600)
+STATS_TTL = _env_float("FACEIT_CACHE_STATS_TTL", 1800)
+# Комната матча меняется по ходу игры (статус, счёт), поэтому живёт недолго
+MATCH_TTL = _env_float("FACEIT_CACHE_MATCH_TTL", 60)
+# На сколько сверх TTL профиль и статистика могут устареть, чтобы их
+# показали сразу и обновили в фоне (stale-while-revalidate)
+MAX_STALE = _env_float("FACEIT_CACHE_MAX_STALE", 86400)
+
+# Максимум записей в кэше, лишние вытесняются по давности обращения
+MAX_ENTRIES = _env_int("FACEIT_CACHE_MAX_ENTRIES", 2000)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    body TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+class CacheEntry:
+    """Запись кэша: разобранный JSON и валидаторы для условного запроса"""
+    __slots__ = ("data", "etag", "last_modified", "stored_at")
+
+    def __init__(self, data, etag, last_modified, stored_at):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+
+    @property
+    def age(self):
+        """Возраст записи в секундах"""
+        return time.time() - self.stored_at
+
+    def is_fresh(self, ttl):
+        return self.age < ttl
+
+
+class ResponseCache:
+    """Кэш ответов API в одном файле SQLite, переживает перезапуск приложения"""
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES):
+        self.path = path or os.getenv("FACEIT_CACHE_PATH") or os.path.join(data_dir(), "cache.sqlite3")
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(path, params=None):
+        """Ключ кэша: путь эндпоинта и отсортированные параметры запроса"""
+        key = path.strip("/")
+        if params:
+            key += "?" + urlencode(sorted(params.items()))
+        return key
+
+    def get(self, key):
+        """Возвращает запись (в том числе устаревшую) или None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        try:
+            return CacheEntry(json.loads(row[0]), row[1], row[2], row[3])
+        except ValueError:
+            logger.error(f"Повреждённая запись кэша {key}, удаляем")
+            self.delete(key)
+            return None
+
+    def set(self, key, data, etag=None, last_modified=None, stored_at=None):
+        """
+        Сохраняет ответ и при переполнении вытесняет самые давние записи.
+        stored_at - время получения ответа (unix-время), если не сейчас
+        """
+        now = time.time()
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, etag, last_modified, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, body, etag, last_modified, now if stored_at is None else stored_at, now)
+            )
+            self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if self._count > self.max_entries:
+                self._evict(self._count - self.max_entries)
+
+    def touch(self, key):
+        """Продлевает свежесть записи после ответа 304 Not Modified"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._count = 0
+
+    def _evict(self, excess):
+        """Удаляет excess записей с самым давним обращением (LRU)"""
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+            (excess,)
+        )
+        self._count -= excess
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
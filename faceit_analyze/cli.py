@@ -0,0 +1,205 @@
+"""Консольный пакетный анализ игроков: python -m faceit_analyze nick1 nick2 ..."""
+import argparse
+import csv
+import json
+import logging
+import sys
+
+FORMATS = ("jsonl", "json", "csv")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="faceit-analyze",
+        description="Анализ статистики игроков FACEIT без графического интерфейса. "
+                    "Никнеймы или ссылки на профили берутся из аргументов, а если их нет - из stdin "
+                    "(по одному на строку)."
+    )
+    parser.add_argument("players", nargs="*", help="никнеймы или ссылки на профили FACEIT")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="jsonl",
+                        help="формат вывода (по умолчанию jsonl - одна JSON-строка на игрока)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="сколько игроков сканировать одновременно")
+    parser.add_argument("--api-key", action="append", default=None,
+                        help="ключ FACEIT Data API; можно повторить или перечислить через запятую "
+                             "(по умолчанию FACEIT_API_KEYS или FACEIT_API_KEY из окружения или .env)")
+    parser.add_argument("--team", action="store_true",
+                        help="командный анализ вместо отчёта по каждому игроку: игроки - один состав, "
+                             "ссылка на комнату - обе команды матча, один игрок - его команда из последних матчей")
+    parser.add_argument("--no-cache", action="store_true", help="не использовать кэш ответов на диске")
+    parser.add_argument("--export", metavar="PATH", default=None,
+                        help="дополнительно записать полные результаты (профиль, все карты, ответы API) "
+                             "по мере готовности: .ndjson/.jsonl, .parquet или .arrow (нужен pyarrow)")
+    parser.add_argument("--import", dest="import_path", metavar="PATH", default=None,
+                        help="заполнить кэш ответов из файла --export (например, от напарника); "
+                             "без никнеймов в аргументах только импортирует")
+    parser.add_argument("--import-keep-age", action="store_true",
+                        help="считать импортированные ответы полученными во время экспорта, а не сейчас: "
+                             "устаревшие по TTL будут перепроверены")
+    parser.add_argument("--metrics", metavar="PATH", default=None,
+                        help="записать метрики (тайминги этапов, HTTP, кэш, повторы) в формате Prometheus")
+    parser.add_argument("-v", "--verbose", action="store_true", help="подробный лог в stderr")
+    return parser.parse_args(argv)
+
+
+def read_players(args, stdin=sys.stdin):
+    """Никнеймы из аргументов или из stdin; пустые строки и # комментарии пропускаются"""
+    from faceit_analyze.lobby import extract_nickname
+
+    lines = args.players or stdin
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield extract_nickname(line)
+
+
+def write_reports(reports, fmt, out=sys.stdout, fields=None):
+    """
+    Выводит отчёты в выбранном формате; возвращает число отчётов.
+    fields - колонки CSV (по умолчанию поля отчёта по игроку), прочие ключи в CSV не попадают
+    """
+    from faceit_analyze.report import FIELDS
+
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=fields or FIELDS, lineterminator="\n", extrasaction="ignore")
+        writer.writeheader()
+        for report in reports:
+            writer.writerow(report)
+            count += 1
+    elif fmt == "json":
+        reports = list(reports)
+        json.dump(reports, out, ensure_ascii=False, indent=2)
+        out.write("\n")
+        count = len(reports)
+    else:
+        for report in reports:
+            out.write(json.dumps(report, ensure_ascii=False) + "\n")
+            out.flush()
+            count += 1
+    return count
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stderr)
+
+    # Тяжёлые зависимости (requests, sqlite) загружаются только после разбора аргументов
+    from dotenv import load_dotenv
+
+    from faceit_analyze.client import FaceitClient
+    from faceit_analyze.env import api_keys_from_env
+    from faceit_analyze.metrics import metrics, start_exporters_from_env
+    from faceit_analyze.report import MAX_WORKERS, STATUS_ERROR, build_report, scan_players
+
+    load_dotenv()
+    cache = None
+    if not args.no_cache:
+        from faceit_analyze.cache import ResponseCache
+        cache = ResponseCache()
+
+    if args.import_path:
+        if cache is None:
+            print("--import заполняет кэш ответов и несовместим с --no-cache", file=sys.stderr)
+            return 2
+        from faceit_analyze.directory import PlayerDirectory
+        from faceit_analyze.export import import_records
+        directory = PlayerDirectory()
+        try:
+            players, responses = import_records(args.import_path, cache, directory, fresh=not args.import_keep_age)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"Ошибка импорта {args.import_path}: {e}", file=sys.stderr)
+            return 2
+        finally:
+            directory.close()
+        print(f"Импортировано игроков: {players}, ответов API: {responses}", file=sys.stderr)
+        if not args.players:
+            cache.close()
+            return 0
+
+    api_keys = [key for value in args.api_key or () for key in value.replace(",", " ").split()] \
+        or api_keys_from_env()
+    if not api_keys:
+        print("FACEIT_API_KEY не найден в переменных окружения. Проверьте файл .env", file=sys.stderr)
+        return 2
+
+    writer = None
+    if args.export:
+        from faceit_analyze.export import build_record, open_writer
+        try:
+            writer = open_writer(args.export)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"Ошибка экспорта {args.export}: {e}", file=sys.stderr)
+            return 2
+
+    start_exporters_from_env()
+    client = FaceitClient(api_keys, cache=cache)
+    errors = 0
+    # Возраст данных игроков, отданных из устаревшего кэша вместо ответа API, сек
+    stale = []
+
+    def track(results):
+        nonlocal errors
+        for result in results:
+            report = build_report(result)
+            if writer is not None:
+                writer.write(build_record(result, cache, report))
+            if report["status"] == STATUS_ERROR:
+                errors += 1
+            if report["stale_age"] is not None:
+                stale.append(report["stale_age"])
+            yield report
+
+    try:
+        if args.team:
+            return run_team(client, args, writer, cache)
+        results = scan_players(client, read_players(args), max_workers=args.workers or MAX_WORKERS)
+        write_reports(track(results), args.format)
+        if stale:
+            print(f"API не ответил: данные {len(stale)} игроков взяты из кэша, возрастом до "
+                  f"{max(stale)} с (поле stale_age)", file=sys.stderr)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        if writer is not None:
+            writer.close()
+        client.close()
+        if len(client.keys) > 1:
+            for usage in client.keys.stats():
+                logging.getLogger('faceit_tracker').info(
+                    f"Ключ {usage['key']}: запросов {usage['requests']}, 429 - {usage['throttled']}, "
+                    f"401/403 - {usage['rejected']}")
+        if args.metrics:
+            with open(args.metrics, "w", encoding="utf-8") as f:
+                f.write(metrics.to_prometheus())
+    # Код 1, если хотя бы один игрок не проанализирован из-за ошибки API
+    return 1 if errors else 0
+
+
+def run_team(client, args, writer=None, cache=None):
+    """
+    Командный анализ (--team): отчёт на каждую команду.
+    writer (--export) получает полную запись по каждому просканированному игроку
+    """
+    from faceit_analyze.lobby import MAX_WORKERS
+    from faceit_analyze.team import FIELDS, build_team_report, scan_teams
+
+    # Ввод целиком, а не никнеймы из read_players: ссылка на комнату должна дойти до scan_teams как есть
+    lines = [line.strip() for line in args.players or sys.stdin if not line.strip().startswith("#")]
+    teams = scan_teams(client, " ".join(lines), max_workers=args.workers or MAX_WORKERS)
+    if teams is None:
+        print("Игрок или матч не найден", file=sys.stderr)
+        return 1
+    if writer is not None:
+        from faceit_analyze.export import build_record
+        for team, _ in teams:
+            for result in team.results:
+                writer.write(build_record(result, cache))
+    write_reports((build_team_report(aggregate) for _, aggregate in teams), args.format, fields=FIELDS)
+    # Код 1, если хотя бы один игрок не проанализирован из-за ошибки API
+    return 1 if any(result.error for team, _ in teams for result in team.results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
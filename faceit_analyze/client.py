@@ -0,0 +1,380 @@
+"""Общий HTTP-клиент для FACEIT Data API с пулом keep-alive соединений"""
+import logging
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from faceit_analyze.breaker import CircuitBreaker
+from faceit_analyze.env import _env_float, _env_int
+from faceit_analyze.keypool import AUTH_STATUSES, KeyPool
+from faceit_analyze.metrics import endpoint_label, metrics
+from faceit_analyze.ratelimit import backoff_delay, parse_retry_after
+
+logger = logging.getLogger('faceit_tracker')
+
+BASE_URL = "https://open.faceit.com/data/v4"
+# Адрес API по умолчанию можно заменить, например на общий локальный прокси (faceit_analyze.proxy)
+BASE_URL_ENV = "FACEIT_BASE_URL"
+# Общий секрет прокси, доступного из сети: клиент присылает его в заголовке PROXY_TOKEN_HEADER
+PROXY_TOKEN_ENV = "FACEIT_PROXY_TOKEN"
+PROXY_TOKEN_HEADER = "X-Proxy-Token"
+
+# Таймауты (секунды): без них зависший сокет навсегда блокирует поток сканирования
+CONNECT_TIMEOUT = _env_float("FACEIT_CONNECT_TIMEOUT", 3.05)
+READ_TIMEOUT = _env_float("FACEIT_READ_TIMEOUT", 10.0)
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# Число пулов (по одному на хост) и соединений в пуле каждого хоста
+POOL_CONNECTIONS = _env_int("FACEIT_POOL_CONNECTIONS", 4)
+POOL_MAXSIZE = _env_int("FACEIT_POOL_MAXSIZE", 10)
+
+# Квота одного ключа API: устойчивая скорость (запросов в секунду) и допустимый всплеск
+RATE_LIMIT = _env_float("FACEIT_RATE_LIMIT", 10.0)
+RATE_BURST = _env_float("FACEIT_RATE_BURST", 10.0)
+
+# Повторы при 429, 5xx и обрывах соединения: число попыток сверх первой
+# и экспоненциальная задержка между ними (база и потолок, сек)
+MAX_RETRIES = _env_int("FACEIT_MAX_RETRIES", 4)
+BACKOFF_BASE = _env_float("FACEIT_BACKOFF_BASE", 0.5)
+BACKOFF_MAX = _env_float("FACEIT_BACKOFF_MAX", 8.0)
+
+# Общий срок на запрос вместе со всеми повторами и ожиданием квоты, сек
+REQUEST_DEADLINE = _env_float("FACEIT_REQUEST_DEADLINE", 30.0)
+
+# Срок фонового обновления устаревшей записи кэша (stale-while-revalidate), сек
+REVALIDATE_DEADLINE = _env_float("FACEIT_REVALIDATE_DEADLINE", 10.0)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FaceitAPIError(Exception):
+    """API не ответил по существу: квота, ошибка сервера, сеть или истёк срок"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(FaceitAPIError):
+    """Запрос не отправлен: API недавно не отвечал и автомат защиты разомкнут"""
+
+
+class RequestCancelled(FaceitAPIError):
+    """Запрос не отправлен: вызывающий код отменил его, пока запрос ждал квоту"""
+
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, headers=None):
+    """Создаёт requests.Session с пулом переиспользуемых соединений"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def get_shared_session():
+    """Возвращает общую сессию для сторонних сервисов (без авторизации FACEIT)"""
+    global _shared_session
+    if _shared_session is None:
+        with _shared_session_lock:
+            if _shared_session is None:
+                _shared_session = create_session()
+    return _shared_session
+
+
+class FaceitClient:
+    """
+    Клиент FACEIT Data API: владеет сессией, ключами и таймаутами.
+    api_key - ключ, список ключей или готовый KeyPool; с несколькими
+    ключами запросы распределяются между их квотами
+    """
+
+    def __init__(self, api_key, base_url=None, connect_timeout=CONNECT_TIMEOUT,
+                 read_timeout=READ_TIMEOUT, pool_maxsize=POOL_MAXSIZE, cache=None,
+                 rate_limiter=None, max_retries=MAX_RETRIES, deadline=REQUEST_DEADLINE, breaker=None):
+        self.base_url = (base_url or os.getenv(BASE_URL_ENV) or BASE_URL).rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.cache = cache
+        if isinstance(api_key, KeyPool):
+            self.keys = api_key
+        else:
+            # rate_limiter, если задан, - общий token bucket для всех ключей клиента
+            self.keys = KeyPool([api_key] if isinstance(api_key, str) else api_key,
+                                RATE_LIMIT, RATE_BURST, bucket=rate_limiter)
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker()
+        # Ключ кэша -> stored_at записи, которая отдана устаревшей и ещё не обновлена
+        self._stale = {}
+        # Ключи кэша, которые сейчас обновляются в фоне
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._refresh_pool = None
+        # Пул urllib3 -> сколько его соединений уже учтено в метрике
+        self._connections_seen = weakref.WeakKeyDictionary()
+        self._connections_lock = threading.Lock()
+        # Authorization зависит от выбранного ключа и ставится на каждый запрос
+        session_headers = {"Accept": "application/json"}
+        proxy_token = os.getenv(PROXY_TOKEN_ENV)
+        if proxy_token:
+            session_headers[PROXY_TOKEN_HEADER] = proxy_token
+        self.session = create_session(pool_maxsize=pool_maxsize, headers=session_headers)
+
+    def url_for(self, path):
+        """Собирает полный URL эндпоинта"""
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def get(self, path, params=None, timeout=None, headers=None, deadline=None, cancel=None):
+        """
+        Выполняет GET-запрос к API через общий пул соединений с учётом квоты.
+        429, 5xx и обрывы соединения повторяются с задержкой (Retry-After или
+        экспонента с джиттером), пока не кончатся попытки или срок deadline (сек).
+        После 429 и 401/403 повтор сразу идёт с другим ключом, если он есть.
+        Если повторить не удалось, бросает FaceitAPIError; пока автомат
+        защиты разомкнут - сразу CircuitOpenError, без запроса. Если
+        установлен threading.Event cancel, запрос (или повтор), ещё ждущий
+        квоту, не отправляется - RequestCancelled
+        """
+        url = self.url_for(path)
+        endpoint = endpoint_label(path)
+        timeout = timeout or self.timeout
+        expires = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        rejected = False
+        # Ошибка последней попытки: её получит вызывающий, если повторить не удастся
+        error = None
+        while True:
+            if not self.breaker.allow():
+                metrics.inc("faceit_http_circuit_rejected_total", endpoint=endpoint)
+                # Автомат разомкнулся во время повторов: причина - ошибка предыдущей попытки
+                if error is not None:
+                    raise error
+                raise CircuitOpenError(f"API недоступен, запрос {path} не отправлен "
+                                       f"(повтор через {self.breaker.retry_in:.0f} с)", 503)
+            with metrics.timer("faceit_ratelimit_wait_seconds"):
+                key = self.keys.acquire(expires, cancel)
+            if key is None and cancel is not None and cancel.is_set():
+                metrics.inc("faceit_http_cancelled_total", endpoint=endpoint)
+                raise RequestCancelled(f"Запрос {path} отменён")
+            if key is None:
+                metrics.inc("faceit_http_deadline_exceeded_total", endpoint=endpoint)
+                raise FaceitAPIError(f"Истёк срок запроса {path} в ожидании квоты")
+
+            remaining = expires - time.monotonic()
+            retry_after = None
+            status = None
+            try:
+                response = self._timed_get(url, endpoint, params=params,
+                                           headers=dict(headers or {}, Authorization=key.header),
+                                           timeout=(min(timeout[0], remaining), min(timeout[1], remaining)))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = FaceitAPIError(f"Сетевая ошибка {path}: {e}")
+                reason = "network"
+                self.breaker.record_failure()
+            else:
+                status = response.status_code
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if status == 429 and retry_after is None:
+                    retry_after = backoff_delay(attempt, BACKOFF_BASE, BACKOFF_MAX)
+                error = FaceitAPIError(f"Ошибка API {path}: {status}", status)
+                reason = "throttled" if status == 429 else "rejected" if status in AUTH_STATUSES else "server_error"
+                # 429 и 4xx - API доступен, отказывает квота или запрос
+                if status >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+            finally:
+                # Второй отказ 401/403 подряд скорее говорит о самом ресурсе, чем о ключе
+                quarantined = self.keys.release(key, status, retry_after, reject=not rejected)
+            rejected = rejected or status in AUTH_STATUSES
+
+            # Ключ выведен из оборота, но есть другой: повторяем с ним сразу
+            switch_key = quarantined and self.keys.has_available()
+            if status is not None and status not in RETRY_STATUSES and not switch_key:
+                return response
+            if attempt >= self.max_retries:
+                metrics.inc("faceit_http_failures_total", endpoint=endpoint, reason=reason)
+                raise error
+            if switch_key:
+                delay = 0.0
+            else:
+                delay = retry_after if retry_after is not None else backoff_delay(attempt, BACKOFF_BASE, BACKOFF_MAX)
+            if time.monotonic() + delay >= expires:
+                metrics.inc("faceit_http_deadline_exceeded_total", endpoint=endpoint)
+                raise error
+            metrics.inc("faceit_http_retries_total", endpoint=endpoint, reason=reason)
+            logger.warning(f"{error}, повтор через {delay:.1f} с")
+            if delay:
+                # Отмена прерывает и паузу перед повтором
+                if cancel is not None and cancel.wait(delay):
+                    metrics.inc("faceit_http_cancelled_total", endpoint=endpoint)
+                    raise RequestCancelled(f"Запрос {path} отменён")
+                if cancel is None:
+                    time.sleep(delay)
+            attempt += 1
+
+    def _timed_get(self, url, endpoint, **kwargs):
+        """
+        Один HTTP-запрос с замерами: полное время, время до заголовков ответа
+        и число открытых соединений (каждое - это DNS + TCP + TLS)
+        """
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            metrics.observe("faceit_http_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+            raise
+        metrics.observe("faceit_http_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+        metrics.observe("faceit_http_ttfb_seconds", response.elapsed.total_seconds(), endpoint=endpoint)
+        metrics.inc("faceit_http_responses_total", endpoint=endpoint, status=response.status_code)
+        self._count_new_connections(url)
+        return response
+
+    def _count_new_connections(self, url):
+        """
+        Добавляет в счётчик faceit_http_connections_opened_total соединения,
+        созданные пулами urllib3 с прошлого замера: num_connections пула
+        только растёт, а сам пул может быть вытеснен и создан заново
+        """
+        pools = self.session.get_adapter(url).poolmanager.pools
+        opened = 0
+        with self._connections_lock:
+            for pool_key in pools.keys():
+                pool = pools.get(pool_key)
+                if pool is None:
+                    continue
+                seen = self._connections_seen.get(pool, 0)
+                if pool.num_connections > seen:
+                    opened += pool.num_connections - seen
+                    self._connections_seen[pool] = pool.num_connections
+        if opened:
+            metrics.inc("faceit_http_connections_opened_total", opened)
+
+    def is_cached(self, path, params=None, ttl=None):
+        """Есть ли свежий ответ в кэше, то есть get_json с этим ttl обойдётся без запроса"""
+        if self.cache is None or not ttl:
+            return False
+        entry = self.cache.get(self.cache.make_key(path, params))
+        return entry is not None and entry.is_fresh(ttl)
+
+    def get_json(self, path, params=None, ttl=None, max_stale=None, cancel=None):
+        """
+        Возвращает JSON ответа с учётом кэша: свежая запись отдаётся без запроса,
+        устаревшая перепроверяется по ETag/Last-Modified. С max_stale (сек)
+        запись, устаревшая не больше чем на max_stale, отдаётся сразу, а
+        перепроверка идёт в фоне (stale-while-revalidate). Если API не
+        ответил или автомат защиты разомкнут, отдаётся запись любого возраста
+        (см. stale_age). None - если ресурс не найден; прочие ошибки API
+        бросают FaceitAPIError, чтобы их не принимали за отсутствие игрока.
+        cancel - как у get
+        """
+        key = None
+        entry = None
+        headers = None
+        if ttl:
+            # Допустимый возраст ответа для промежуточного кэша (общего прокси)
+            headers = {"Cache-Control": f"max-age={int(ttl)}"}
+        if self.cache is not None and ttl:
+            key = self.cache.make_key(path, params)
+            entry = self.cache.get(key)
+            if entry is not None:
+                if entry.is_fresh(ttl):
+                    metrics.inc("faceit_cache_requests_total", result="hit")
+                    return entry.data
+                if self.breaker.is_open():
+                    return self._serve_stale(key, entry, "offline")
+                if entry.etag:
+                    headers["If-None-Match"] = entry.etag
+                if entry.last_modified:
+                    headers["If-Modified-Since"] = entry.last_modified
+                if max_stale and entry.is_fresh(ttl + max_stale):
+                    self._revalidate_later(key, path, params, entry, headers)
+                    return self._serve_stale(key, entry, "stale")
+
+        try:
+            response = self.get(path, params=params, headers=headers, cancel=cancel)
+        except RequestCancelled:
+            raise
+        except FaceitAPIError:
+            if entry is None:
+                raise
+            return self._serve_stale(key, entry, "offline")
+        return self._store(key, path, entry, response)
+
+    def _store(self, key, path, entry, response):
+        """Разбирает ответ на запрос get_json и обновляет кэш"""
+        if response.status_code == 304 and entry is not None:
+            metrics.inc("faceit_cache_requests_total", result="revalidated")
+            self.cache.touch(key)
+            self._stale.pop(key, None)
+            return entry.data
+
+        if key is not None:
+            metrics.inc("faceit_cache_requests_total", result="miss")
+        if response.status_code == 200:
+            data = response.json()
+            if key is not None:
+                self.cache.set(key, data, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+                self._stale.pop(key, None)
+            return data
+
+        if response.status_code == 404:
+            return None
+        raise FaceitAPIError(f"Ошибка API {path}: {response.status_code} - {response.text}",
+                             response.status_code)
+
+    def _serve_stale(self, key, entry, result):
+        """Отдаёт устаревшую запись: stale - пока она обновляется в фоне, offline - API недоступен"""
+        metrics.inc("faceit_cache_requests_total", result=result)
+        self._stale[key] = entry.stored_at
+        return entry.data
+
+    def _revalidate_later(self, key, path, params, entry, headers):
+        """Ставит фоновую перепроверку записи; одновременно по ключу идёт не больше одной"""
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresh_pool is None:
+                self._refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="faceit-revalidate")
+            self._refresh_pool.submit(self._revalidate, key, path, params, entry, headers)
+
+    def _revalidate(self, key, path, params, entry, headers):
+        try:
+            self._store(key, path, entry,
+                        self.get(path, params=params, headers=headers, deadline=REVALIDATE_DEADLINE))
+        except Exception as e:
+            # Запись остаётся устаревшей и будет отдана ещё раз
+            logger.info(f"Фоновое обновление {path} не удалось: {e}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(key)
+
+    def stale_age(self, path, params=None):
+        """
+        Возраст (сек) устаревшей записи, которую get_json последней отдал
+        вместо ответа API по этому запросу; None - отдан свежий ответ
+        """
+        if self.cache is None:
+            return None
+        stored_at = self._stale.get(self.cache.make_key(path, params))
+        return time.time() - stored_at if stored_at is not None else None
+
+    def close(self):
+        """Закрывает все соединения пула и кэш"""
+        if self._refresh_pool is not None:
+            self._refresh_pool.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
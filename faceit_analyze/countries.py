@@ -0,0 +1,79 @@
+"""Названия стран по коду ISO 3166-1 без сетевых запросов на критическом пути"""
+import logging
+import os
+import threading
+
+logger = logging.getLogger('faceit_tracker')
+
+# Запрос к restcountries.com только для кодов, которых нет во встроенной таблице
+REMOTE_FALLBACK = os.getenv("FACEIT_COUNTRY_REMOTE_FALLBACK", "1") != "0"
+RESTCOUNTRIES_URL = "https://restcountries.com/v3.1/alpha/{code}"
+
+_table = None
+_aliases = None
+_table_lock = threading.Lock()
+
+# Ответы restcountries, запомненные до конца работы процесса
+_remote_memo = {}
+
+
+def _load_table():
+    """Лениво загружает встроенную таблицу при первом обращении"""
+    global _table, _aliases
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                from faceit_analyze._country_table import ALIASES, COUNTRIES
+                _aliases = ALIASES
+                _table = COUNTRIES
+    return _table
+
+
+def lookup_country(country_code):
+    """Возвращает словарь {'rus': ..., 'eng': ...} или None для неизвестного кода"""
+    if not country_code:
+        return None
+    table = _load_table()
+    code = country_code.strip().lower()
+    names = table.get(_aliases.get(code, code))
+    if names is None:
+        return None
+    return {"rus": names[0], "eng": names[1]}
+
+
+def _fetch_remote_name(code):
+    """Запрашивает название у restcountries.com (русское, иначе английское)"""
+    from faceit_analyze.client import DEFAULT_TIMEOUT, get_shared_session
+    from faceit_analyze.metrics import metrics
+
+    with metrics.timer("faceit_country_remote_seconds"):
+        response = get_shared_session().get(RESTCOUNTRIES_URL.format(code=code), timeout=DEFAULT_TIMEOUT)
+    if response.status_code != 200:
+        return None
+    data = response.json()
+    if 'translations' in data[0] and 'rus' in data[0]['translations']:
+        return data[0]['translations']['rus']['common']
+    return data[0]['name']['common']
+
+
+def get_country_name(country_code, lang="rus", remote_fallback=REMOTE_FALLBACK):
+    """Преобразует код страны в полное название, при неудаче возвращает сам код"""
+    names = lookup_country(country_code)
+    if names is not None:
+        return names[lang]
+    if not country_code or not remote_fallback:
+        return country_code
+
+    code = country_code.strip().lower()
+    if not (code.isascii() and code.isalpha() and len(code) in (2, 3)):
+        return country_code
+    if code in _remote_memo:
+        return _remote_memo[code] or country_code
+    try:
+        name = _fetch_remote_name(code)
+    except Exception as e:
+        # Сетевые ошибки не запоминаем: следующий вызов попробует снова
+        logger.error(f"Ошибка при получении названия страны: {e}")
+        return country_code
+    _remote_memo[code] = name
+    return name or country_code
@@ -0,0 +1,223 @@
+"""
+Локальный справочник игроков: все когда-либо найденные никнеймы (в том
+числе прежние) и их player_id. Поиск идёт по индексам в памяти: словарь
+для точного совпадения, отсортированный список для подсказок по префиксу
+и триграммы для поиска с опечатками
+"""
+import bisect
+import difflib
+import heapq
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from faceit_analyze.env import _env_int
+from faceit_analyze.paths import data_dir
+
+logger = logging.getLogger('faceit_tracker')
+
+# Сколько подсказок показывается при вводе никнейма
+SUGGESTIONS = _env_int("FACEIT_SUGGESTIONS", 6)
+
+# Нечёткий поиск: минимальное сходство по триграммам (коэффициент Дайса);
+# перестановка двух соседних букв в никнейме из 6 символов даёт около 0.43
+MIN_SIMILARITY = 0.4
+
+_PLAYER_ID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS nicknames (
+    nickname TEXT NOT NULL,
+    player_id TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (player_id, nickname)
+);
+"""
+
+
+def is_player_id(text):
+    """Похожа ли строка на player_id FACEIT (UUID)"""
+    return bool(_PLAYER_ID_RE.match(text.strip()))
+
+
+def _trigrams(key):
+    """Триграммы ключа; пробелы по краям дают вес началу и концу никнейма"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PlayerDirectory:
+    """
+    Никнейм (без учёта регистра) -> player_id. Если никнейм встречался у
+    нескольких игроков, побеждает увиденный последним. Индекс триграмм
+    строится при первом нечётком поиске и дальше обновляется при добавлении
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("FACEIT_DIRECTORY_PATH") or os.path.join(data_dir(), "players.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # Ключ (никнейм в нижнем регистре) -> (никнейм, player_id, seen_at)
+        self._by_key = {}
+        # player_id -> ключ текущего (последнего увиденного) никнейма
+        self._current = {}
+        for nickname, player_id, seen_at in self._conn.execute(
+                "SELECT nickname, player_id, seen_at FROM nicknames ORDER BY seen_at"):
+            self._index(nickname, player_id, seen_at)
+        self._sorted = sorted(self._by_key)
+        self._trigram_index = None
+
+    def _index(self, nickname, player_id, seen_at):
+        key = nickname.lower()
+        self._by_key[key] = (nickname, player_id, seen_at)
+        current = self._current.get(player_id)
+        if current is None or self._by_key.get(current, (None, None, 0))[2] <= seen_at:
+            self._current[player_id] = key
+        return key
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def add_many(self, players, seen_at=None):
+        """
+        Добавляет пары (nickname, player_id). Уже известные пары пропускаются
+        без записи в базу. Возвращает число новых пар
+        """
+        seen_at = time.time() if seen_at is None else seen_at
+        rows = []
+        new_keys = []
+        with self._lock:
+            for nickname, player_id in players:
+                if not nickname or not player_id:
+                    continue
+                key = nickname.lower()
+                known = self._by_key.get(key)
+                if known is not None and known[1] == player_id and known[0] == nickname \
+                        and self._current.get(player_id) == key:
+                    continue
+                self._index(nickname, player_id, seen_at)
+                # Ключ мог смениться у игрока, но не появиться впервые
+                if known is None:
+                    new_keys.append(key)
+                    if self._trigram_index is not None:
+                        for trigram in _trigrams(key):
+                            self._trigram_index.setdefault(trigram, []).append(key)
+                rows.append((nickname, player_id, seen_at))
+            if new_keys:
+                # Два отсортированных участка сливаются за линейное время
+                self._sorted.extend(sorted(new_keys))
+                self._sorted.sort()
+            if rows:
+                # Одна транзакция на пакет: в режиме autocommit каждая строка фиксировалась бы отдельно
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO nicknames (nickname, player_id, seen_at) VALUES (?, ?, ?)", rows
+                    )
+                finally:
+                    self._conn.execute("COMMIT")
+        return len(rows)
+
+    def add(self, nickname, player_id):
+        return self.add_many([(nickname, player_id)])
+
+    def add_player(self, player_data):
+        """Добавляет игрока из ответа /players"""
+        if player_data:
+            self.add(player_data.get("nickname"), player_data.get("player_id"))
+
+    def add_history_items(self, items):
+        """Добавляет всех участников матчей из элементов истории"""
+        players = []
+        for item in items:
+            for faction in (item.get("teams") or {}).values():
+                for player in faction.get("players") or faction.get("roster") or []:
+                    players.append((player.get("nickname"), player.get("player_id")))
+        return self.add_many(players)
+
+    def resolve(self, text):
+        """player_id для введённого никнейма (в том числе прежнего) или самого player_id, иначе None"""
+        text = text.strip()
+        if is_player_id(text):
+            return text.lower()
+        known = self._by_key.get(text.lower())
+        return known[1] if known is not None else None
+
+    def current_nickname(self, player_id):
+        """Последний известный никнейм игрока или None"""
+        key = self._current.get(player_id)
+        return self._by_key[key][0] if key is not None else None
+
+    def _entry(self, key):
+        """(никнейм, player_id, текущий никнейм игрока)"""
+        nickname, player_id, _ = self._by_key[key]
+        return nickname, player_id, self.current_nickname(player_id)
+
+    def prefix(self, text, limit=SUGGESTIONS):
+        """Никнеймы, начинающиеся с text: список (никнейм, player_id, текущий никнейм)"""
+        key = text.strip().lower()
+        if not key:
+            return []
+        with self._lock:
+            start = bisect.bisect_left(self._sorted, key)
+            keys = []
+            for candidate in self._sorted[start:start + limit]:
+                if not candidate.startswith(key):
+                    break
+                keys.append(candidate)
+            return [self._entry(candidate) for candidate in keys]
+
+    def _build_trigrams(self):
+        index = {}
+        for key in self._by_key:
+            for trigram in _trigrams(key):
+                index.setdefault(trigram, []).append(key)
+        self._trigram_index = index
+
+    def fuzzy(self, text, limit=SUGGESTIONS, min_similarity=MIN_SIMILARITY):
+        """Похожие никнеймы (опечатки): список (никнейм, player_id, текущий никнейм), сначала самые похожие"""
+        key = text.strip().lower()
+        if len(key) < 3:
+            return []
+        query = _trigrams(key)
+        with self._lock:
+            if self._trigram_index is None:
+                self._build_trigrams()
+            overlap = {}
+            for trigram in query:
+                for candidate in self._trigram_index.get(trigram, ()):
+                    overlap[candidate] = overlap.get(candidate, 0) + 1
+            # Коэффициент Дайса; у ключа длины n (с отступами) n + 1 триграмма
+            scored = ((2 * shared / (len(query) + len(candidate) + 1), candidate)
+                      for candidate, shared in overlap.items())
+            best = heapq.nlargest(limit * 4, (item for item in scored if item[0] >= min_similarity))
+            # Триграммы не видят порядка общих фрагментов: лучших кандидатов упорядочиваем по сходству строк
+            best.sort(key=lambda item: (difflib.SequenceMatcher(None, key, item[1]).ratio(), item[0]), reverse=True)
+            return [self._entry(candidate) for _, candidate in best[:limit]]
+
+    def suggest(self, text, limit=SUGGESTIONS):
+        """Подсказки при вводе: сначала совпадения по префиксу, затем похожие никнеймы"""
+        suggestions = self.prefix(text, limit)
+        if len(suggestions) < limit:
+            seen = {player_id for _, player_id, _ in suggestions}
+            for entry in self.fuzzy(text, limit):
+                if entry[1] not in seen and len(suggestions) < limit:
+                    seen.add(entry[1])
+                    suggestions.append(entry)
+        return suggestions
+
+    def warm(self):
+        """Строит индекс триграмм заранее, чтобы первый нечёткий поиск не ждал"""
+        with self._lock:
+            if self._trigram_index is None:
+                self._build_trigrams()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,35 @@
+"""Чтение настроек из переменных окружения (без тяжёлых зависимостей: модуль импортируется при старте)"""
+import logging
+import os
+
+logger = logging.getLogger('faceit_tracker')
+
+
+def _env_float(name, default):
+    """Читает дробное число из переменной окружения"""
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        logger.error(f"Некорректное значение {name}, используется {default}")
+        return default
+
+
+def _env_int(name, default):
+    """Читает целое число из переменной окружения"""
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        logger.error(f"Некорректное значение {name}, используется {default}")
+        return default
+
+
+def api_keys_from_env():
+    """
+    Ключи FACEIT Data API: FACEIT_API_KEYS (через запятую или пробел),
+    иначе единственный FACEIT_API_KEY. Повторы убираются
+    """
+    keys = []
+    for key in (os.getenv("FACEIT_API_KEYS") or os.getenv("FACEIT_API_KEY") or "").replace(",", " ").split():
+        if key not in keys:
+            keys.append(key)
+    return keys
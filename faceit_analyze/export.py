@@ -0,0 +1,250 @@
+"""
+Экспорт и импорт результатов анализа. Запись - плоский отчёт (см.
+report.FIELDS), полная таблица карт и исходные ответы API, по которым
+импорт заполняет кэш ответов без запросов к API. Форматы выбираются по
+расширению: .ndjson/.jsonl - JSON-строки, .parquet - Parquet, .arrow -
+поток Arrow IPC (для двух последних нужен pyarrow). Записи пишутся по
+мере готовности игроков, в памяти держится не больше одной пачки
+"""
+import json
+import logging
+import os
+import time
+
+from faceit_analyze.analysis import get_map_table
+from faceit_analyze.env import _env_int
+from faceit_analyze.report import FIELDS, build_report
+
+logger = logging.getLogger('faceit_tracker')
+
+SCHEMA_VERSION = 1
+
+# Сколько записей копится перед записью группы строк Parquet / пачки Arrow
+BATCH_ROWS = _env_int("FACEIT_EXPORT_BATCH_ROWS", 256)
+
+MAP_FIELDS = ("name", "matches", "win_rate", "kd", "avg_kills", "rating", "confidence", "weighted_rating")
+
+_INT_FIELDS = {"level", "elo", "matches", "total_kills", "total_deaths", "current_win_streak", "longest_win_streak"}
+_FLOAT_FIELDS = {"avg_kills", "avg_deaths", "kd", "win_rate", "headshots", "stale_age"}
+
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+PARQUET_EXTENSIONS = (".parquet",)
+ARROW_EXTENSIONS = (".arrow", ".arrows")
+
+
+def _cached_responses(cache, result):
+    """Ответы API по игроку, которые есть в кэше: {ключ кэша: JSON}"""
+    player_data = result.player_data or {}
+    player_id = player_data.get("player_id")
+    responses = {}
+    if player_id:
+        # Профиль есть в самом результате, даже если кэш выключен
+        responses[f"players/{player_id}"] = player_data
+    if cache is None or not player_id:
+        return responses
+    keys = [cache.make_key("players", {"nickname": result.nickname}),
+            cache.make_key("players", {"nickname": player_data.get("nickname")})]
+    keys += [f"players/{player_id}/stats/{game_id}" for game_id in ("cs2", "csgo")]
+    for key in keys:
+        if key not in responses:
+            entry = cache.get(key)
+            if entry is not None:
+                responses[key] = entry.data
+    return responses
+
+
+def build_record(result, cache=None, report=None):
+    """
+    Запись экспорта из ScanResult; cache - ResponseCache клиента, из него
+    берутся исходные ответы, report - уже собранный build_report(result)
+    """
+    record = dict(report) if report is not None else build_report(result)
+    record["schema"] = SCHEMA_VERSION
+    record["exported_at"] = time.time()
+    maps = []
+    if result.stats:
+        maps = [{name: item[name] for name in MAP_FIELDS} for item in get_map_table(result.stats).maps]
+    record["maps"] = maps
+    record["responses"] = _cached_responses(cache, result)
+    return record
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError("Для форматов Parquet и Arrow нужен пакет pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+
+def arrow_schema(pa):
+    """Схема Arrow для записей экспорта; ответы API хранятся строкой JSON"""
+    fields = []
+    for name in FIELDS:
+        if name in _INT_FIELDS:
+            fields.append(pa.field(name, pa.int64()))
+        elif name in _FLOAT_FIELDS:
+            fields.append(pa.field(name, pa.float64()))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    map_type = pa.struct([pa.field(name, pa.string() if name == "name" else
+                                   pa.int64() if name == "matches" else pa.float64()) for name in MAP_FIELDS])
+    fields += [
+        pa.field("schema", pa.int32()),
+        pa.field("exported_at", pa.float64()),
+        pa.field("maps", pa.list_(map_type)),
+        pa.field("responses", pa.string()),
+    ]
+    return pa.schema(fields)
+
+
+def _to_row(record):
+    """Запись в строку таблицы Arrow: типы полей приводятся к схеме"""
+    row = dict(record)
+    for name in _INT_FIELDS:
+        if row.get(name) is not None:
+            row[name] = int(row[name])
+    for name in _FLOAT_FIELDS:
+        if row.get(name) is not None:
+            row[name] = float(row[name])
+    row["maps"] = [{name: value if name in ("name", "matches") or value is None else float(value)
+                    for name, value in item.items()} for item in record.get("maps") or ()]
+    row["responses"] = json.dumps(record.get("responses") or {}, ensure_ascii=False, separators=(",", ":"))
+    return row
+
+
+def _from_row(row):
+    record = dict(row)
+    record["responses"] = json.loads(record.get("responses") or "{}")
+    return record
+
+
+class NdjsonWriter:
+    """Записи JSON-строками; каждая сразу сбрасывается на диск"""
+
+    def __init__(self, path):
+        self._file = open(path, "w", encoding="utf-8")
+        self.count = 0
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ArrowWriter:
+    """Parquet (группа строк на пачку) или поток Arrow IPC (пачка на пачку)"""
+
+    def __init__(self, path, parquet=True, batch_rows=BATCH_ROWS):
+        pa = self._pa = _require_pyarrow()
+        self.schema = arrow_schema(pa)
+        self.batch_rows = max(1, batch_rows)
+        self.count = 0
+        self._rows = []
+        self._sink = None
+        if parquet:
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            import pyarrow.ipc
+            self._sink = pa.OSFile(path, "wb")
+            self._writer = pyarrow.ipc.new_stream(self._sink, self.schema)
+
+    def write(self, record):
+        self._rows.append(_to_row(record))
+        self.count += 1
+        if len(self._rows) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_table(self._pa.Table.from_pylist(self._rows, schema=self.schema))
+            self._rows = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _extension(path):
+    return os.path.splitext(path)[1].lower()
+
+
+def open_writer(path, batch_rows=BATCH_ROWS):
+    """Писатель записей экспорта по расширению файла"""
+    extension = _extension(path)
+    if extension in NDJSON_EXTENSIONS:
+        return NdjsonWriter(path)
+    if extension in PARQUET_EXTENSIONS:
+        return ArrowWriter(path, parquet=True, batch_rows=batch_rows)
+    if extension in ARROW_EXTENSIONS:
+        return ArrowWriter(path, parquet=False, batch_rows=batch_rows)
+    raise ValueError(f"Неизвестный формат экспорта {extension or path}: нужен .ndjson, .jsonl, .parquet или .arrow")
+
+
+def read_records(path):
+    """Читает записи экспорта потоково, пачками, в любом из форматов open_writer"""
+    extension = _extension(path)
+    if extension in NDJSON_EXTENSIONS:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    if extension in PARQUET_EXTENSIONS:
+        _require_pyarrow()
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=BATCH_ROWS):
+            for row in batch.to_pylist():
+                yield _from_row(row)
+    elif extension in ARROW_EXTENSIONS:
+        pa = _require_pyarrow()
+        import pyarrow.ipc
+        with pa.OSFile(path, "rb") as source:
+            for batch in pyarrow.ipc.open_stream(source):
+                for row in batch.to_pylist():
+                    yield _from_row(row)
+    else:
+        raise ValueError(f"Неизвестный формат импорта {extension or path}")
+
+
+def import_records(path, cache, directory=None, fresh=True):
+    """
+    Заполняет кэш ответов из файла экспорта. Ответы считаются полученными
+    сейчас: иначе экспорт старше TTL (у статистики - минуты) весь ушёл бы
+    на перепроверку. fresh=False сохраняет их со временем экспорта.
+    Более новые записи кэша не затираются.
+    directory (PlayerDirectory) пополняется найденными игроками.
+    Возвращает (игроков, ответов)
+    """
+    players = responses = 0
+    now = time.time()
+    for record in read_records(path):
+        stored_at = now if fresh else record.get("exported_at") or now
+        for key, data in (record.get("responses") or {}).items():
+            entry = cache.get(key)
+            if entry is not None and entry.stored_at >= stored_at:
+                continue
+            cache.set(key, data, stored_at=stored_at)
+            responses += 1
+        if directory is not None and record.get("player_id"):
+            directory.add(record.get("nickname"), record["player_id"])
+        players += 1
+    return players, responses
@@ -0,0 +1,260 @@
+"""История матчей игрока в локальной базе SQLite с инкрементальной синхронизацией"""
+import logging
+import os
+import sqlite3
+import threading
+
+from faceit_analyze.api import get_match_history, get_match_stats
+from faceit_analyze.client import FaceitAPIError
+from faceit_analyze.env import _env_int
+from faceit_analyze.paths import data_dir
+
+logger = logging.getLogger('faceit_tracker')
+
+# Размер страницы истории (максимум API - 100) и предел первой загрузки
+PAGE_SIZE = _env_int("FACEIT_HISTORY_PAGE_SIZE", 100)
+MAX_MATCHES = _env_int("FACEIT_HISTORY_MAX_MATCHES", 300)
+
+# Сколько последних матчей показывается в блоке текущей формы
+RECENT_MATCHES = _env_int("FACEIT_RECENT_MATCHES", 20)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    player_id TEXT NOT NULL,
+    match_id TEXT NOT NULL,
+    game_id TEXT NOT NULL,
+    started_at INTEGER,
+    finished_at INTEGER,
+    map TEXT,
+    won INTEGER,
+    kills INTEGER,
+    deaths INTEGER,
+    assists INTEGER,
+    headshots INTEGER,
+    mvps INTEGER,
+    rounds INTEGER,
+    adr REAL,
+    has_stats INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (player_id, match_id)
+);
+CREATE INDEX IF NOT EXISTS matches_player_time ON matches (player_id, game_id, finished_at);
+"""
+
+
+class MatchStore:
+    """Локальная база матчей, переживает перезапуск приложения"""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("FACEIT_HISTORY_PATH") or os.path.join(data_dir(), "history.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # Колоночные фреймы, собранные из базы; сбрасываются при записи матчей игрока
+        self._frames = {}
+
+    def latest_started_at(self, player_id, game_id):
+        """Время начала самого нового сохранённого матча или None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(started_at) FROM matches WHERE player_id = ? AND game_id = ?", (player_id, game_id)
+            ).fetchone()
+        return row[0]
+
+    def match_ids_since(self, player_id, game_id, started_at):
+        """ID сохранённых матчей, начавшихся не раньше started_at"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT match_id FROM matches WHERE player_id = ? AND game_id = ? AND started_at >= ?",
+                (player_id, game_id, started_at or 0)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def missing_stats(self, player_id, game_id, limit):
+        """ID матчей, статистику которых ещё не удалось загрузить (сначала новые)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT match_id FROM matches WHERE player_id = ? AND game_id = ? AND has_stats = 0 "
+                "ORDER BY finished_at DESC LIMIT ?", (player_id, game_id, limit)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def add_matches(self, player_id, game_id, items):
+        """Сохраняет элементы истории (без личной статистики); известные матчи не трогает"""
+        rows = [(player_id, item["match_id"], game_id, item.get("started_at"), item.get("finished_at"),
+                 _player_won(item, player_id)) for item in items]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO matches (player_id, match_id, game_id, started_at, finished_at, won) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._frames.pop((player_id, game_id), None)
+
+    def set_stats(self, player_id, match_id, stats):
+        """Записывает личную статистику игрока в матче (словарь из extract_player_stats)"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE matches SET map = ?, won = COALESCE(?, won), kills = ?, deaths = ?, assists = ?, "
+                "headshots = ?, mvps = ?, rounds = ?, adr = ?, has_stats = 1 "
+                "WHERE player_id = ? AND match_id = ?",
+                (stats["map"], stats["won"], stats["kills"], stats["deaths"], stats["assists"],
+                 stats["headshots"], stats["mvps"], stats["rounds"], stats["adr"], player_id, match_id)
+            )
+            self._invalidate(player_id)
+
+    def mark_unavailable(self, player_id, match_id):
+        """Помечает матч, для которого API не отдаёт статистику игрока, чтобы не запрашивать его снова"""
+        with self._lock:
+            self._conn.execute("UPDATE matches SET has_stats = -1 WHERE player_id = ? AND match_id = ?",
+                               (player_id, match_id))
+
+    def frame(self, player_id, game_id):
+        """Все матчи игрока с загруженной статистикой в виде MatchFrame (сначала новые)"""
+        from faceit_analyze.matchframe import MatchFrame
+
+        key = (player_id, game_id)
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                rows = self._conn.execute(
+                    "SELECT finished_at, map, won, kills, deaths, assists, headshots, mvps, rounds, adr "
+                    "FROM matches WHERE player_id = ? AND game_id = ? AND has_stats = 1 "
+                    "ORDER BY finished_at DESC", key
+                ).fetchall()
+                frame = self._frames[key] = MatchFrame.from_rows(rows)
+        return frame
+
+    def _invalidate(self, player_id):
+        for key in [key for key in self._frames if key[0] == player_id]:
+            del self._frames[key]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _player_won(item, player_id):
+    """Победил ли игрок в матче из истории: 1, 0 или None, если неизвестно"""
+    winner = (item.get("results") or {}).get("winner")
+    if not winner:
+        return None
+    for faction_id, faction in (item.get("teams") or {}).items():
+        players = faction.get("players") or faction.get("roster") or []
+        if any(player.get("player_id") == player_id for player in players):
+            return int(faction_id == winner)
+    return None
+
+
+def _int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def extract_player_stats(match_stats, player_id):
+    """
+    Личная статистика игрока из ответа /matches/{id}/stats. Карты серии (BO3)
+    суммируются, ADR усредняется по раундам. None, если игрока в ответе нет
+    """
+    maps = []
+    totals = {"kills": 0, "deaths": 0, "assists": 0, "headshots": 0, "mvps": 0, "rounds": 0}
+    damage = 0.0
+    wins = 0
+    found = False
+    for match_round in (match_stats or {}).get("rounds", []):
+        round_stats = match_round.get("round_stats", {})
+        for team in match_round.get("teams", []):
+            for player in team.get("players", []):
+                if player.get("player_id") != player_id:
+                    continue
+                stats = player.get("player_stats", {})
+                rounds = _int(round_stats.get("Rounds"))
+                found = True
+                maps.append(round_stats.get("Map") or "Unknown")
+                totals["kills"] += _int(stats.get("Kills"))
+                totals["deaths"] += _int(stats.get("Deaths"))
+                totals["assists"] += _int(stats.get("Assists"))
+                totals["headshots"] += _int(stats.get("Headshots"))
+                totals["mvps"] += _int(stats.get("MVPs"))
+                totals["rounds"] += rounds
+                wins += _int(stats.get("Result"))
+                try:
+                    damage += float(stats.get("ADR")) * rounds
+                except (TypeError, ValueError):
+                    pass
+    if not found:
+        return None
+    totals["map"] = "/".join(maps)
+    totals["won"] = int(wins * 2 > len(maps))
+    totals["adr"] = damage / totals["rounds"] if damage and totals["rounds"] else None
+    return totals
+
+
+def _cancelled(cancel):
+    return cancel is not None and cancel.is_set()
+
+
+def sync_history(client, store, player_id, game_id, executor=None, max_matches=MAX_MATCHES, page_size=PAGE_SIZE,
+                 on_items=None, cancel=None):
+    """
+    Догружает в store матчи новее последнего сохранённого и их статистику.
+    История идёт от новых к старым, поэтому листание останавливается на первом
+    уже известном матче: для активного игрока это одна небольшая страница.
+    on_items(items) получает все элементы загруженных страниц, включая
+    известные и незавершённые матчи (например, для предзагрузки).
+    Если установлен threading.Event cancel, листание и загрузка статистики
+    матчей прекращаются, а ещё не отправленные запросы отменяются.
+    Возвращает число новых матчей
+    """
+    from faceit_analyze.pipeline import get_executor
+
+    since = store.latest_started_at(player_id, game_id)
+    known = store.match_ids_since(player_id, game_id, since) if since else set()
+
+    new_items = []
+    offset = 0
+    while len(new_items) < max_matches:
+        if _cancelled(cancel):
+            # Несохранённая часть истории догрузится при следующей синхронизации
+            return 0
+        page = get_match_history(client, player_id, game_id, offset, page_size, since or 0)
+        items = (page or {}).get("items", [])
+        if on_items is not None and items:
+            on_items(items)
+        reached_known = False
+        for item in items:
+            if item.get("match_id") in known:
+                reached_known = True
+                break
+            if item.get("status", "finished").lower() == "finished":
+                new_items.append(item)
+        if reached_known or len(items) < page_size:
+            break
+        offset += page_size
+    new_items = new_items[:max_matches]
+    store.add_matches(player_id, game_id, new_items)
+
+    # Статистика новых матчей и тех, что не загрузились в прошлый раз
+    pending = store.missing_stats(player_id, game_id, max_matches)
+    if pending:
+        executor = executor or get_executor()
+        futures = {executor.submit(get_match_stats, client, match_id, cancel): match_id for match_id in pending}
+        for future, match_id in futures.items():
+            if _cancelled(cancel):
+                for pending_future in futures:
+                    pending_future.cancel()
+                break
+            try:
+                stats = extract_player_stats(future.result(), player_id)
+            except FaceitAPIError as e:
+                # Матч останется без статистики и будет запрошен при следующей синхронизации
+                if not _cancelled(cancel):
+                    logger.warning(f"Статистика матча {match_id} не загружена: {e}")
+                continue
+            if stats is not None:
+                store.set_stats(player_id, match_id, stats)
+            else:
+                store.mark_unavailable(player_id, match_id)
+    return len(new_items)
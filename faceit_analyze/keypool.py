@@ -0,0 +1,171 @@
+"""
+Пул ключей FACEIT Data API: у каждого ключа своя квота, запрос получает
+наименее загруженный ключ, отклонённые и упёршиеся в лимит ключи
+временно выводятся из оборота
+"""
+import logging
+import threading
+import time
+
+from faceit_analyze.env import _env_float
+from faceit_analyze.metrics import metrics
+from faceit_analyze.ratelimit import TokenBucket
+
+logger = logging.getLogger('faceit_tracker')
+
+# Карантин ключа после 401/403 (ключ отозван или не имеет доступа), сек
+AUTH_QUARANTINE = _env_float("FACEIT_KEY_AUTH_QUARANTINE", 600)
+# Карантин после 429 без Retry-After, сек
+THROTTLE_QUARANTINE = 5.0
+
+AUTH_STATUSES = {401, 403}
+
+# Дольше этого не спим за раз в ожидании ключа: освободившийся ключ подхватывается быстрее
+_MAX_WAIT_STEP = 0.25
+
+
+def mask_key(key):
+    """Ключ для логов и меток метрик: только последние 4 символа"""
+    return "****" + key[-4:]
+
+
+class ApiKey:
+    """Ключ API, его квота и счётчики использования"""
+    __slots__ = ("key", "label", "bucket", "in_flight", "requests", "throttled", "rejected", "errors",
+                 "quarantined_until", "last_status")
+
+    def __init__(self, key, bucket):
+        self.key = key
+        self.label = mask_key(key)
+        self.bucket = bucket
+        # Запросов с этим ключом выполняется прямо сейчас
+        self.in_flight = 0
+        self.requests = 0
+        # Ответов 429 и 401/403
+        self.throttled = 0
+        self.rejected = 0
+        # Сетевых ошибок и 5xx
+        self.errors = 0
+        self.quarantined_until = 0.0
+        self.last_status = None
+
+    def quarantine_left(self, now=None):
+        """Сколько секунд ключ ещё в карантине (0 - в обороте)"""
+        return max(0.0, self.quarantined_until - (time.monotonic() if now is None else now))
+
+    @property
+    def header(self):
+        return f"Bearer {self.key}"
+
+
+class KeyPool:
+    """
+    Набор ключей с собственными token bucket (rate запросов в секунду,
+    всплеск burst). Если передан bucket, все ключи делят его - так
+    сохраняется поведение единственного общего ограничителя.
+    Единственный ключ за 401/403 в карантин не отправляется: подменить его
+    нечем, и ошибка должна дойти до вызывающего сразу
+    """
+
+    def __init__(self, keys, rate, burst, bucket=None):
+        keys = [key for key in dict.fromkeys(keys) if key]
+        if not keys:
+            raise ValueError("Не задан ни один ключ FACEIT API")
+        self.keys = [ApiKey(key, bucket or TokenBucket(rate, burst)) for key in keys]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _pick_locked(self, now):
+        """Наименее загруженный ключ с доступным токеном или время ожидания, сек"""
+        wait = None
+        candidates = [key for key in self.keys if key.quarantined_until <= now]
+        # Меньше запросов в работе, затем больше запаса квоты
+        candidates.sort(key=lambda key: (key.in_flight, -key.bucket.available()))
+        for key in candidates:
+            key_wait = key.bucket.try_acquire()
+            if not key_wait:
+                key.in_flight += 1
+                key.requests += 1
+                return key, 0.0
+            wait = key_wait if wait is None else min(wait, key_wait)
+        if not candidates:
+            wait = min(key.quarantined_until for key in self.keys) - now
+        return None, wait
+
+    def acquire(self, deadline=None, cancel=None):
+        """
+        Ждёт ключ с доступной квотой. После запроса его обязательно нужно
+        вернуть через release(). None - если до deadline (time.monotonic())
+        ни один ключ не освободится или установлен threading.Event cancel:
+        отменённый запрос не расходует квоту
+        """
+        while True:
+            if cancel is not None and cancel.is_set():
+                return None
+            with self._lock:
+                now = time.monotonic()
+                key, wait = self._pick_locked(now)
+            if key is not None:
+                metrics.inc("faceit_api_key_requests_total", key=key.label)
+                return key
+            if deadline is not None and now + wait > deadline:
+                return None
+            if cancel is not None:
+                cancel.wait(min(wait, _MAX_WAIT_STEP))
+            else:
+                time.sleep(min(wait, _MAX_WAIT_STEP))
+
+    def release(self, key, status=None, retry_after=None, reject=True):
+        """
+        Возвращает ключ после запроса. status - код ответа (None при сетевой
+        ошибке), retry_after - пауза из заголовка Retry-After, сек; при
+        reject=False ответ 401/403 не отправляет ключ в карантин.
+        Возвращает True, если ключ отправлен в карантин
+        """
+        with self._lock:
+            key.in_flight -= 1
+            key.last_status = status
+            if status is None or status >= 500:
+                key.errors += 1
+                return False
+            if status == 429:
+                key.throttled += 1
+                seconds = retry_after if retry_after is not None else THROTTLE_QUARANTINE
+                reason = "throttled"
+            elif status in AUTH_STATUSES:
+                key.rejected += 1
+                if not reject or len(self.keys) == 1:
+                    return False
+                seconds = AUTH_QUARANTINE
+                reason = "rejected"
+            else:
+                return False
+            key.quarantined_until = max(key.quarantined_until, time.monotonic() + seconds)
+        # Квота исчерпана для всего ключа: притормаживаем все потоки, которые его используют
+        if status == 429:
+            key.bucket.pause(seconds)
+        metrics.inc("faceit_api_key_quarantined_total", key=key.label, reason=reason)
+        logger.warning(f"Ключ API {key.label} выведен из оборота на {seconds:.0f} с (ответ {status})")
+        return True
+
+    def has_available(self):
+        """Есть ли ключ вне карантина"""
+        now = time.monotonic()
+        return any(key.quarantined_until <= now for key in self.keys)
+
+    def stats(self):
+        """Использование ключей: список словарей в порядке добавления ключей"""
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "key": key.label,
+                "requests": key.requests,
+                "in_flight": key.in_flight,
+                "throttled": key.throttled,
+                "rejected": key.rejected,
+                "errors": key.errors,
+                "quarantine_left": key.quarantine_left(now),
+                "last_status": key.last_status,
+            } for key in self.keys]
@@ -0,0 +1,206 @@
+"""Пакетное сканирование лобби: список игроков или целая комната матча"""
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from faceit_analyze.analysis import analyze_maps, calculate_avg_stats
+from faceit_analyze.api import get_match_data
+from faceit_analyze.env import _env_int
+from faceit_analyze.pipeline import ScanResult, run_scan
+
+logger = logging.getLogger('faceit_tracker')
+
+# Сколько игроков лобби сканируется одновременно
+MAX_WORKERS = _env_int("FACEIT_LOBBY_WORKERS", 10)
+
+_ROOM_RE = re.compile(r"/room/([0-9a-z-]+)", re.IGNORECASE)
+_MATCH_ID_RE = re.compile(r"^1-[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE)
+_SPLIT_RE = re.compile(r"[\s,;]+")
+
+
+def extract_nickname(text):
+    """Никнейм из строки ввода: сам никнейм или ссылка на профиль"""
+    text = text.strip()
+    if "/" not in text:
+        return text
+    parts = [part for part in text.rstrip("/").split("/") if part]
+    # Ссылки вида faceit.com/ru/players/<nickname>/stats/cs2
+    if "players" in parts:
+        index = parts.index("players")
+        if index + 1 < len(parts):
+            return parts[index + 1]
+    return parts[-1]
+
+
+def extract_match_id(text):
+    """ID матча из ссылки на комнату или из самого ID, иначе None"""
+    match = _ROOM_RE.search(text)
+    if match:
+        return match.group(1)
+    text = text.strip()
+    if _MATCH_ID_RE.match(text):
+        return text
+    return None
+
+
+def parse_lobby_input(text):
+    """Разбирает ввод: (match_id, []) для комнаты матча или (None, [никнеймы])"""
+    match_id = extract_match_id(text)
+    if match_id:
+        return match_id, []
+
+    nicknames = []
+    for token in _SPLIT_RE.split(text):
+        nickname = extract_nickname(token) if token else ""
+        if nickname and nickname not in nicknames:
+            nicknames.append(nickname)
+    return None, nicknames
+
+
+def is_batch_input(text):
+    """Нужно ли сканировать ввод как лобби (комната или несколько игроков)"""
+    match_id, nicknames = parse_lobby_input(text)
+    return bool(match_id) or len(nicknames) > 1
+
+
+def get_match_teams(client, match_id):
+    """Составы команд матча: [(название, [(nickname, player_id), ...]), ...] или None"""
+    match_data = get_match_data(client, match_id)
+    if not match_data:
+        return None
+    return match_teams(match_data)
+
+
+def match_teams(match_data):
+    """Составы команд из ответа /matches/{id}"""
+    teams = []
+    for faction_id in ("faction1", "faction2"):
+        faction = match_data.get("teams", {}).get(faction_id) or {}
+        roster = faction.get("roster") or faction.get("players") or []
+        members = [(member.get("nickname"), member.get("player_id")) for member in roster]
+        teams.append((faction.get("name") or faction_id, members))
+    return teams
+
+
+class LobbyTeam:
+    """Команда лобби и результаты сканирования её игроков"""
+    __slots__ = ("name", "results")
+
+    def __init__(self, name, results):
+        self.name = name
+        self.results = results
+
+
+def scan_lobby(client, text, max_workers=MAX_WORKERS, on_player=None, cancel=None, max_stale=None):
+    """
+    Сканирует всех игроков лобби параллельно в ограниченном пуле потоков,
+    так что общее время близко ко времени самого медленного игрока.
+    on_player(result, done, total) вызывается по готовности каждого игрока.
+    cancel (threading.Event) прерывает сканирование всех игроков.
+    max_stale - как у run_scan.
+    Возвращает список LobbyTeam или None, если комната матча не найдена
+    """
+    match_id, nicknames = parse_lobby_input(text)
+    if match_id:
+        teams = get_match_teams(client, match_id)
+        if teams is None:
+            return None
+    else:
+        teams = [("Игроки", [(nickname, None) for nickname in nicknames])]
+    return scan_rosters(client, teams, max_workers, on_player, cancel, max_stale)
+
+
+def scan_rosters(client, teams, max_workers=MAX_WORKERS, on_player=None, cancel=None, max_stale=None):
+    """
+    Сканирует уже известные составы [(название, [(nickname, player_id), ...])],
+    player_id может быть None. Параметры и результат - как у scan_lobby
+    """
+    entries = [(team_index, position, nickname, player_id)
+               for team_index, (_, members) in enumerate(teams)
+               for position, (nickname, player_id) in enumerate(members)]
+    results = [[None] * len(members) for _, members in teams]
+    if not entries:
+        return [LobbyTeam(name, []) for name, _ in teams]
+
+    workers = max(1, min(max_workers, len(entries)))
+    # Отдельный пул для вложенных запросов run_scan: задачи верхнего уровня
+    # ждут их завершения и не должны делить с ними потоки
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="faceit-lobby") as lobby_pool, \
+            ThreadPoolExecutor(max_workers=workers * 3, thread_name_prefix="faceit-lobby-io") as io_pool:
+        positions = {}
+        for team_index, position, nickname, player_id in entries:
+            future = lobby_pool.submit(run_scan, client, nickname, None, io_pool, player_id, cancel,
+                                         speculate=False, max_stale=max_stale)
+            positions[future] = (team_index, position, nickname)
+
+        for done, future in enumerate(as_completed(positions), 1):
+            if cancel is not None and cancel.is_set():
+                for pending in positions:
+                    pending.cancel()
+                break
+            team_index, position, nickname = positions[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Ошибка сканирования игрока лобби {nickname}: {e}")
+                result = ScanResult(nickname)
+                result.error = str(e)
+            results[team_index][position] = result
+            if on_player is not None:
+                on_player(result, done, len(entries))
+
+    return [LobbyTeam(name, [result for result in team_results if result is not None])
+            for (name, _), team_results in zip(teams, results)]
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def summarize_player(result):
+    """Строка сравнительной таблицы лобби для одного игрока"""
+    player_data = result.player_data or {}
+    games = player_data.get("games", {})
+    game = games.get(result.game_id or "cs2") or games.get("cs2") or games.get("csgo") or {}
+    summary = {
+        "nickname": player_data.get("nickname") or result.nickname or "Н/Д",
+        "found": bool(player_data),
+        "error": result.error,
+        "elo": game.get("faceit_elo"),
+        "level": game.get("skill_level"),
+        "kd": None,
+        "win_rate": None,
+        "avg_kills": "Н/Д",
+        "matches": 0,
+        "best_map": None,
+        "worst_map": None,
+    }
+    if not result.stats:
+        return summary
+
+    lifetime = result.stats.lifetime
+    segments = result.stats.segments
+    avg_kills, _, total_matches, _, _ = calculate_avg_stats(lifetime, segments, result.game_id)
+    best_map, worst_map = analyze_maps(segments, result.game_id)
+    summary.update({
+        "kd": lifetime.kd,
+        "win_rate": lifetime.win_rate,
+        "avg_kills": avg_kills,
+        "matches": total_matches,
+        "best_map": best_map["name"] if best_map else None,
+        "worst_map": worst_map["name"] if worst_map else None,
+    })
+    return summary
+
+
+def summarize_team(rows):
+    """Средние ELO и K/D команды по строкам summarize_player"""
+    elos = [_to_float(row["elo"]) for row in rows if _to_float(row["elo"]) is not None]
+    kds = [row["kd"] for row in rows if row["kd"] is not None]
+    return {
+        "avg_elo": sum(elos) / len(elos) if elos else None,
+        "avg_kd": sum(kds) / len(kds) if kds else None,
+    }
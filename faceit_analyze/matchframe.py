@@ -0,0 +1,135 @@
+"""Колоночное представление матчей игрока для быстрых агрегатов на NumPy"""
+import numpy as np
+
+# Код результата в колонке won, если победитель матча неизвестен
+RESULT_UNKNOWN = -1
+
+_INT_COLUMNS = ("kills", "deaths", "assists", "headshots", "mvps", "rounds")
+
+
+class MatchFrame:
+    """
+    Матчи одного игрока в виде колонок NumPy, отсортированных от новых к старым.
+    Карта хранится категориально: map_codes - индексы в кортеже maps.
+    Срезы (last, since, on_map) возвращают новый MatchFrame без копирования
+    категорий, агрегаты считаются векторно
+    """
+    __slots__ = ("finished_at", "map_codes", "maps", "won", "adr") + _INT_COLUMNS
+
+    def __init__(self, finished_at, map_codes, maps, won, adr, **counts):
+        self.finished_at = finished_at
+        self.map_codes = map_codes
+        self.maps = maps
+        self.won = won
+        self.adr = adr
+        for name in _INT_COLUMNS:
+            setattr(self, name, counts[name])
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Строит фрейм из строк (finished_at, map, won, kills, deaths, assists,
+        headshots, mvps, rounds, adr), уже упорядоченных от новых к старым
+        """
+        columns = list(zip(*rows)) if rows else [()] * 10
+        maps, map_codes = np.unique(np.array([name or "Unknown" for name in columns[1]], dtype=object),
+                                    return_inverse=True)
+        counts = {name: np.array([value or 0 for value in column], dtype=np.int32)
+                  for name, column in zip(_INT_COLUMNS, columns[3:9])}
+        return cls(
+            finished_at=np.array([value or 0 for value in columns[0]], dtype=np.int64),
+            map_codes=map_codes.astype(np.int16).reshape(-1),
+            maps=tuple(maps),
+            won=np.array([RESULT_UNKNOWN if value is None else value for value in columns[2]], dtype=np.int8),
+            adr=np.array([np.nan if value is None else value for value in columns[9]], dtype=np.float32),
+            **counts
+        )
+
+    def __len__(self):
+        return len(self.finished_at)
+
+    def _take(self, selector):
+        return MatchFrame(
+            finished_at=self.finished_at[selector], map_codes=self.map_codes[selector], maps=self.maps,
+            won=self.won[selector], adr=self.adr[selector],
+            **{name: getattr(self, name)[selector] for name in _INT_COLUMNS}
+        )
+
+    def last(self, count):
+        """Последние count матчей"""
+        return self._take(slice(0, count))
+
+    def since(self, timestamp):
+        """Матчи, завершённые не раньше timestamp (unix-время)"""
+        # Колонка убывает, поэтому ищем в развёрнутом представлении
+        count = len(self) - np.searchsorted(self.finished_at[::-1], timestamp, side="left")
+        return self._take(slice(0, count))
+
+    def on_map(self, map_name):
+        """Матчи на одной карте"""
+        if map_name not in self.maps:
+            return self._take(slice(0, 0))
+        return self._take(self.map_codes == self.maps.index(map_name))
+
+    def summary(self):
+        """Средние показатели и форма вида 'WWLWL' (сначала новые) или None для пустого фрейма"""
+        count = len(self)
+        if not count:
+            return None
+        kills = int(self.kills.sum())
+        deaths = int(self.deaths.sum())
+        headshots = int(self.headshots.sum())
+        known = self.won[self.won != RESULT_UNKNOWN]
+        adr = self.adr[~np.isnan(self.adr)]
+        return {
+            "matches": count,
+            "win_rate": 100 * float(known.mean()) if len(known) else None,
+            "avg_kills": kills / count,
+            "avg_deaths": deaths / count,
+            "kd": kills / deaths if deaths else None,
+            "hs_pct": 100 * headshots / kills if kills else None,
+            "adr": float(adr.mean()) if len(adr) else None,
+            "form": np.where(known == 1, ord("W"), ord("L")).astype(np.uint8).tobytes().decode("ascii"),
+        }
+
+    def streak(self):
+        """Текущая серия с последнего матча: число побед (>0) или поражений (<0) подряд"""
+        known = self.won[self.won != RESULT_UNKNOWN]
+        if not len(known):
+            return 0
+        breaks = np.flatnonzero(known != known[0])
+        length = int(breaks[0]) if len(breaks) else len(known)
+        return length if known[0] == 1 else -length
+
+    def per_map(self):
+        """
+        Показатели по каждой карте одним проходом bincount:
+        {карта: {"matches", "win_rate", "kd", "avg_kills"}}
+        """
+        size = len(self.maps)
+        matches = np.bincount(self.map_codes, minlength=size)
+        known = self.won != RESULT_UNKNOWN
+        decided = np.bincount(self.map_codes[known], minlength=size)
+        wins = np.bincount(self.map_codes[known], weights=self.won[known], minlength=size)
+        kills = np.bincount(self.map_codes, weights=self.kills, minlength=size)
+        deaths = np.bincount(self.map_codes, weights=self.deaths, minlength=size)
+
+        result = {}
+        for code in np.flatnonzero(matches):
+            result[self.maps[code]] = {
+                "matches": int(matches[code]),
+                "win_rate": 100 * wins[code] / decided[code] if decided[code] else None,
+                "kd": kills[code] / deaths[code] if deaths[code] else None,
+                "avg_kills": kills[code] / matches[code],
+            }
+        return result
+
+    def rolling_kd(self, window):
+        """K/D скользящим окном из window матчей через кумулятивные суммы (от старых к новым)"""
+        kills = np.concatenate(([0], np.cumsum(self.kills[::-1], dtype=np.int64)))
+        deaths = np.concatenate(([0], np.cumsum(self.deaths[::-1], dtype=np.int64)))
+        if len(self) < window:
+            return np.empty(0)
+        window_kills = kills[window:] - kills[:-window]
+        window_deaths = deaths[window:] - deaths[:-window]
+        return window_kills / np.maximum(window_deaths, 1)
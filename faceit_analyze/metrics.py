@@ -0,0 +1,214 @@
+"""
+Счётчики и гистограммы времени горячего пути: этапы сканирования, HTTP,
+кэш, повторы. Экспорт в текстовом формате Prometheus или JSON-строками
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('faceit_tracker')
+
+# Границы корзин гистограмм, секунды
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Гистограмма длительностей с накопительными корзинами, как в Prometheus"""
+    __slots__ = ("count", "sum", "buckets", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.last = None
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.last = value
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=None):
+    items = list(key) + (extra or [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in items) + "}"
+
+
+class Metrics:
+    """Потокобезопасный реестр метрик процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        # Имена метрик, значения которых задаются через set(): экспортируются как gauge
+        self._gauges = set()
+
+    def inc(self, name, amount=1, **labels):
+        """Увеличивает счётчик name с метками labels"""
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        """
+        Устанавливает текущее значение метрики name (gauge): состояние или
+        величина, которая ведётся вне реестра (например, в urllib3)
+        """
+        key = (name, _labels_key(labels))
+        with self._lock:
+            self._gauges.add(name)
+            self._counters[key] = value
+
+    def observe(self, name, seconds, **labels):
+        """Добавляет длительность в гистограмму name с метками labels"""
+        key = (name, _labels_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, timings=None, **labels):
+        """
+        Замеряет блок with в гистограмму name. Если передан словарь timings,
+        длительность записывается и в него под меткой stage (или под name)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(name, elapsed, **labels)
+            if timings is not None:
+                timings[labels.get("stage", name)] = elapsed
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, _labels_key(labels)), 0)
+
+    def total(self, name):
+        """Сумма счётчика name по всем меткам"""
+        with self._lock:
+            return sum(value for (counter_name, _), value in self._counters.items() if counter_name == name)
+
+    def snapshot(self):
+        """Текущие значения: {"counters": {...}, "histograms": {...}} с метками в ключах"""
+        with self._lock:
+            counters = {name + _format_labels(key): value for (name, key), value in self._counters.items()}
+            histograms = {
+                name + _format_labels(key): {"count": h.count, "sum": round(h.sum, 6),
+                                             "avg": round(h.sum / h.count, 6) if h.count else None,
+                                             "last": h.last}
+                for (name, key), h in self._histograms.items()
+            }
+        return {"ts": time.time(), "counters": counters, "histograms": histograms}
+
+    def to_prometheus(self):
+        """Текстовый формат экспорта Prometheus"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            seen = set()
+            for (name, key), value in counters:
+                if name not in seen:
+                    lines.append(f"# TYPE {name} {'gauge' if name in self._gauges else 'counter'}")
+                    seen.add(name)
+                lines.append(f"{name}{_format_labels(key)} {value}")
+            for (name, key), h in histograms:
+                if name not in seen:
+                    lines.append(f"# TYPE {name} histogram")
+                    seen.add(name)
+                for bound, count in zip(BUCKETS, h.buckets):
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {count}")
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {h.count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {h.sum:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._gauges.clear()
+
+
+# Общий реестр процесса
+metrics = Metrics()
+
+
+def endpoint_label(path):
+    """Шаблон эндпоинта без ID для меток: players/{id}/stats, matches/{id} и т.п."""
+    parts = [part for part in path.split("?")[0].strip("/").split("/") if part]
+    if len(parts) > 1:
+        parts[1] = "{id}"
+    return "/".join(parts[:3])
+
+
+def _jsonl_loop(path, interval, stop):
+    while not stop.wait(interval):
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(metrics.snapshot(), ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.error(f"Ошибка записи метрик в {path}: {e}")
+
+
+def start_jsonl_exporter(path, interval=60.0):
+    """Раз в interval секунд дописывает снимок метрик JSON-строкой в path; возвращает Event остановки"""
+    stop = threading.Event()
+    threading.Thread(target=_jsonl_loop, args=(path, interval, stop), daemon=True,
+                     name="faceit-metrics-jsonl").start()
+    return stop
+
+
+def start_prometheus_server(port, host="127.0.0.1"):
+    """Отдаёт метрики по http://host:port/metrics в фоновом потоке"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.to_prometheus().encode()
+            self.send_response(200 if self.path.rstrip("/") in ("", "/metrics") else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="faceit-metrics-http").start()
+    return server
+
+
+def start_exporters_from_env():
+    """Включает экспорт по FACEIT_METRICS_JSONL / FACEIT_METRICS_INTERVAL / FACEIT_METRICS_PORT"""
+    jsonl_path = os.getenv("FACEIT_METRICS_JSONL")
+    if jsonl_path:
+        try:
+            interval = float(os.getenv("FACEIT_METRICS_INTERVAL", 60))
+        except ValueError:
+            interval = 60.0
+        start_jsonl_exporter(jsonl_path, interval)
+    port = os.getenv("FACEIT_METRICS_PORT")
+    if port:
+        try:
+            start_prometheus_server(int(port))
+        except (OSError, ValueError) as e:
+            logger.error(f"Не удалось запустить экспорт метрик на порту {port}: {e}")
@@ -0,0 +1,16 @@
+"""Расположение локальных файлов приложения (кэш, базы данных)"""
+import os
+
+
+def data_dir():
+    """Возвращает каталог данных приложения, создавая его при необходимости"""
+    base = os.getenv("FACEIT_DATA_DIR")
+    if not base:
+        if os.name == 'nt':
+            root = os.getenv("LOCALAPPDATA") or os.path.expanduser("~")
+            base = os.path.join(root, "FACEIT Analyze")
+        else:
+            root = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+            base = os.path.join(root, "faceit-analyze")
+    os.makedirs(base, exist_ok=True)
+    return base
@@ -0,0 +1,204 @@
+"""Конвейер сканирования игрока: после поиска игрока запросы идут параллельно"""
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from faceit_analyze.api import get_player_by_id, get_player_data, get_stats_data
+from faceit_analyze.cache import PROFILE_TTL, STATS_TTL
+from faceit_analyze.countries import get_country_name
+from faceit_analyze.env import _env_int
+from faceit_analyze.metrics import metrics
+from faceit_analyze.segments import parse_stats
+
+logger = logging.getLogger('faceit_tracker')
+
+MAX_WORKERS = _env_int("FACEIT_PIPELINE_WORKERS", 8)
+
+# Этапы, о которых сообщает on_stage по мере готовности
+STAGE_PLAYER = "player"
+STAGE_COUNTRY = "country"
+STAGE_CSGO_FALLBACK = "csgo_fallback"
+STAGE_STATS = "stats"
+
+# Гистограмма длительностей этапов, метка stage: player, stats_cs2, stats_csgo,
+# country, parse, total
+STAGE_METRIC = "faceit_scan_stage_seconds"
+
+# Как часто ожидание ответов проверяет флаг отмены, сек
+CANCEL_POLL = 0.1
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Общий пул потоков для запросов конвейера"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="faceit-scan")
+    return _executor
+
+
+def has_segments(stats_data):
+    """Есть ли в ответе статистики пригодные сегменты"""
+    return bool(stats_data and stats_data.get("segments"))
+
+
+class ScanResult:
+    """Промежуточный и итоговый результат сканирования одного игрока"""
+    __slots__ = ("nickname", "player_data", "stats", "game_id", "country_name", "error", "timings", "stale_age")
+
+    def __init__(self, nickname):
+        self.nickname = nickname
+        self.player_data = None
+        # PlayerStats: исходный JSON статистики после разбора не хранится
+        self.stats = None
+        self.game_id = None
+        self.country_name = None
+        # Текст ошибки API, если сканирование прервалось не из-за отсутствия игрока
+        self.error = None
+        # Длительности этапов сканирования, секунды: {этап: время}
+        self.timings = {}
+        # Возраст самых старых данных из кэша, отданных вместо ответа API (сек), иначе None
+        self.stale_age = None
+
+
+def _timed(timings, stage, func, *args):
+    """Вызывает func, записывая длительность этапа в timings и в метрики"""
+    with metrics.timer(STAGE_METRIC, timings, stage=stage):
+        return func(*args)
+
+
+def run_scan(client, nickname, on_stage=None, executor=None, player_id=None, cancel=None, speculate=True,
+             max_stale=None):
+    """
+    Сканирует игрока. После получения player_id статистика CS:2, CS:GO и
+    название страны запрашиваются одновременно; если у CS:2 есть сегменты,
+    запрос CS:GO отменяется, а если он уже ушёл - его ответ отбрасывается.
+    Если свежая статистика CS:2 есть в кэше, CS:GO заранее не запрашивается.
+    С speculate=False статистика CS:GO запрашивается только после пустого
+    ответа CS:2: так сканирование потока игроков тратит на каждого два
+    запроса квоты, а не три. on_stage(stage, result) вызывается после
+    каждого завершённого этапа. Если player_id уже известен (например, из
+    комнаты матча), игрок запрашивается по нему, без поиска по никнейму.
+    Длительности этапов сохраняются в result.timings. max_stale - как у
+    FaceitClient.get_json: устаревшие не больше чем на столько секунд
+    профиль и статистика отдаются из кэша сразу (это нужно интерфейсу, а
+    не разовым запускам). Если профиль или статистика взяты из устаревшего
+    кэша (API недоступен или обновление идёт в фоне), их возраст - в
+    result.stale_age. Если установлен
+    threading.Event cancel, сканирование прекращается на ближайшем этапе,
+    а ещё не начатые запросы отменяются
+    """
+    result = ScanResult(nickname)
+    with metrics.timer(STAGE_METRIC, result.timings, stage="total"):
+        _run_scan(result, client, nickname, on_stage, executor, player_id, cancel, speculate, max_stale)
+    if result.player_data:
+        result.stale_age = _stale_age(client, result, nickname, player_id)
+    return result
+
+
+def _stale_age(client, result, nickname, player_id):
+    """Возраст устаревших записей кэша, из которых собран результат"""
+    ages = [client.stale_age(f"players/{player_id}") if player_id
+            else client.stale_age("players", {"nickname": nickname})]
+    if result.game_id:
+        ages.append(client.stale_age(f"players/{result.player_data.get('player_id')}/stats/{result.game_id}"))
+    ages = [age for age in ages if age is not None]
+    return max(ages) if ages else None
+
+
+def _run_scan(result, client, nickname, on_stage, executor, player_id, cancel, speculate, max_stale):
+    timings = result.timings
+    # Отмена запроса CS:GO, пока он ждёт квоту: сам future отменяется, только если ещё не начат
+    csgo_cancel = threading.Event()
+
+    def emit(stage):
+        if on_stage is not None:
+            on_stage(stage, result)
+
+    def should_speculate():
+        # Свежая статистика CS:2 в кэше придёт сразу: запрос CS:GO ничего не ускорит
+        return speculate and not client.is_cached(f"players/{player_id}/stats/cs2", ttl=STATS_TTL)
+
+    def submit_stats(game_id, request_cancel=None):
+        return executor.submit(_timed, timings, f"stats_{game_id}", get_stats_data, client, player_id, game_id,
+                               max_stale, request_cancel)
+
+    def drop_csgo(future):
+        csgo_cancel.set()
+        if future is not None:
+            future.cancel()
+
+    def cancelled(*futures):
+        if cancel is None or not cancel.is_set():
+            return False
+        csgo_cancel.set()
+        for future in futures:
+            if future is not None:
+                future.cancel()
+        return True
+
+    executor = executor or get_executor()
+    cs2_future = csgo_future = None
+    if player_id:
+        # player_id известен заранее: статистика запрашивается одновременно с профилем
+        cs2_future = submit_stats("cs2")
+        if should_speculate():
+            csgo_future = submit_stats("csgo", csgo_cancel)
+        try:
+            player_data = _timed(timings, "player", get_player_by_id, client, player_id, PROFILE_TTL, max_stale)
+        except Exception:
+            cs2_future.cancel()
+            drop_csgo(csgo_future)
+            raise
+    else:
+        player_data = _timed(timings, "player", get_player_data, client, nickname, max_stale)
+    if not player_data:
+        if cs2_future is not None:
+            cs2_future.cancel()
+            drop_csgo(csgo_future)
+        return
+    if cancelled(cs2_future, csgo_future):
+        return
+    result.player_data = player_data
+    emit(STAGE_PLAYER)
+
+    if cs2_future is None:
+        player_id = player_data.get("player_id")
+        cs2_future = submit_stats("cs2")
+        if should_speculate():
+            csgo_future = submit_stats("csgo", csgo_cancel)
+    country_future = executor.submit(_timed, timings, "country", get_country_name, player_data.get("country", "Н/Д"))
+
+    pending = {country_future, cs2_future}
+    while pending:
+        done, pending = wait(pending, timeout=CANCEL_POLL if cancel is not None else None,
+                             return_when=FIRST_COMPLETED)
+        if cancelled(country_future, cs2_future, csgo_future):
+            return
+        for future in done:
+            if future is country_future:
+                result.country_name = future.result()
+                emit(STAGE_COUNTRY)
+            elif future is cs2_future:
+                stats_data = future.result()
+                if has_segments(stats_data):
+                    # Запрос CS:GO больше не нужен: не отправляем его, если он ещё ждёт квоту
+                    drop_csgo(csgo_future)
+                    result.stats = _timed(timings, "parse", parse_stats, stats_data)
+                    result.game_id = "cs2"
+                    emit(STAGE_STATS)
+                else:
+                    emit(STAGE_CSGO_FALLBACK)
+                    if csgo_future is None:
+                        csgo_future = submit_stats("csgo")
+                    pending.add(csgo_future)
+            elif future is csgo_future:
+                stats_data = future.result()
+                if stats_data:
+                    result.stats = _timed(timings, "parse", parse_stats, stats_data)
+                    result.game_id = "csgo"
+                    emit(STAGE_STATS)
@@ -0,0 +1,156 @@
+"""
+Предзагрузка вероятных следующих запросов: после сканирования игрока в
+кэш ответов заранее попадают профили и статистика его напарников и
+соперников, чтобы следующий SCAN отвечал из кэша
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+from faceit_analyze.cache import PROFILE_TTL, STATS_TTL
+from faceit_analyze.client import FaceitAPIError
+from faceit_analyze.env import _env_int
+from faceit_analyze.metrics import metrics
+from faceit_analyze.pipeline import has_segments
+
+logger = logging.getLogger('faceit_tracker')
+
+# Сколько запросов к API можно потратить на предзагрузку после одного сканирования
+# (ответы из кэша не считаются); 0 - предзагрузка выключена
+BUDGET = _env_int("FACEIT_PREFETCH_BUDGET", 30)
+# Сколько игроков из истории ставится в очередь
+MAX_TARGETS = _env_int("FACEIT_PREFETCH_PLAYERS", 15)
+
+# Как часто проверяется, закончилось ли сканирование пользователя, сек
+IDLE_POLL = 0.2
+
+
+class PrefetchTarget:
+    """Игрок, которого скорее всего будут искать следующим"""
+    __slots__ = ("nickname", "player_id", "game_id")
+
+    def __init__(self, nickname, player_id, game_id):
+        self.nickname = nickname
+        self.player_id = player_id
+        self.game_id = game_id
+
+
+def targets_from_history(player_id, game_id, items, limit=MAX_TARGETS):
+    """
+    Напарники и соперники игрока из элементов истории матчей (сначала новые):
+    первыми идут участники незавершённого (текущего) матча, дальше - в
+    порядке последней совместной игры
+    """
+    current = [item for item in items if (item.get("status") or "finished").lower() != "finished"]
+    finished = [item for item in items if (item.get("status") or "finished").lower() == "finished"]
+    targets = {}
+    for item in current + finished:
+        for faction in (item.get("teams") or {}).values():
+            for player in faction.get("players") or faction.get("roster") or []:
+                other_id = player.get("player_id")
+                nickname = player.get("nickname")
+                if other_id and nickname and other_id != player_id and other_id not in targets:
+                    targets[other_id] = PrefetchTarget(nickname, other_id, item.get("game_id") or game_id)
+                    if len(targets) >= limit:
+                        return list(targets.values())
+    return list(targets.values())
+
+
+class _BudgetSpent(Exception):
+    pass
+
+
+class Prefetcher:
+    """
+    Фоновая предзагрузка в одном потоке с низким приоритетом: запросы идут
+    по одному и только пока busy() ложно, поэтому сканирование пользователя
+    не делит с ними ни квоту, ни соединения. Новая очередь заменяет старую
+    """
+
+    def __init__(self, client, busy=None, budget=BUDGET):
+        self.client = client
+        self.busy = busy
+        self.budget = budget
+        self._queue = deque()
+        self._remaining = 0
+        self._generation = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = None
+
+    @property
+    def enabled(self):
+        # Без кэша ответов предзагруженное некуда положить
+        return self.budget > 0 and self.client.cache is not None
+
+    def submit(self, targets):
+        """Заменяет очередь предзагрузки и возобновляет бюджет запросов"""
+        if not self.enabled or not targets:
+            return
+        with self._cond:
+            self._queue = deque(targets)
+            self._remaining = self.budget
+            self._generation += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, daemon=True, name="faceit-prefetch")
+                self._thread.start()
+            self._cond.notify()
+        metrics.inc("faceit_prefetch_targets_total", len(targets))
+
+    def submit_history(self, player_id, game_id, items):
+        """Ставит в очередь напарников и соперников из истории матчей игрока"""
+        self.submit(targets_from_history(player_id, game_id, items))
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._queue.clear()
+            self._cond.notify()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                target = self._queue.popleft()
+                generation = self._generation
+            try:
+                self._warm(target, generation)
+            except _BudgetSpent:
+                with self._cond:
+                    if self._generation == generation:
+                        self._queue.clear()
+            except FaceitAPIError as e:
+                logger.info(f"Предзагрузка {target.nickname} прервана: {e}")
+            except Exception as e:
+                logger.error(f"Ошибка предзагрузки {target.nickname}: {e}")
+
+    def _get(self, generation, path, params=None, ttl=None):
+        """get_json, оплаченный из бюджета, если ответа нет в кэше"""
+        if self.client.is_cached(path, params, ttl):
+            metrics.inc("faceit_prefetch_requests_total", result="cached")
+            return self.client.get_json(path, params=params, ttl=ttl)
+        # Сканирование пользователя идёт первым: ждём, пока оно закончится
+        while self.busy is not None and self.busy() and not self._closed:
+            time.sleep(IDLE_POLL)
+        with self._cond:
+            # Очередь заменили или закрыли, пока ждали: цель устарела
+            if self._closed or self._generation != generation or self._remaining <= 0:
+                raise _BudgetSpent()
+            self._remaining -= 1
+        metrics.inc("faceit_prefetch_requests_total", result="fetched")
+        return self.client.get_json(path, params=params, ttl=ttl)
+
+    def _warm(self, target, generation):
+        """
+        Профиль по player_id и статистика; CS:GO - если у CS:2 нет сегментов.
+        Игроки из истории попадают в справочник никнеймов, и SCAN ищет их
+        профиль по player_id, а не по никнейму - греется тот же ключ кэша
+        """
+        self._get(generation, f"players/{target.player_id}", ttl=PROFILE_TTL)
+        stats = self._get(generation, f"players/{target.player_id}/stats/{target.game_id}", ttl=STATS_TTL)
+        if target.game_id == "cs2" and not has_segments(stats):
+            self._get(generation, f"players/{target.player_id}/stats/csgo", ttl=STATS_TTL)
@@ -0,0 +1,324 @@
+"""
+Общий локальный прокси FACEIT Data API: несколько экземпляров приложения
+и скриптов на одной машине (или в локальной сети) используют один кэш
+ответов, одну квоту ключей, а одинаковые одновременные запросы сливаются
+в один запрос к API.
+
+Запуск: python -m faceit_analyze.proxy, затем у клиентов в .env
+FACEIT_BASE_URL=http://127.0.0.1:8766/data/v4
+
+Прокси тратит квоту ключей владельца, поэтому на адресе не из loopback он
+запускается только с общим секретом FACEIT_PROXY_TOKEN: запросы без него
+в заголовке X-Proxy-Token получают 401
+"""
+import argparse
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from faceit_analyze.cache import MATCH_TTL, PROFILE_TTL, STATS_TTL, CacheEntry, ResponseCache
+from faceit_analyze.client import BASE_URL, PROXY_TOKEN_ENV, PROXY_TOKEN_HEADER, FaceitAPIError, FaceitClient
+from faceit_analyze.env import _env_int, api_keys_from_env
+from faceit_analyze.metrics import endpoint_label, metrics
+from faceit_analyze.paths import data_dir
+
+logger = logging.getLogger('faceit_tracker')
+
+PORT = _env_int("FACEIT_PROXY_PORT", 8766)
+# Префикс пути как у настоящего API, чтобы в клиентах менялся только хост
+API_PREFIX = "/data/v4"
+
+# Статистика завершённого матча не меняется
+MATCH_STATS_TTL = 24 * 3600
+# Время жизни для клиентов, не приславших Cache-Control: max-age (curl, сторонние скрипты)
+ENDPOINT_TTLS = {
+    "players": PROFILE_TTL,
+    "players/{id}": PROFILE_TTL,
+    "players/{id}/stats": STATS_TTL,
+    "matches/{id}": MATCH_TTL,
+    "matches/{id}/stats": MATCH_STATS_TTL,
+}
+# Прочее (история матчей) без max-age всегда перепроверяется у API
+DEFAULT_TTL = 0
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def is_loopback(host):
+    """Доступен ли адрес только с этой машины"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def requested_max_age(cache_control, path):
+    """Допустимый возраст ответа, сек: из Cache-Control клиента или по эндпоинту"""
+    if cache_control:
+        if "no-cache" in cache_control or "no-store" in cache_control:
+            return 0
+        match = _MAX_AGE.search(cache_control)
+        if match:
+            return int(match.group(1))
+    return ENDPOINT_TTLS.get(endpoint_label(path), DEFAULT_TTL)
+
+
+class ProxyResponse:
+    """
+    Результат запроса через прокси; result - hit, revalidated, miss,
+    coalesced, stale (API недоступен, отдана устаревшая запись), passthrough или error
+    """
+    __slots__ = ("status", "entry", "result", "body")
+
+    def __init__(self, status, entry=None, result="miss", body=None):
+        self.status = status
+        self.entry = entry
+        self.result = result
+        # Тело ответа без записи в кэше (ошибки и прочие не-200)
+        self.body = body
+
+    def coalesced(self):
+        return ProxyResponse(self.status, self.entry, "coalesced", self.body)
+
+
+class _Flight:
+    """Запрос к API, которого ждут одинаковые одновременные запросы"""
+    __slots__ = ("done", "response")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+
+
+class SharedFetcher:
+    """
+    Кэш ответов поверх клиента API: свежая запись отдаётся без запроса,
+    устаревшая перепроверяется по ETag/Last-Modified. Пока один запрос
+    ключа идёт к API, остальные такие же ждут его результат. Если API не
+    отвечает (или автомат защиты клиента разомкнут), отдаётся устаревшая запись
+    """
+
+    def __init__(self, client, cache):
+        self.client = client
+        self.cache = cache
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, path, params, max_age):
+        key = self.cache.make_key(path, params)
+        entry = self.cache.get(key)
+        if entry is not None and max_age > 0 and entry.is_fresh(max_age):
+            return ProxyResponse(200, entry, "hit")
+        if entry is not None and self.client.breaker.is_open():
+            return ProxyResponse(200, entry, "stale")
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            return flight.response.coalesced()
+
+        try:
+            flight.response = self._upstream(key, path, params, entry)
+        except FaceitAPIError as e:
+            logger.warning(f"Прокси: {e}")
+            if entry is not None:
+                flight.response = ProxyResponse(200, entry, "stale")
+            else:
+                flight.response = ProxyResponse(e.status or 502, result="error",
+                                                body={"errors": [{"message": str(e)}]})
+        finally:
+            if flight.response is None:
+                flight.response = ProxyResponse(502, result="error", body={"errors": [{"message": "proxy error"}]})
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.response
+
+    def _upstream(self, key, path, params, entry):
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        response = self.client.get(path, params=params, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(key)
+            return ProxyResponse(200, entry, "revalidated")
+        if response.status_code == 200:
+            data = response.json()
+            etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+            self.cache.set(key, data, etag, last_modified)
+            return ProxyResponse(200, CacheEntry(data, etag, last_modified, time.time()), "miss")
+        try:
+            body = response.json()
+        except ValueError:
+            body = {"errors": [{"message": response.text}]}
+        return ProxyResponse(response.status_code, result="passthrough", body=body)
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    fetcher = None
+    # Общий секрет; None - проверка выключена (только loopback)
+    token = None
+
+    def log_message(self, format, *args):
+        logger.debug("Прокси: " + format % args)
+
+    def _send(self, status, data=b"", headers=None, content_type="application/json"):
+        self.send_response(status)
+        if data:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def _authorized(self):
+        """Прислан ли общий секрет (если он задан); сравнение - за постоянное время"""
+        if self.token is None:
+            return True
+        return hmac.compare_digest(self.headers.get(PROXY_TOKEN_HEADER, "").encode(), self.token.encode())
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path[len(API_PREFIX):] if url.path.startswith(API_PREFIX + "/") else url.path
+        path = path.strip("/")
+        endpoint = endpoint_label(path)
+        if not self._authorized():
+            metrics.inc("faceit_proxy_requests_total", endpoint=endpoint, result="unauthorized")
+            body = {"errors": [{"message": f"Нет или неверный заголовок {PROXY_TOKEN_HEADER}"}]}
+            return self._send(401, json.dumps(body, ensure_ascii=False).encode())
+        if url.path == "/metrics":
+            return self._send(200, metrics.to_prometheus().encode(), content_type="text/plain; version=0.0.4")
+
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+        with metrics.timer("faceit_proxy_request_seconds", endpoint=endpoint):
+            response = self.fetcher.fetch(path, params,
+                                          requested_max_age(self.headers.get("Cache-Control"), path))
+            metrics.inc("faceit_proxy_requests_total", endpoint=endpoint, result=response.result)
+            if response.entry is None:
+                return self._send(response.status, json.dumps(response.body, ensure_ascii=False).encode())
+
+            entry = response.entry
+            data = json.dumps(entry.data, ensure_ascii=False, separators=(",", ":")).encode()
+            # Без ETag от API клиенты получают свой, по содержимому: перепроверка тогда стоит ответа 304
+            etag = entry.etag or 'W/"%s"' % hashlib.sha1(data).hexdigest()[:20]
+            headers = {"ETag": etag, "Age": str(int(entry.age)), "X-Cache": response.result}
+            if entry.last_modified:
+                headers["Last-Modified"] = entry.last_modified
+            if response.result == "stale":
+                headers["Warning"] = '110 - "Response is Stale"'
+            if self.headers.get("If-None-Match") == etag or (
+                    entry.last_modified and self.headers.get("If-Modified-Since") == entry.last_modified):
+                return self._send(304, headers=headers)
+            self._send(200, data, headers)
+
+
+class CacheProxy:
+    """
+    Прокси в фоновом потоке: with CacheProxy(client, cache) as proxy: proxy.base_url.
+    token - общий секрет клиентов; без него прокси слушает только loopback
+    """
+
+    def __init__(self, client, cache, host="127.0.0.1", port=PORT, token=None):
+        if not token and not is_loopback(host):
+            raise ValueError(f"Прокси на {host} доступен из сети и тратил бы квоту ключей любого, "
+                             f"кто до него дотянется: задайте {PROXY_TOKEN_ENV}")
+        self.client = client
+        self.cache = cache
+        handler = type("BoundProxyHandler", (ProxyHandler,),
+                       {"fetcher": SharedFetcher(client, cache), "token": token or None})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True, name="faceit-proxy")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m faceit_analyze.proxy",
+        description="Общий кэширующий прокси FACEIT Data API для нескольких экземпляров приложения и скриптов"
+    )
+    parser.add_argument("--host", default="127.0.0.1",
+                        help=f"адрес прослушивания; не loopback - только с {PROXY_TOKEN_ENV}")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--upstream", default=BASE_URL, help="адрес FACEIT Data API")
+    parser.add_argument("--cache", default=None, help="файл кэша прокси (SQLite)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="подробный лог в stderr")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stderr)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    api_keys = api_keys_from_env()
+    if not api_keys:
+        print("FACEIT_API_KEY не найден в переменных окружения. Проверьте файл .env", file=sys.stderr)
+        return 2
+
+    token = os.getenv(PROXY_TOKEN_ENV)
+    if not token and not is_loopback(args.host):
+        print(f"Прокси на {args.host} доступен из сети: задайте общий секрет {PROXY_TOKEN_ENV} "
+              f"(его же - у клиентов)", file=sys.stderr)
+        return 2
+
+    cache = ResponseCache(args.cache or os.path.join(data_dir(), "proxy-cache.sqlite3"))
+    # Адрес API задаётся явно: FACEIT_BASE_URL в том же .env может указывать на сам прокси
+    client = FaceitClient(api_keys, base_url=args.upstream)
+    # Секрет прокси из того же .env не должен уходить в FACEIT API
+    client.session.headers.pop(PROXY_TOKEN_HEADER, None)
+    proxy = CacheProxy(client, cache, args.host, args.port, token)
+    print(f"Прокси FACEIT API: {proxy.base_url} (ключей: {len(client.keys)})")
+    try:
+        proxy.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        proxy.httpd.server_close()
+        client.close()
+        cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
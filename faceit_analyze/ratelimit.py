@@ -0,0 +1,95 @@
+"""Ограничение частоты запросов к FACEIT Data API: token bucket и backoff"""
+import email.utils
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Потокобезопасный token bucket: rate токенов в секунду, не больше capacity.
+    pause() останавливает выдачу токенов всем потокам, например по Retry-After
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def _take_locked(self, now):
+        """Забирает токен и возвращает 0 или возвращает, сколько секунд ждать следующего"""
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def try_acquire(self):
+        """Забирает токен без ожидания: 0, если получилось, иначе время до следующего токена, сек"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            return self._take_locked(time.monotonic())
+
+    def available(self):
+        """Сколько токенов доступно прямо сейчас (без учёта паузы)"""
+        if self.rate <= 0:
+            return self.capacity
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return 0.0
+            self._refill(now)
+            return self._tokens
+
+    def acquire(self, deadline=None):
+        """
+        Ждёт токен. deadline - момент time.monotonic(), после которого ждать
+        бессмысленно: тогда возвращает False, не забирая токен
+        """
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Не выдавать токены seconds секунд; накопленный запас сгорает"""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0
+            self._updated = self._paused_until
+
+
+def parse_retry_after(value):
+    """Заголовок Retry-After (секунды или HTTP-дата) в секундах, иначе None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - time.time())
+
+
+def backoff_delay(attempt, base, cap):
+    """Задержка перед повтором attempt (с нуля): экспонента с полным джиттером"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
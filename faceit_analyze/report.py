@@ -0,0 +1,124 @@
+"""Плоский отчёт по игроку для скриптов и CLI, без зависимости от интерфейса"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from faceit_analyze.analysis import analyze_maps, calculate_avg_stats
+from faceit_analyze.env import _env_int
+from faceit_analyze.pipeline import ScanResult, run_scan
+
+logger = logging.getLogger('faceit_tracker')
+
+# Сколько игроков пакетного анализа сканируется одновременно
+MAX_WORKERS = _env_int("FACEIT_BATCH_WORKERS", 8)
+
+# Поля отчёта в порядке колонок CSV
+FIELDS = (
+    "nickname", "status", "error", "player_id", "country", "game", "level", "elo",
+    "matches", "total_kills", "total_deaths", "avg_kills", "avg_deaths", "kd",
+    "win_rate", "headshots", "current_win_streak", "longest_win_streak",
+    "best_map", "worst_map", "stale_age",
+)
+
+STATUS_OK = "ok"
+STATUS_NOT_FOUND = "not_found"
+STATUS_NO_STATS = "no_stats"
+STATUS_ERROR = "error"
+
+
+def _number(value):
+    """Число для отчёта (целые - как int) из строки вида '1.23' или числа; иначе None"""
+    if value is None or value == "Н/Д":
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def build_report(result):
+    """Собирает словарь с полями FIELDS из ScanResult"""
+    report = dict.fromkeys(FIELDS)
+    player_data = result.player_data or {}
+    report["nickname"] = player_data.get("nickname") or result.nickname
+    # Данные старше TTL из кэша: API не ответил или автомат защиты разомкнут
+    if result.stale_age is not None:
+        report["stale_age"] = round(result.stale_age)
+
+    if result.error:
+        report["status"] = STATUS_ERROR
+        report["error"] = result.error
+        return report
+    if not player_data:
+        report["status"] = STATUS_NOT_FOUND
+        return report
+
+    games = player_data.get("games", {})
+    game = games.get(result.game_id or "cs2") or games.get("cs2") or games.get("csgo") or {}
+    report.update({
+        "player_id": player_data.get("player_id"),
+        "country": result.country_name or player_data.get("country"),
+        "game": result.game_id,
+        "level": game.get("skill_level"),
+        "elo": game.get("faceit_elo"),
+    })
+    if not result.stats:
+        report["status"] = STATUS_NO_STATS
+        return report
+
+    lifetime = result.stats.lifetime
+    segments = result.stats.segments
+    avg_kills, avg_deaths, total_matches, total_kills, total_deaths = \
+        calculate_avg_stats(lifetime, segments, result.game_id)
+    best_map, worst_map = analyze_maps(segments, result.game_id)
+    report.update({
+        "status": STATUS_OK,
+        "matches": total_matches,
+        "total_kills": total_kills,
+        "total_deaths": total_deaths,
+        "avg_kills": _number(avg_kills),
+        "avg_deaths": _number(avg_deaths),
+        "kd": _number(lifetime.kd),
+        "win_rate": _number(lifetime.win_rate),
+        "headshots": _number(lifetime.headshots),
+        "current_win_streak": _number(lifetime.current_win_streak),
+        "longest_win_streak": _number(lifetime.longest_win_streak),
+        "best_map": best_map["name"] if best_map else None,
+        "worst_map": worst_map["name"] if worst_map else None,
+    })
+    return report
+
+
+def scan_player(client, nickname, executor=None):
+    """Сканирует одного игрока; ошибка API попадает в result.error, а не бросается"""
+    try:
+        # Поток игроков упирается в квоту: CS:GO запрашивается только как запасной вариант
+        return run_scan(client, nickname, executor=executor, speculate=False)
+    except Exception as e:
+        logger.error(f"Ошибка анализа игрока {nickname}: {e}")
+        result = ScanResult(nickname)
+        result.error = str(e)
+        return result
+
+
+def analyze_player(client, nickname, executor=None):
+    """Сканирует одного игрока и возвращает его отчёт; ошибки API попадают в поле error"""
+    return build_report(scan_player(client, nickname, executor))
+
+
+def scan_players(client, nicknames, max_workers=MAX_WORKERS):
+    """
+    Сканирует игроков в ограниченном пуле потоков и отдаёт ScanResult по мере
+    готовности, сохраняя порядок входного списка
+    """
+    workers = max(1, max_workers)
+    # Вложенные запросы run_scan идут в отдельный пул, как и в scan_lobby
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="faceit-batch") as batch_pool, \
+            ThreadPoolExecutor(max_workers=workers * 3, thread_name_prefix="faceit-batch-io") as io_pool:
+        yield from batch_pool.map(lambda nickname: scan_player(client, nickname, io_pool), nicknames)
+
+
+def analyze_players(client, nicknames, max_workers=MAX_WORKERS):
+    """Отчёты по игрокам (см. scan_players) в порядке входного списка"""
+    for result in scan_players(client, nicknames, max_workers):
+        yield build_report(result)
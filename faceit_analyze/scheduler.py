@@ -0,0 +1,93 @@
+"""Планировщик сканирований интерфейса: ограниченный пул, отмена устаревших и слияние повторов"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from faceit_analyze.env import _env_int
+
+logger = logging.getLogger('faceit_tracker')
+
+# Потоков сканирования: новому запросу не приходится ждать, пока отменённый
+# предыдущий дойдёт до ближайшей проверки флага отмены
+MAX_WORKERS = _env_int("FACEIT_SCAN_WORKERS", 2)
+
+
+class ScanTicket:
+    """
+    Запрос на сканирование. Задача проверяет is_current() перед выводом
+    результата и передаёт cancelled (threading.Event) в run_scan / scan_lobby
+    """
+    __slots__ = ("key", "cancelled", "future", "_scheduler")
+
+    def __init__(self, scheduler, key):
+        self.key = key
+        self.cancelled = threading.Event()
+        self.future = None
+        self._scheduler = scheduler
+
+    def is_current(self):
+        """Последний ли это запрос и не отменён ли он"""
+        return not self.cancelled.is_set() and self._scheduler.current is self
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class ScanScheduler:
+    """
+    Выполняет сканирования в ограниченном пуле. Новый запрос отменяет
+    предыдущий; повторный запрос того же ключа, пока первый ещё идёт,
+    присоединяется к нему вместо запуска второго сканирования
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="faceit-ui-scan")
+        self._lock = threading.Lock()
+        self.current = None
+
+    def _pending_locked(self, key):
+        current = self.current
+        return current is not None and current.key == key and not current.cancelled.is_set() \
+            and current.future is not None and not current.future.done()
+
+    def is_pending(self, key):
+        """Идёт ли уже запрос с этим ключом (новый с тем же ключом будет слит с ним)"""
+        with self._lock:
+            return self._pending_locked(key)
+
+    def is_busy(self):
+        """Выполняется ли сейчас какой-либо запрос"""
+        with self._lock:
+            current = self.current
+            return current is not None and current.future is not None and not current.future.done()
+
+    def submit(self, key, func, *args):
+        """Запускает func(ticket, *args) и возвращает ticket (возможно, уже идущего запроса)"""
+        with self._lock:
+            current = self.current
+            if self._pending_locked(key):
+                return current
+            if current is not None:
+                current.cancel()
+            ticket = ScanTicket(self, key)
+            self.current = ticket
+            ticket.future = self._executor.submit(self._run, ticket, func, args)
+        return ticket
+
+    @staticmethod
+    def _run(ticket, func, args):
+        if ticket.cancelled.is_set():
+            return
+        try:
+            func(ticket, *args)
+        except Exception as e:
+            logger.error(f"Ошибка сканирования {ticket.key}: {e}")
+
+    def shutdown(self):
+        """Отменяет текущий запрос и ещё не начатые задачи, не дожидаясь идущих"""
+        with self._lock:
+            if self.current is not None:
+                self.current.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,101 @@
+"""Типизированная модель ответа статистики FACEIT: разбирается один раз на игрока"""
+import logging
+
+logger = logging.getLogger('faceit_tracker')
+
+# Варианты ключей API для каждого поля сегмента в порядке приоритета:
+# берётся первое положительное значение
+SEGMENT_ALIASES = {
+    "matches": ("Matches", "Games"),
+    "kills": ("Kills", "K", "Total Kills", "Frags"),
+    "deaths": ("Deaths", "D", "Total Deaths"),
+}
+
+LIFETIME_KEYS = {
+    "matches": "Matches",
+    "kd": "Average K/D Ratio",
+    "win_rate": "Win Rate %",
+    "headshots": "Average Headshots %",
+    "current_win_streak": "Current Win Streak",
+    "longest_win_streak": "Longest Win Streak",
+}
+
+
+def parse_number(value):
+    """
+    Число из значения API или None. Обычные строки вида '1.23' разбираются
+    сразу, посимвольная очистка ('1 234', '52%') - только если это не удалось
+    """
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    cleaned = ''.join(c for c in str(value) if c.isdigit() or c == '.')
+    try:
+        return float(cleaned) if cleaned else None
+    except ValueError:
+        return None
+
+
+def _count(stats, aliases):
+    """Первое положительное целое среди ключей aliases, иначе 0"""
+    for key in aliases:
+        if key in stats:
+            value = parse_number(stats[key])
+            if value and value >= 1:
+                return int(value)
+    return 0
+
+
+class LifetimeStats:
+    """Итоговая статистика игрока за всё время; отсутствующие поля - None"""
+    __slots__ = ("matches", "deaths", "kd", "win_rate", "headshots", "current_win_streak", "longest_win_streak")
+
+    def __init__(self, lifetime):
+        for field, key in LIFETIME_KEYS.items():
+            setattr(self, field, parse_number(lifetime.get(key)))
+        self.matches = int(self.matches or 0)
+        deaths = lifetime.get("Deaths", lifetime.get("Total Deaths"))
+        self.deaths = int(parse_number(deaths) or 0) if deaths is not None else None
+
+
+class MapSegment:
+    """Сегмент статистики (обычно карта) с уже разобранными числами"""
+    __slots__ = ("label", "game", "matches", "kills", "deaths", "average_kills", "win_rate", "kd")
+
+    def __init__(self, segment):
+        stats = segment.get("stats", {})
+        self.label = segment.get("label")
+        self.game = segment.get("game")
+        self.matches = _count(stats, SEGMENT_ALIASES["matches"])
+        self.kills = _count(stats, SEGMENT_ALIASES["kills"])
+        self.deaths = _count(stats, SEGMENT_ALIASES["deaths"])
+        self.average_kills = parse_number(stats.get("Average Kills"))
+        self.win_rate = int(parse_number(stats.get("Win Rate %")) or 0)
+        self.kd = parse_number(stats.get("Average K/D Ratio")) or 0.0
+
+
+class PlayerStats:
+    """Разобранный ответ /players/{id}/stats/{game}: lifetime и сегменты"""
+    __slots__ = ("lifetime", "segments", "map_table")
+
+    def __init__(self, lifetime, segments):
+        self.lifetime = lifetime
+        self.segments = segments
+        # MapTable, строится при первом обращении (analysis.get_map_table)
+        self.map_table = None
+
+
+def parse_stats(stats_data):
+    """Разбирает ответ статистики; сегменты без блока stats отбрасываются"""
+    segments = []
+    for segment in stats_data.get("segments", []):
+        if "stats" not in segment:
+            continue
+        try:
+            segments.append(MapSegment(segment))
+        except Exception as e:
+            logger.error(f"Ошибка при разборе сегмента '{segment.get('label', 'Неизвестный')}': {e}")
+    return PlayerStats(LifetimeStats(stats_data.get("lifetime", {})), segments)
@@ -0,0 +1,91 @@
+"""
+Замеры холодного старта интерфейса: этапы от начала загрузки до первого
+кадра и время импорта по пакетам (--profile-startup)
+"""
+import builtins
+import sys
+import threading
+import time
+
+from faceit_analyze.metrics import metrics
+
+PROFILE_FLAG = "--profile-startup"
+
+# Гистограмма этапов запуска, метка stage
+STARTUP_METRIC = "faceit_startup_seconds"
+
+
+class StartupProfiler:
+    """
+    Отметки этапов запуска (секунды от создания профилировщика) пишутся
+    всегда. При enabled дополнительно замеряется собственное время импорта
+    каждого пакета верхнего уровня: вложенные импорты других пакетов
+    вычитаются из времени импортировавшего их пакета
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.marks = []
+        self.imports = {}
+        self._original_import = None
+        if enabled:
+            self._install()
+
+    @classmethod
+    def from_argv(cls, argv):
+        """Включается флагом --profile-startup; флаг убирается из argv, его не должен видеть разбор аргументов Kivy"""
+        enabled = PROFILE_FLAG in argv
+        while PROFILE_FLAG in argv:
+            argv.remove(PROFILE_FLAG)
+        return cls(enabled)
+
+    def mark(self, stage):
+        """Отмечает завершение этапа запуска"""
+        elapsed = time.perf_counter() - self.started
+        self.marks.append((stage, elapsed))
+        metrics.observe(STARTUP_METRIC, elapsed, stage=stage)
+
+    def _install(self):
+        original = self._original_import = builtins.__import__
+        imports = self.imports
+        state = threading.local()
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            # Уже загруженные модули и относительные импорты не замеряются отдельно
+            if level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            stack = getattr(state, "stack", None)
+            if stack is None:
+                stack = state.stack = []
+            package = name.partition(".")[0]
+            frame = [package, time.perf_counter(), 0.0]
+            stack.append(frame)
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                stack.pop()
+                elapsed = time.perf_counter() - frame[1]
+                imports[package] = imports.get(package, 0.0) + elapsed - frame[2]
+                if stack:
+                    stack[-1][2] += elapsed
+
+        builtins.__import__ = timed_import
+
+    def finish(self):
+        """Снимает перехват импортов; возвращает отчёт, если профилирование включено"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+        return self.report() if self.enabled else None
+
+    def report(self, top=15):
+        """Текстовый отчёт: этапы запуска и самые долгие импорты, мс"""
+        lines = ["Этапы запуска, мс от начала загрузки:"]
+        lines += [f"  {stage:<24} {elapsed * 1000:8.1f}" for stage, elapsed in self.marks]
+        if self.imports:
+            lines.append("Импорт по пакетам (собственное время), мс:")
+            ranked = sorted(self.imports.items(), key=lambda item: item[1], reverse=True)
+            lines += [f"  {package:<24} {seconds * 1000:8.1f}" for package, seconds in ranked[:top]]
+            lines.append(f"  {'всего':<24} {sum(self.imports.values()) * 1000:8.1f}")
+        return "\n".join(lines)
@@ -0,0 +1,273 @@
+"""
+Командный анализ: сводка по составу из нескольких игроков - винрейт и
+рейтинг команды по картам, разброс K/D, лучшая и худшая карта команды.
+Состав задаётся списком игроков, комнатой матча или берётся из последних
+матчей одного игрока (с кем он чаще всего играет в одной команде)
+"""
+import logging
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from faceit_analyze.analysis import MIN_MAP_MATCHES, get_map_table, map_confidence, map_rating
+from faceit_analyze.api import get_match_history
+from faceit_analyze.env import _env_int
+from faceit_analyze.lobby import MAX_WORKERS, get_match_teams, parse_lobby_input, scan_rosters
+from faceit_analyze.metrics import metrics
+
+logger = logging.getLogger('faceit_tracker')
+
+# Размер команды, который собирается из последних матчей игрока
+TEAM_SIZE = 5
+# Сколько последних матчей просматривается в поисках постоянных напарников
+ROSTER_MATCHES = _env_int("FACEIT_TEAM_ROSTER_MATCHES", 20)
+# Напарник попадает в состав, если сыграл вместе хотя бы столько матчей
+ROSTER_MIN_SHARED = 2
+# Сколько командных сводок хранится в памяти
+CACHE_SIZE = _env_int("FACEIT_TEAM_CACHE_SIZE", 64)
+
+
+def roster_from_history(client, player_id, game_id="cs2", nickname=None, size=TEAM_SIZE, matches=ROSTER_MATCHES):
+    """
+    Состав [(nickname, player_id)] из последних матчей игрока: он сам и
+    напарники, чаще всего оказывавшиеся с ним в одной команде
+    """
+    page = get_match_history(client, player_id, game_id, 0, matches)
+    shared = Counter()
+    nicknames = {}
+    for item in (page or {}).get("items", []):
+        for faction in (item.get("teams") or {}).values():
+            players = faction.get("players") or faction.get("roster") or []
+            ids = [player.get("player_id") for player in players]
+            if player_id not in ids:
+                continue
+            for player in players:
+                other_id = player.get("player_id")
+                if other_id and other_id != player_id:
+                    shared[other_id] += 1
+                    # Никнейм берётся из самого нового матча
+                    nicknames.setdefault(other_id, player.get("nickname"))
+                elif other_id == player_id and nickname is None:
+                    nickname = player.get("nickname")
+    mates = [(nicknames[other_id], other_id) for other_id, count in shared.most_common(size - 1)
+             if count >= ROSTER_MIN_SHARED]
+    return [(nickname or player_id, player_id)] + mates
+
+
+class TeamAggregate:
+    """
+    Сводка по команде. maps - карты, сыгранные хотя бы одним игроком, со
+    столбцами как у MapTable (win_rate, kd, rating, confidence,
+    weighted_rating взвешены по матчам игроков) и players - сколько игроков
+    играли карту, kd_spread - разница лучшего и худшего K/D на ней
+    """
+    __slots__ = ("name", "players", "found", "avg_elo", "avg_kd", "kd_min", "kd_max", "kd_spread", "kd_std",
+                 "win_rate", "matches", "maps", "best_map", "worst_map")
+
+    def __init__(self, name, players):
+        self.name = name
+        self.players = players
+        self.found = 0
+        self.avg_elo = None
+        self.avg_kd = None
+        self.kd_min = None
+        self.kd_max = None
+        self.kd_spread = None
+        self.kd_std = None
+        self.win_rate = None
+        self.matches = 0
+        self.maps = []
+        self.best_map = None
+        self.worst_map = None
+
+    def ranked(self, sort="weighted_rating", min_matches=MIN_MAP_MATCHES, min_players=None):
+        """
+        Карты команды с не меньше чем min_matches матчами на всех и
+        min_players игроками (по умолчанию - половина состава), по убыванию sort
+        """
+        if min_players is None:
+            min_players = max(1, (self.found + 1) // 2)
+        return sorted((item for item in self.maps
+                       if item["matches"] >= min_matches and item["players"] >= min_players),
+                      key=lambda item: item[sort], reverse=True)
+
+
+# Поля командного отчёта в порядке колонок CSV (таблица карт есть только в JSON)
+FIELDS = ("name", "players", "found", "avg_elo", "avg_kd", "kd_min", "kd_max", "kd_spread", "kd_std",
+          "win_rate", "matches", "best_map", "worst_map")
+
+
+def build_team_report(team):
+    """Плоский отчёт по команде для CLI: поля FIELDS и maps по убыванию weighted_rating"""
+    report = {name: getattr(team, name) for name in FIELDS}
+    report["players"] = ", ".join(name or "" for name in team.players)
+    report["maps"] = sorted(team.maps, key=lambda item: item["weighted_rating"], reverse=True)
+    return report
+
+
+def _elo(result):
+    games = (result.player_data or {}).get("games", {})
+    game = games.get(result.game_id or "cs2") or {}
+    try:
+        return float(game.get("faceit_elo"))
+    except (TypeError, ValueError):
+        return None
+
+
+def aggregate_team(name, results, min_matches=MIN_MAP_MATCHES):
+    """
+    Сводка по команде из ScanResult её игроков. Таблицы карт игроков
+    сводятся в матрицы игроки x карты, и все показатели считаются векторно
+    по той же формуле рейтинга, что и у одного игрока
+    """
+    team = TeamAggregate(name, [result.player_data.get("nickname") if result.player_data else result.nickname
+                                for result in results])
+    members = [result for result in results if result.stats]
+    team.found = len(members)
+    elos = [elo for elo in map(_elo, results) if elo is not None]
+    team.avg_elo = sum(elos) / len(elos) if elos else None
+    if not members:
+        return team
+
+    kds = np.array([result.stats.lifetime.kd for result in members if result.stats.lifetime.kd is not None])
+    if len(kds):
+        team.avg_kd = float(kds.mean())
+        team.kd_min = float(kds.min())
+        team.kd_max = float(kds.max())
+        team.kd_spread = team.kd_max - team.kd_min
+        team.kd_std = float(kds.std())
+    lifetime = [(result.stats.lifetime.win_rate, result.stats.lifetime.matches) for result in members
+                if result.stats.lifetime.win_rate is not None and result.stats.lifetime.matches]
+    team.matches = sum(result.stats.lifetime.matches for result in members)
+    if lifetime:
+        team.win_rate = sum(rate * count for rate, count in lifetime) / sum(count for _, count in lifetime)
+
+    tables = [get_map_table(result.stats).maps for result in members]
+    names = sorted({item["name"] for table in tables for item in table})
+    if not names:
+        return team
+    column = {map_name: index for index, map_name in enumerate(names)}
+    shape = (len(members), len(names))
+    matches, win_rates, kds = np.zeros(shape), np.zeros(shape), np.full(shape, np.nan)
+    for row, table in enumerate(tables):
+        for item in table:
+            col = column[item["name"]]
+            matches[row, col] = item["matches"]
+            win_rates[row, col] = item["win_rate"]
+            kds[row, col] = item["kd"]
+
+    played = matches > 0
+    total = matches.sum(axis=0)
+    ratings = map_rating(win_rates, np.where(played, kds, 0.0))
+    # Карта есть в names, только если её кто-то играл, поэтому total > 0
+    team_win_rate = (win_rates * matches).sum(axis=0) / total
+    team_kd = (np.where(played, kds, 0.0) * matches).sum(axis=0) / total
+    team_rating = (ratings * matches).sum(axis=0) / total
+    confidence = map_confidence(total)
+    prior = (team_rating * total).sum() / total.sum()
+    weighted = confidence * team_rating + (1 - confidence) * prior
+    spread = np.nanmax(kds, axis=0) - np.nanmin(kds, axis=0)
+    players = played.sum(axis=0)
+
+    team.maps = [{
+        "name": map_name,
+        "matches": int(total[col]),
+        "players": int(players[col]),
+        "win_rate": float(team_win_rate[col]),
+        "kd": float(team_kd[col]),
+        "kd_spread": float(spread[col]),
+        "rating": float(team_rating[col]),
+        "confidence": float(confidence[col]),
+        "weighted_rating": float(weighted[col]),
+    } for map_name, col in column.items()]
+    ranked = team.ranked(min_matches=min_matches)
+    team.best_map = ranked[0]["name"] if ranked else None
+    team.worst_map = ranked[-1]["name"] if len(ranked) > 1 else None
+    return team
+
+
+def _fingerprint(result):
+    """
+    Версия данных игрока: статистика и ELO меняются только после нового
+    матча, поэтому достаточно числа матчей
+    """
+    player_data = result.player_data or {}
+    if not result.stats:
+        return player_data.get("player_id") or result.nickname, None, None
+    return player_data.get("player_id"), result.game_id, result.stats.lifetime.matches
+
+
+class TeamCache:
+    """
+    Сводки команд в памяти (LRU). Ключ - название и версии данных всех
+    игроков, так что сводка пересчитывается, только когда кто-то из состава
+    сыграл новый матч
+    """
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name, results):
+        key = (name, tuple(_fingerprint(result) for result in results))
+        with self._lock:
+            team = self._items.get(key)
+            if team is not None:
+                self._items.move_to_end(key)
+        if team is not None:
+            metrics.inc("faceit_team_aggregate_total", result="cached")
+            return team
+        team = aggregate_team(name, results)
+        metrics.inc("faceit_team_aggregate_total", result="computed")
+        with self._lock:
+            self._items[key] = team
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+        return team
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+team_cache = TeamCache()
+
+
+def get_team_aggregate(name, results):
+    """Сводка команды из общего кэша (см. TeamCache)"""
+    return team_cache.get(name, results)
+
+
+def resolve_rosters(client, text, game_id="cs2"):
+    """
+    Составы для командного анализа из ввода: комната матча - обе команды,
+    несколько игроков - одна команда, один игрок - его команда из последних
+    матчей. Возвращает [(название, [(nickname, player_id), ...])] или None
+    """
+    from faceit_analyze.api import get_player_data
+
+    match_id, nicknames = parse_lobby_input(text)
+    if match_id:
+        return get_match_teams(client, match_id)
+    if len(nicknames) != 1:
+        return [("Команда", [(nickname, None) for nickname in nicknames])]
+    player_data = get_player_data(client, nicknames[0])
+    if not player_data:
+        return None
+    nickname = player_data.get("nickname")
+    roster = roster_from_history(client, player_data.get("player_id"), game_id, nickname)
+    return [(f"Команда {nickname}", roster)]
+
+
+def scan_teams(client, text, max_workers=MAX_WORKERS, on_player=None, cancel=None):
+    """
+    Сканирует составы из ввода (см. resolve_rosters) одновременно и
+    возвращает [(LobbyTeam, TeamAggregate)] или None, если составы не найдены
+    """
+    rosters = resolve_rosters(client, text)
+    if rosters is None:
+        return None
+    teams = scan_rosters(client, rosters, max_workers, on_player, cancel)
+    return [(team, get_team_aggregate(team.name, team.results)) for team in teams]
@@ -0,0 +1,201 @@
+"""
+Наблюдение за лобби: периодический опрос игроков или комнаты матча.
+Запрашиваются только изменения: история матчей - начиная с последнего
+известного матча, профиль (ELO) - только после нового матча игрока
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from faceit_analyze.api import get_match_data, get_player_by_id, get_player_data
+from faceit_analyze.cache import MAX_STALE, PROFILE_TTL
+from faceit_analyze.client import FaceitAPIError
+from faceit_analyze.env import _env_float, _env_int
+from faceit_analyze.history import sync_history
+from faceit_analyze.lobby import MAX_WORKERS, match_teams, parse_lobby_input
+from faceit_analyze.metrics import metrics
+
+logger = logging.getLogger('faceit_tracker')
+
+# Интервал опроса, сек: пока матч идёт или только что были изменения -
+# LIVE_INTERVAL; без изменений растёт в BACKOFF раз от IDLE_INTERVAL до MAX_INTERVAL
+LIVE_INTERVAL = _env_float("FACEIT_WATCH_LIVE_INTERVAL", 15)
+IDLE_INTERVAL = _env_float("FACEIT_WATCH_IDLE_INTERVAL", 60)
+MAX_INTERVAL = _env_float("FACEIT_WATCH_MAX_INTERVAL", 300)
+BACKOFF = 1.5
+
+# Сколько матчей истории загружается при первом опросе игрока
+HISTORY_MATCHES = _env_int("FACEIT_WATCH_HISTORY_MATCHES", 20)
+# Длина строки формы в таблице наблюдения
+FORM_MATCHES = 5
+
+# Статусы комнаты, при которых матч ещё не завершён
+LIVE_STATUSES = {"CHECK_IN", "VOTING", "CAPTAIN_PICK", "SUBSTITUTION", "CONFIGURING", "READY", "ONGOING",
+                 "PAUSED", "MANUAL_RESULT"}
+
+# TTL для опроса: запись кэша сразу считается устаревшей и перепроверяется
+# по ETag/Last-Modified, так что неизменившийся ресурс стоит ответа 304
+_REVALIDATE = 1
+
+
+class WatchedPlayer:
+    """Игрок под наблюдением; start_elo - ELO на момент начала наблюдения"""
+    __slots__ = ("nickname", "player_id", "game_id", "team", "level", "elo", "start_elo", "streak", "form",
+                 "new_matches", "error")
+
+    def __init__(self, nickname, player_id, game_id, team=None):
+        self.nickname = nickname
+        self.player_id = player_id
+        self.game_id = game_id
+        self.team = team
+        self.level = None
+        self.elo = None
+        self.start_elo = None
+        # Серия с последнего матча: >0 - победы подряд, <0 - поражения
+        self.streak = 0
+        self.form = ""
+        # Матчей сыграно с начала наблюдения
+        self.new_matches = 0
+        self.error = None
+
+    @property
+    def elo_change(self):
+        """Изменение ELO с начала наблюдения или None"""
+        if self.elo is None or self.start_elo is None:
+            return None
+        return self.elo - self.start_elo
+
+    def _snapshot(self):
+        return self.level, self.elo, self.streak, self.form, self.new_matches, self.error
+
+
+def _game_id(player_data):
+    games = (player_data or {}).get("games", {})
+    return "cs2" if "cs2" in games or "csgo" not in games else "csgo"
+
+
+class LobbyWatcher:
+    """
+    Наблюдение за игроками или комнатой матча (ввод как у scan_lobby).
+    Пока матч в комнате идёт, опрашивается только комната: история его
+    игроков не может измениться до конца матча
+    """
+
+    def __init__(self, client, store, text, max_workers=MAX_WORKERS):
+        self.client = client
+        self.store = store
+        self.match_id, self._nicknames = parse_lobby_input(text)
+        self.match_status = None
+        self.players = []
+        self.interval = LIVE_INTERVAL
+        self.polls = 0
+        # Текст последней ошибки API; данные игроков при этом остаются прежними
+        self.error = None
+        self._max_workers = max_workers
+
+    @property
+    def live(self):
+        """Идёт ли матч в наблюдаемой комнате"""
+        return self.match_status in LIVE_STATUSES
+
+    def _setup(self, pool):
+        """Находит игроков; False, если комната или все игроки не найдены"""
+        if self.match_id:
+            match_data = get_match_data(self.client, self.match_id, ttl=_REVALIDATE)
+            if not match_data:
+                return False
+            self.match_status = (match_data.get("status") or "").upper() or None
+            game_id = match_data.get("game") or "cs2"
+            for name, members in match_teams(match_data):
+                self.players.extend(WatchedPlayer(nickname, player_id, game_id, name)
+                                    for nickname, player_id in members if player_id)
+        else:
+            found = pool.map(lambda nickname: get_player_data(self.client, nickname, MAX_STALE), self._nicknames)
+            for nickname, player_data in zip(self._nicknames, found):
+                if player_data:
+                    self.players.append(WatchedPlayer(player_data.get("nickname") or nickname,
+                                                      player_data.get("player_id"), _game_id(player_data)))
+        return bool(self.players)
+
+    def _poll_player(self, player, io_pool):
+        """Догружает новые матчи игрока; True, если показатели изменились"""
+        before = player._snapshot()
+        # Пока ELO игрока не получено ни разу, профиль запрашивается на каждом опросе
+        first = player.start_elo is None
+        try:
+            new_matches = sync_history(self.client, self.store, player.player_id, player.game_id,
+                                       executor=io_pool, max_matches=HISTORY_MATCHES)
+            if not first and not new_matches:
+                return False
+            # ELO меняется только после матча: профиль перепроверяется лишь тогда,
+            # и нужен новый ответ, а не устаревшая запись с фоновым обновлением
+            player_data = get_player_by_id(self.client, player.player_id,
+                                           ttl=PROFILE_TTL if first else _REVALIDATE,
+                                           max_stale=MAX_STALE if first else None)
+        except FaceitAPIError as e:
+            logger.warning(f"Ошибка опроса игрока {player.nickname}: {e}")
+            player.error = str(e)
+            return player._snapshot() != before
+        game = (player_data or {}).get("games", {}).get(player.game_id) or {}
+        player.error = None
+        player.level = game.get("skill_level", player.level)
+        player.elo = game.get("faceit_elo", player.elo)
+        if first:
+            player.start_elo = player.elo
+        else:
+            player.new_matches += new_matches
+        frame = self.store.frame(player.player_id, player.game_id)
+        player.streak = frame.streak()
+        recent = frame.last(FORM_MATCHES).summary()
+        player.form = recent["form"] if recent else ""
+        return player._snapshot() != before
+
+    def poll(self, pool, io_pool):
+        """Один опрос; возвращает игроков, чьи показатели изменились"""
+        first = self.polls == 0
+        self.polls += 1
+        metrics.inc("faceit_watch_polls_total")
+        if self.match_id and not first:
+            match_data = get_match_data(self.client, self.match_id, ttl=_REVALIDATE)
+            self.match_status = ((match_data or {}).get("status") or "").upper() or None
+            if self.live:
+                return []
+        changed = pool.map(lambda player: self._poll_player(player, io_pool), self.players)
+        return [player for player, is_changed in zip(self.players, changed) if first or is_changed]
+
+    def _adapt(self, changed):
+        """Следующий интервал: частый опрос во время матча и после изменений, иначе с нарастанием"""
+        if self.live or changed:
+            self.interval = LIVE_INTERVAL
+        else:
+            self.interval = min(max(self.interval * BACKOFF, IDLE_INTERVAL), MAX_INTERVAL)
+
+    def run(self, on_update, cancel, on_status=None):
+        """
+        Опрашивает, пока не установлен cancel (threading.Event).
+        on_update(watcher, players) получает только изменившихся игроков
+        (при первом опросе - всех), on_status(watcher) вызывается после
+        каждого опроса. Возвращает False, если наблюдать некого
+        """
+        workers = max(1, self._max_workers)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="faceit-watch") as pool, \
+                ThreadPoolExecutor(max_workers=workers * 2, thread_name_prefix="faceit-watch-io") as io_pool:
+            if not self._setup(pool):
+                return False
+            while not cancel.is_set():
+                try:
+                    with metrics.timer("faceit_watch_poll_seconds"):
+                        changed = self.poll(pool, io_pool)
+                    self.error = None
+                except FaceitAPIError as e:
+                    logger.warning(f"Ошибка опроса лобби: {e}")
+                    self.error = str(e)
+                    changed = []
+                if cancel.is_set():
+                    break
+                self._adapt(bool(changed))
+                if changed:
+                    on_update(self, changed)
+                if on_status is not None:
+                    on_status(self)
+                cancel.wait(self.interval)
+        return True